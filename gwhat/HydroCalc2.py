@@ -498,6 +498,7 @@ class WLCalc(QWidget, SaveFileMixin):
     def set_wldset(self, wldset):
         """Set the namespace for the water level dataset."""
         self._wldset = wldset
+        self.rechg_eval_widget.set_projet(self.dmngr.projet)
         self.rechg_eval_widget.set_wldset(wldset)
 
         # Setup BRF widget.
@@ -11,5 +11,9 @@ from gwhat import __rootdir__
 __install_dir__ = os.path.join(__rootdir__, 'brf_mod')
 
 from gwhat.brf_mod.kgs_brf import (produce_BRFInputtxt, produce_par_file,
-                                   run_kgsbrf, read_brf_output)
+                                   run_kgsbrf, read_brf_output, calc_brf,
+                                   calc_sliding_brf, correct_waterlevels,
+                                   calc_waterlevels_correction,
+                                   regularize_brf_data, KGSBRFJob,
+                                   KGSBRFExecutor)
 from gwhat.brf_mod.kgs_gui import BRFManager
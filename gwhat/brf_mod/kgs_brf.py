@@ -10,17 +10,424 @@
 import os
 import os.path as osp
 import csv
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # ---- Third party imports
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.linalg import solve_triangular
+from scipy.signal import convolve
 from xlrd import xldate_as_tuple
 
 # ---- Local imports
 from gwhat.brf_mod import __install_dir__
+from gwhat.utils.concurrency import get_max_workers
+from gwhat.utils.math import find_sampling_interval, regularize_time_series
 
+# The columns of the BRF results, in the order of the output data file
+# produced by kgs_brf.exe.
+BRF_COLUMNS = ['Lag', 'A', 'sdA', 'SumA', 'sdSumA', 'B', 'sdB', 'SumB',
+               'sdSumB']
 
-def produce_BRFInputtxt(well, time, wl, bp, et):
+# The maximum number of BRF calculations that are run concurrently with
+# kgs_brf.exe by default.
+MAX_KGSBRF_WORKERS = 4
+
+# The maximum number of sampling intervals between two valid values for
+# the gaps in the data to be filled by linear interpolation when the data
+# are resampled on a regular grid to calculate or apply a BRF.
+MAX_INTERP_INTERVALS = 4
+
+
+def regularize_brf_data(time, wl, bp, et, dt=None):
+    """
+    Resample the water levels, barometric pressure and Earth tides on a
+    regular grid with regularize_time_series, so that they can be used to
+    calculate or apply a BRF.
+
+    The dominant sampling interval of the data is used if dt is None. The
+    gaps spanning more than MAX_INTERP_INTERVALS sampling intervals are
+    set to NaN instead of being interpolated.
+
+    Returns
+    -------
+    time, wl, bp, et : np.ndarray
+        The times and the data resampled on the regular grid.
+    isgap : np.ndarray
+        A boolean array of shape (n, 3) that is True for the values of
+        the grid that were flagged as gaps.
+    """
+    if dt is None:
+        dt = find_sampling_interval(time)
+    tc, data, isgap = regularize_time_series(
+        time, np.column_stack((wl, bp, et)), dt=dt,
+        max_gap=MAX_INTERP_INTERVALS * dt + dt / 2)
+    return (tc, *data.T, isgap)
+
+
+def calc_brf(time, wl, bp, et, lagBP, lagET, detrend_waterlevels=True):
+    """
+    Calculate the barometric response function (BRF) of a well with the
+    regression deconvolution method used by the KGS_BRF program.
+
+    The changes in water level are regressed on the current and lagged
+    changes in barometric pressure and Earth tides, with a constant term
+    when the water levels are detrended. As with kgs_brf.exe, the water
+    levels and barometric pressure are converted to feet, and the water
+    levels are converted to heights.
+
+    The samples with missing values are excluded from the regression.
+
+    Parameters
+    ----------
+    time : np.ndarray
+        Regularly spaced times in days since epoch, as returned by
+        regularize_brf_data.
+    wl : np.ndarray
+        Water levels in meters below the ground surface.
+    bp : np.ndarray
+        Barometric pressure in meters of water.
+    et : np.ndarray
+        Earth tides.
+    lagBP : int
+        Number of barometric pressure lags.
+    lagET : int
+        Number of Earth tides lags. Earth tides are not used if negative.
+    detrend_waterlevels : bool
+        Whether to remove the linear trend of the water levels.
+
+    Returns
+    -------
+    dataf : pandas.DataFrame
+        The BRF results in the same format as the dataframe returned by
+        read_brf_output.
+    """
+    X, y, maxlag = _build_brf_design(
+        wl, bp, et, lagBP, lagET, detrend_waterlevels)
+
+    # Exclude the samples with missing values, such as the gaps that were
+    # flagged when regularizing the data.
+    isvalid = np.all(np.isfinite(X), axis=1) & np.isfinite(y)
+    X, y = X[isvalid], y[isvalid]
+    if len(y) <= X.shape[1]:
+        raise ValueError("Not enough data to calculate the BRF.")
+
+    coeffs, cov = _solve_least_squares(X, y)
+
+    # Format the results as in the output data file of kgs_brf.exe.
+    sample_interval = float('%f' % (time[1] - time[0]))
+    dataf = pd.DataFrame(
+        _format_brf_results(coeffs, cov, lagBP, lagET, sample_interval),
+        index=pd.Index(np.arange(maxlag + 1), name='LagNo'),
+        columns=BRF_COLUMNS)
+    return dataf
+
+
+def calc_sliding_brf(time, wl, bp, et, lagBP, lagET, window=30, step=7,
+                     detrend_waterlevels=True):
+    """
+    Calculate the barometric response function (BRF) of a well for
+    overlapping windows of time sliding over the whole record.
+
+    The lagged design matrix is built only once for the whole record. The
+    normal equations of the regression are accumulated for consecutive
+    blocks of step days, so that the normal equations of each window are
+    obtained from the difference of the cumulative sums of these blocks,
+    without rebuilding the design matrix of the window. The samples with
+    missing values are excluded from the windows in which they occur.
+
+    Parameters
+    ----------
+    time : np.ndarray
+        Regularly spaced times in days since epoch.
+    wl : np.ndarray
+        Water levels in meters below the ground surface.
+    bp : np.ndarray
+        Barometric pressure in meters of water.
+    et : np.ndarray
+        Earth tides.
+    lagBP : int
+        Number of barometric pressure lags.
+    lagET : int
+        Number of Earth tides lags. Earth tides are not used if negative.
+    window : float
+        The length of the windows in days. It is rounded to a multiple of
+        the step.
+    step : float
+        The number of days between the start of two consecutive windows.
+    detrend_waterlevels : bool
+        Whether to remove the linear trend of the water levels in each
+        window.
+
+    Returns
+    -------
+    windows : np.ndarray
+        An array of shape (n, 2) with the start and end time of the
+        n windows.
+    brfs : np.ndarray
+        An array of shape (n, max(lagBP, lagET) + 1, len(BRF_COLUMNS))
+        with the BRF results of each window. The BRF of the windows that do
+        not contain enough valid data are set to NaN.
+    """
+    time = np.asarray(time, dtype=float)
+    X, y, maxlag = _build_brf_design(
+        wl, bp, et, lagBP, lagET, detrend_waterlevels)
+    nparams = X.shape[1]
+    sample_interval = float('%f' % (time[1] - time[0]))
+
+    step_rows = max(int(round(step / sample_interval)), 1)
+    window_blocks = max(int(round(window / (step_rows * sample_interval))), 1)
+    nblocks = len(y) // step_rows
+    if nblocks < window_blocks:
+        raise ValueError("Not enough data to calculate the sliding BRF.")
+
+    # Calcul the normal equations of each block of step_rows samples at
+    # once, by augmenting the design matrix with the water level changes.
+    Z = np.hstack((X, y[:, np.newaxis]))[:nblocks * step_rows]
+    isvalid = np.all(np.isfinite(Z), axis=1)
+    Z[~isvalid] = 0
+    Z = Z.reshape(nblocks, step_rows, nparams + 1)
+    block_normals = np.einsum('bij,bik->bjk', Z, Z)
+    block_counts = isvalid.reshape(nblocks, step_rows).sum(axis=1)
+
+    # Calcul the normal equations of each window from the difference of
+    # the cumulative sums of the normal equations of the blocks.
+    cum_normals = np.concatenate((
+        np.zeros((1, nparams + 1, nparams + 1)),
+        np.cumsum(block_normals, axis=0)))
+    cum_counts = np.concatenate(([0], np.cumsum(block_counts)))
+    normals = cum_normals[window_blocks:] - cum_normals[:-window_blocks]
+    counts = cum_counts[window_blocks:] - cum_counts[:-window_blocks]
+    nwindows = len(normals)
+
+    xtx = normals[:, :nparams, :nparams]
+    xty = normals[:, :nparams, nparams]
+    yty = normals[:, nparams, nparams]
+    coeffs = np.full((nwindows, nparams), np.nan)
+    cov = np.full((nwindows, nparams, nparams), np.nan)
+    for i in np.where(counts > nparams)[0]:
+        try:
+            xtx_inv = np.linalg.inv(xtx[i])
+        except np.linalg.LinAlgError:
+            continue
+        coeffs[i] = xtx_inv @ xty[i]
+        variance = (yty[i] - coeffs[i] @ xty[i]) / (counts[i] - nparams)
+        cov[i] = max(variance, 0) * xtx_inv
+
+    istart = maxlag + np.arange(nwindows) * step_rows
+    windows = np.column_stack((
+        time[istart], time[istart + window_blocks * step_rows]))
+    brfs = _format_brf_results(coeffs, cov, lagBP, lagET, sample_interval)
+    return windows, brfs
+
+
+def correct_waterlevels(time, wl, bp, et, brf):
+    """
+    Remove from the water levels the response to the changes in barometric
+    pressure and Earth tides that is predicted with a BRF.
+
+    Parameters
+    ----------
+    time : np.ndarray
+        Times in days since epoch.
+    wl : np.ndarray
+        Water levels in meters below the ground surface.
+    bp : np.ndarray
+        Barometric pressure in meters of water.
+    et : np.ndarray
+        Earth tides.
+    brf : pandas.DataFrame
+        The BRF results as returned by calc_brf or read_brf_output.
+
+    Returns
+    -------
+    np.ndarray
+        The corrected water levels in meters below the ground surface. The
+        water levels for which the predicted response depends on missing
+        barometric pressure or Earth tides data are set to NaN.
+    """
+    # The water levels are depths, which decrease when the heights predicted
+    # with the BRF increase, so that the predicted response is added to the
+    # water levels to remove it.
+    return np.asarray(wl, dtype=float) + calc_waterlevels_correction(
+        time, bp, et, brf)
+
+
+def calc_waterlevels_correction(time, bp, et, brf):
+    """
+    Return the correction in meters to add to the water levels to remove
+    the response to the changes in barometric pressure and Earth tides
+    that is predicted with a BRF.
+
+    The changes in barometric pressure and Earth tides are convolved with
+    the coefficients of the BRF, using a FFT convolution when the number of
+    lags is large, and the correction is the cumulative sum of the
+    predicted response. The correction does not depend on the water
+    levels and does not remove their linear trend.
+
+    When the data are not sampled regularly at the interval of the BRF,
+    the response is calculated with the data resampled on a regular grid
+    and is interpolated at the specified times.
+
+    Parameters
+    ----------
+    time : np.ndarray
+        Times in days since epoch.
+    bp : np.ndarray
+        Barometric pressure in meters of water.
+    et : np.ndarray
+        Earth tides.
+    brf : pandas.DataFrame
+        The BRF results as returned by calc_brf or read_brf_output.
+
+    Returns
+    -------
+    np.ndarray
+        The correction of the water levels, which is NaN where the
+        predicted response depends on missing barometric pressure or Earth
+        tides data.
+    """
+    time = np.asarray(time, dtype=float)
+    # The lags of the BRF are saved with a precision of 6 decimals, so that
+    # the sampling interval of the BRF is rounded to the nearest second.
+    dt = (np.round(brf['Lag'].iloc[1] * 86400) / 86400 if len(brf) > 1 else
+          None)
+    if dt is None or np.allclose(np.diff(time), dt, atol=1e-5):
+        response = _calc_brf_response(bp, et, brf)
+    else:
+        tc, data, _ = regularize_time_series(
+            time, np.column_stack((bp, et)), dt=dt,
+            max_gap=MAX_INTERP_INTERVALS * dt + dt / 2)
+        response = np.interp(
+            time, tc, _calc_brf_response(data[:, 0], data[:, 1], brf))
+
+    return response
+
+
+def _calc_brf_response(bp, et, brf):
+    """
+    Return the cumulative response of the water level heights in meters
+    to the changes in barometric pressure and Earth tides predicted with
+    the BRF. The response is set to NaN where it depends on missing data.
+    """
+    # The BRF relates the changes in water level heights to the changes in
+    # barometric pressure in the same units and to the changes in Earth
+    # tides in feet.
+    response = np.zeros(len(bp) - 1)
+    ismissing = np.zeros(len(bp) - 1, dtype=bool)
+    for name, data, factor in (('A', bp, 1), ('B', et, 1 / 3.28084)):
+        if name not in brf.columns or brf[name].isnull().all():
+            continue
+        coeffs = brf[name].dropna().values
+        data = np.asarray(data, dtype=float)
+        isnull = np.isnan(data)
+        if isnull.all():
+            return np.full(len(bp), np.nan)
+
+        # Bridge the gaps in the data by linear interpolation, so that the
+        # total change across each gap is kept in the cumulative response
+        # of the water levels that follow the gap.
+        indexes = np.arange(len(data))
+        data = np.interp(indexes, indexes[~isnull], data[~isnull])
+        response += factor * convolve(np.diff(data), coeffs)[:len(data) - 1]
+        ismissing |= convolve(
+            (isnull[1:] | isnull[:-1]).astype(float),
+            np.ones(len(coeffs)))[:len(data) - 1] > 0.5
+
+    response = np.concatenate(([0], np.cumsum(response)))
+    response[1:][ismissing] = np.nan
+    return response
+
+
+def _build_brf_design(wl, bp, et, lagBP, lagET, detrend_waterlevels=True):
+    """
+    Return the design matrix with the current and lagged changes of
+    barometric pressure and Earth tides, the changes in water level
+    heights in feet, and the maximum number of lags.
+    """
+    dwl = np.diff((np.nanmax(wl) - np.asarray(wl, dtype=float)) * 3.28084)
+    dbp = np.diff(np.asarray(bp, dtype=float) * 3.28084)
+    det = np.diff(np.asarray(et, dtype=float))
+
+    maxlag = max(lagBP, lagET)
+    nrows = len(dwl) - maxlag
+    if nrows <= 0:
+        raise ValueError("Not enough data to calculate the BRF.")
+    columns = [sliding_window_view(dbp, lagBP + 1)[
+        maxlag - lagBP:maxlag - lagBP + nrows, ::-1]]
+    if lagET >= 0:
+        columns.append(sliding_window_view(det, lagET + 1)[
+            maxlag - lagET:maxlag - lagET + nrows, ::-1])
+    if detrend_waterlevels:
+        columns.append(np.ones((nrows, 1)))
+    return np.hstack(columns), dwl[maxlag:], maxlag
+
+
+def _format_brf_results(coeffs, cov, lagBP, lagET, sample_interval):
+    """
+    Return an array of shape (..., max(lagBP, lagET) + 1, len(BRF_COLUMNS))
+    with the BRF results calculated from the regression coefficients and
+    their covariance matrix, which can be stacked along their first axes.
+    """
+    maxlag = max(lagBP, lagET)
+    results = np.full(coeffs.shape[:-1] + (maxlag + 1, len(BRF_COLUMNS)),
+                      np.nan)
+    results[..., 0] = np.arange(maxlag + 1) * sample_interval
+    istart = 0
+    for name, nlag in (('A', lagBP), ('B', lagET)):
+        if nlag < 0:
+            continue
+        iend = istart + nlag + 1
+        sub_coeffs = coeffs[..., istart:iend]
+        sub_cov = cov[..., istart:iend, istart:iend]
+        icol = BRF_COLUMNS.index(name)
+        results[..., :nlag + 1, icol] = sub_coeffs
+        results[..., :nlag + 1, icol + 1] = np.sqrt(
+            np.diagonal(sub_cov, axis1=-2, axis2=-1))
+        results[..., :nlag + 1, icol + 2] = np.cumsum(sub_coeffs, axis=-1)
+        # The variance of the cumulative sums is the sum of the covariance
+        # of all the pairs of coefficients that are summed.
+        results[..., :nlag + 1, icol + 3] = np.sqrt(np.diagonal(
+            np.cumsum(np.cumsum(sub_cov, axis=-2), axis=-1),
+            axis1=-2, axis2=-1))
+        istart = iend
+    return results
+
+
+def _solve_least_squares(X, y):
+    """
+    Return the least-squares solution of X @ coeffs = y and the covariance
+    matrix of the coefficients, which are calculated from the QR
+    decomposition of X.
+
+    A ValueError is raised if the columns of X are not linearly
+    independent, since the coefficients are not uniquely defined then.
+    """
+    q, r = np.linalg.qr(X)
+    if np.linalg.matrix_rank(r) < X.shape[1]:
+        raise ValueError(
+            "The regression is rank deficient, because some of the lagged "
+            "barometric pressure or Earth tides series are constant or "
+            "linearly dependent. Check that the dataset contains Earth tides "
+            "data or calculate the BRF without Earth tides.")
+    coeffs = solve_triangular(r, q.T @ y)
+    residuals = y - X @ coeffs
+    variance = residuals @ residuals / (len(y) - X.shape[1])
+    rinv = solve_triangular(r, np.eye(r.shape[0]))
+    return coeffs, variance * (rinv @ rinv.T)
+
+
+def produce_BRFInputtxt(well, time, wl, bp, et, workdir=None):
+    """
+    Create the input data file required by the KGS_BRF program in the
+    specified working directory, which is the installation directory of
+    the program by default.
+    """
+    workdir = __install_dir__ if workdir is None else workdir
 
     comment = 'No comment men'
     wlu = 'feet'
@@ -56,21 +463,29 @@ def produce_BRFInputtxt(well, time, wl, bp, et):
     bp = bp * 3.28084
     fcontent.extend([[time[i], wl[i], bp[i], et[i]] for i in range(N)])
 
-    filename = os.path.join(__install_dir__, 'BRFInput.txt')
+    filename = os.path.join(workdir, 'BRFInput.txt')
     with open(filename, 'w', encoding='utf8') as f:
         writer = writer = csv.writer(f, delimiter='\t', lineterminator='\n')
         writer.writerows(fcontent)
 
 
 def produce_par_file(lagBP, lagET, detrend_waterlevels=True,
-                     correct_waterlevels=True):
+                     correct_waterlevels=True, workdir=None):
     """
-    Create the parameter file requires by the KGS_BRF program.
+    Create the parameter file requires by the KGS_BRF program in the
+    specified working directory, which is the installation directory of
+    the program by default.
+
+    The correct_waterlevels argument is ignored and is kept only for
+    backward compatibility, since the water levels are never corrected by
+    the KGS_BRF program. Use the correct_waterlevels function of this
+    module instead.
     """
-    brfinput = os.path.join(__install_dir__, 'BRFInput.txt')
-    brfoutput = os.path.join(__install_dir__, 'BRFOutput.txt')
-    wlcinput = os.path.join(__install_dir__, 'WLCInput.txt')
-    wlcoutput = os.path.join(__install_dir__, 'WLCOutput.txt')
+    workdir = __install_dir__ if workdir is None else workdir
+    brfinput = os.path.join(workdir, 'BRFInput.txt')
+    brfoutput = os.path.join(workdir, 'BRFOutput.txt')
+    wlcinput = os.path.join(workdir, 'WLCInput.txt')
+    wlcoutput = os.path.join(workdir, 'WLCOutput.txt')
 
     detrend = 'Yes' if detrend_waterlevels else 'No'
     correct = 'No'
@@ -86,53 +501,184 @@ def produce_par_file(lagBP, lagET, detrend_waterlevels=True,
     par.append(['WLC Input Data File: %s' % wlcinput])
     par.append(['WLC Output Data File: %s' % wlcoutput])
 
-    filename = os.path.join(__install_dir__, 'kgs_brf.par')
+    filename = os.path.join(workdir, 'kgs_brf.par')
     with open(filename, 'w', encoding='utf8') as f:
         writer = csv.writer(f, delimiter='\t',  lineterminator='\n')
         writer.writerows(par)
 
 
-def run_kgsbrf():
+def run_kgsbrf(workdir=None):
+    """
+    Run the KGS_BRF program with the parameter file saved in the specified
+    working directory, which is the installation directory of the program
+    by default.
+
+    An OSError is raised if the program cannot be run, and a
+    subprocess.CalledProcessError if it exits with an error.
+    """
+    workdir = __install_dir__ if workdir is None else workdir
     exename = os.path.join(__install_dir__, 'kgs_brf.exe')
-    parname = os.path.join(__install_dir__, 'kgs_brf.par')
-    if os.path.exists(exename) and os.path.exists(parname):
-        if os.name == 'nt':
-            os.system('""%s" < "%s""' % (exename, parname))
+    parname = os.path.join(workdir, 'kgs_brf.par')
+    if os.name != 'nt':
+        raise OSError("The KGS_BRF program can only be run on Windows.")
+    if not os.path.exists(exename):
+        raise FileNotFoundError(
+            "The KGS_BRF program is not installed in {}.".format(
+                __install_dir__))
+    if not os.path.exists(parname):
+        raise FileNotFoundError(
+            "The parameter file {} does not exist.".format(parname))
+    with open(parname, 'r') as f:
+        subprocess.run([exename], stdin=f, cwd=workdir, check=True)
+
+
+class KGSBRFJob(object):
+    """
+    A handle on the calculation of a BRF with the KGS_BRF program.
+
+    Each job writes the input, parameter and output files of the program
+    in its own temporary working directory, which is deleted once the
+    job is completed, so that several jobs can run at the same time.
+    The results of a job that was submitted to a KGSBRFExecutor are
+    collected with its result method.
+    """
+
+    def __init__(self, well, time, wl, bp, et, lagBP, lagET,
+                 detrend_waterlevels=True):
+        self.well = well
+        self.time = time
+        self.wl = wl
+        self.bp = bp
+        self.et = et
+        self.lagBP = lagBP
+        self.lagET = lagET
+        self.detrend_waterlevels = detrend_waterlevels
+        self.workdir = None
+        self.future = None
+
+    def run(self):
+        """
+        Calculate the BRF with the KGS_BRF program in a new temporary
+        working directory and return the results.
+        """
+        self.workdir = tempfile.mkdtemp(prefix='kgs_brf_')
+        try:
+            produce_BRFInputtxt(self.well, self.time, self.wl, self.bp,
+                                self.et, workdir=self.workdir)
+            produce_par_file(self.lagBP, self.lagET,
+                             self.detrend_waterlevels, workdir=self.workdir)
+            run_kgsbrf(workdir=self.workdir)
+            return read_brf_output(
+                osp.join(self.workdir, 'BRFOutput.txt'))
+        finally:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def done(self):
+        """Return whether the job was submitted and is completed."""
+        return self.future is not None and self.future.done()
+
+    def result(self, timeout=None):
+        """
+        Wait for the job to complete and return its results or raise the
+        exception that occurred during the calculation.
+        """
+        if self.future is None:
+            raise RuntimeError("The job was not submitted to an executor.")
+        return self.future.result(timeout)
+
+
+class KGSBRFExecutor(object):
+    """
+    An executor that runs up to max_workers BRF calculations with the
+    KGS_BRF program concurrently.
+
+    The calculations are run in a pool of threads, since the work is done
+    in the processes of the program.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = get_max_workers(max_workers, MAX_KGSBRF_WORKERS)
+        self._executor = ThreadPoolExecutor(self.max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def submit(self, job):
+        """Submit the KGSBRFJob to the executor and return it."""
+        job.future = self._executor.submit(job.run)
+        return job
+
+    def as_completed(self, jobs, timeout=None):
+        """
+        Return an iterator over the submitted jobs that yields them as
+        they complete.
+        """
+        futures = {job.future: job for job in jobs}
+        for future in as_completed(futures, timeout):
+            yield futures[future]
+
+    def shutdown(self, wait=True):
+        """Release the resources of the executor."""
+        self._executor.shutdown(wait)
 
 
 def read_brf_output(filename=None):
     """
     Read the barometric response function from the output file produced
     by kgs_brf.exe.
+
+    The results of each lag are written on four lines in the output file,
+    so that the numeric block following the header of the columns is
+    converted at once and reshaped into rows of len(BRF_COLUMNS) + 1
+    values. A ValueError is raised if the content of the file is not in
+    the expected format, for example if the file is truncated.
     """
     if filename is None:
         filename = osp.join(__install_dir__, 'BRFOutput.txt')
 
     with open(filename, 'r') as f:
-        reader = list(csv.reader(f))
+        lines = f.read().splitlines()
 
-    for i, row in enumerate(reader):
-        if 'LagNo Lag A sdA SumA sdSumA B sdB SumB sdSumB' in row[0]:
-            columns = row[0].split()
+    columns = ['LagNo'] + BRF_COLUMNS
+    header = {}
+    for i, line in enumerate(lines):
+        if line.split() == columns:
             break
+        key, sep, value = line.partition(':')
+        if sep:
+            header[key.strip()] = value.strip()
+    else:
+        raise ValueError(
+            "The header of the BRF results was not found in {}.".format(
+                filename))
+
+    try:
+        values = np.array(' '.join(lines[i + 1:]).split(), dtype='float64')
+    except ValueError:
+        raise ValueError(
+            "The BRF results in {} contain non-numeric values.".format(
+                filename))
+    if len(values) == 0 or len(values) % len(columns) != 0:
+        raise ValueError(
+            "The BRF results in {} are incomplete.".format(filename))
+    data = values.reshape(-1, len(columns))
 
-    data = []
-    count = 1
-    for row in reader[i+1:]:
-        if count == 1:
-            data.append([float(i) for i in row[0].split()])
-            count += 1
-        elif count in [2, 3]:
-            data[-1].extend([float(i) for i in row[0].split()])
-            count += 1
-        elif count == 4:
-            data[-1].extend([float(i) for i in row[0].split()])
-            count = 1
+    # Check that the lags are complete and in order.
+    nlags = max(int(header.get('Number of BP Lags', -1)),
+                int(header.get('Number of ET Lags', -1)))
+    if (not np.array_equal(data[:, 0], np.arange(len(data))) or
+            (nlags >= 0 and len(data) != nlags + 1)):
+        raise ValueError(
+            "The lags of the BRF results in {} are not valid.".format(
+                filename))
 
     # Cast the data into a pandas dataframe.
-    dataf = pd.DataFrame(data, columns=columns)
-    dataf['LagNo'] = dataf['LagNo'].astype(int)
-    dataf.set_index(['LagNo'], drop=True, inplace=True)
+    dataf = pd.DataFrame(
+        data[:, 1:], columns=BRF_COLUMNS,
+        index=pd.Index(data[:, 0].astype(int), name='LagNo'))
     dataf[(dataf <= -999.999) & (dataf >= -999.9999)] = np.nan
 
     return dataf
@@ -144,7 +144,6 @@ class BRFManager(WLCalcTool):
 
         self._bp_and_et_lags_are_linked = False
         self._previous_toggled_navig_and_select_tool = None
-        self.kgs_brf_installer = None
 
         self.viewer = BRFViewer(wldset, parent)
         self.viewer.set_language(self.get_option('graphs_labels_language'))
@@ -274,10 +273,6 @@ class BRFManager(WLCalcTool):
         main_layout.addWidget(self._show_brf_results_btn, 3, 0)
         main_layout.addWidget(btn_comp, 4, 0)
 
-        # Setup the install KGS_BRF panel
-        if not KGSBRFInstaller().kgsbrf_is_installed():
-            self.__install_kgs_brf_installer()
-
     def showEvent(self, event):
         if self._first_show_event:
             self._first_show_event = False
@@ -546,34 +541,9 @@ class BRFManager(WLCalcTool):
                 self.baro_spinbox.setValue(self.earthtides_spinbox.value())
                 self.baro_spinbox.blockSignals(False)
 
-    # ---- KGS BRF installer
-    def __install_kgs_brf_installer(self):
-        """
-        Installs a KGSBRFInstaller that overlays the whole brf tool
-        layout until the KGS_BRF program is installed correctly.
-        """
-        self.kgs_brf_installer = KGSBRFInstaller()
-        self.kgs_brf_installer.sig_kgs_brf_installed.connect(
-            self.__uninstall_kgs_brf_installer)
-        self.layout().addWidget(
-            self.kgs_brf_installer,
-            0, 0, self.layout().rowCount(), self.layout().columnCount())
-
-    def __uninstall_kgs_brf_installer(self):
-        """
-        Uninstall the KGSBRFInstaller after the KGS_BRF program has been
-        installed properly.
-        """
-        self.kgs_brf_installer.sig_kgs_brf_installed.disconnect()
-        self.kgs_brf_installer = None
-
     # ---- Calculations
     def calc_brf(self):
         """Prepare the data, calcul the brf, and save and plot the results."""
-
-        # Prepare the datasets.
-        well = self.wldset['Well']
-
         brfperiod = self.get_brfperiod()
         t1 = min(brfperiod)
         i1 = np.where(self.wldset.xldates >= t1)[0][0]
@@ -589,44 +559,39 @@ class BRFManager(WLCalcTool):
                    " not contain any barometric data for the selected period.")
             QMessageBox.warning(self, 'Warning', msg, QMessageBox.Ok)
             return
+        # The Earth tides are not used in the regression when the dataset
+        # does not contain any Earth tides data.
+        nlag_earthtides = self.nlag_earthtides
         et = np.copy(self.wldset['ET'][i1:i2+1])
-        if len(et) == 0:
+        if len(et) == 0 or not np.any(np.nan_to_num(et)):
             et = np.zeros(len(wl))
-
-        # Fill the gaps in the waterlevel data.
-        dt = np.min(np.diff(time))
-        tc = np.arange(t1, t2+dt/2, dt)
-        if len(tc) != len(time) or np.any(np.isnan(wl)):
-            print('Filling gaps in data with linear interpolation.')
-            indx = np.where(~np.isnan(wl))[0]
-            wl = np.interp(tc, time[indx], wl[indx])
-
-            indx = np.where(~np.isnan(bp))[0]
-            bp = np.interp(tc, time[indx], bp[indx])
-
-            indx = np.where(~np.isnan(et))[0]
-            et = np.interp(tc, time[indx], et[indx])
-
-            time = tc
+            nlag_earthtides = -1
+
+        # Resample the data on a regular grid and fill the short gaps.
+        if len(time) > 1:
+            time, wl, bp, et, isgap = bm.regularize_brf_data(
+                time, wl, bp, et)
+            if np.any(isgap):
+                msg = ("{} samples of the selected period are in gaps that "
+                       "are too long to be filled by linear interpolation. "
+                       "These samples are excluded from the calculation "
+                       "of the BRF.").format(np.sum(np.any(isgap, axis=1)))
+                QMessageBox.warning(self, 'Warning', msg, QMessageBox.Ok)
 
         QApplication.setOverrideCursor(Qt.WaitCursor)
         print('calculating the BRF')
 
-        bm.produce_BRFInputtxt(well, time, wl, bp, et)
         msg = ("Not enough data. Try enlarging the selected period "
                "or reduce the number of BP lags.")
-        if self.nlag_baro >= len(time) or self.nlag_earthtides >= len(time):
+        if self.nlag_baro >= len(time) or nlag_earthtides >= len(time):
             QApplication.restoreOverrideCursor()
             QMessageBox.warning(self, 'Warning', msg, QMessageBox.Ok)
             return
 
-        bm.produce_par_file(
-            self.nlag_baro, self.nlag_earthtides, self.detrend_waterlevels,
-            self.correct_waterlevels)
-        bm.run_kgsbrf()
-
         try:
-            dataf = bm.read_brf_output()
+            dataf = bm.calc_brf(
+                time, wl, bp, et, self.nlag_baro, nlag_earthtides,
+                self.detrend_waterlevels)
             date_start, date_end = (xldate_as_datetime(xldate, 0) for
                                     xldate in self.get_brfperiod())
             self.wldset.save_brf(dataf, date_start, date_end,
@@ -634,8 +599,11 @@ class BRFManager(WLCalcTool):
             self.viewer.new_brf_added()
             self.viewer.show()
             QApplication.restoreOverrideCursor()
-        except Exception:
+        except Exception as e:
             QApplication.restoreOverrideCursor()
+            msg = ("The BRF could not be calculated because of the "
+                   "following error:<br><br>{}").format(
+                       str(e) or type(e).__name__)
             QMessageBox.warning(self, 'Warning', msg, QMessageBox.Ok)
             return
 
@@ -729,6 +697,16 @@ class BRFViewer(QDialog):
             triggered=self.toggle_graphpannel
             )
 
+        self.btn_correct_wl = create_toolbutton(
+            self,
+            icon='calc_brf',
+            text='Correct Water Levels',
+            tip=('Correct the water levels of the current dataset for the '
+                 'effects of barometric pressure and Earth tides with the '
+                 'BRF currently displayed in this viewer.'),
+            triggered=self.correct_waterlevels
+            )
+
         self.import_params_in_manager_btn = create_toolbutton(
             self,
             icon='content_duplicate',
@@ -746,7 +724,7 @@ class BRFViewer(QDialog):
         buttons = [btn_save, self.btn_copy, self.btn_export, self.btn_del,
                    self.btn_del_all, None, self.btn_prev, self.current_brf,
                    self.total_brf, self.btn_next, None,
-                   self.import_params_in_manager_btn]
+                   self.import_params_in_manager_btn, self.btn_correct_wl]
         for button in buttons:
             if button is None:
                 self.toolbar.addSeparator()
@@ -839,6 +817,21 @@ class BRFViewer(QDialog):
                 self.wldset.del_brf(name)
             self.update_brfnavigate_state()
 
+    def correct_waterlevels(self):
+        """
+        Correct the water levels of the current dataset with the BRF
+        currently displayed in the viewer.
+        """
+        name = self.wldset.get_brfname_at(self.current_brf.value() - 1)
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            self.wldset.correct_waterlevels(name)
+        except ValueError as error:
+            QApplication.restoreOverrideCursor()
+            QMessageBox.warning(self, 'Warning', str(error), QMessageBox.Ok)
+        else:
+            QApplication.restoreOverrideCursor()
+
     def new_brf_added(self):
         self.current_brf.setMaximum(self.wldset.brf_count())
         self.current_brf.setValue(self.wldset.brf_count())
@@ -13,6 +13,7 @@ import os.path as osp
 os.environ['GWHAT_PYTEST'] = 'True'
 
 # ---- Third party imports
+import numpy as np
 import pytest
 from PyQt5.QtCore import Qt
 
@@ -66,28 +67,27 @@ def brfmanager(qtbot):
 # =============================================================================
 @pytest.mark.skipif(os.environ.get('CI', None) is None,
                     reason="We do not want to run this locally")
-def test_install_kgs_brf(brfmanager, mocker, qtbot):
+def test_install_kgs_brf(mocker, qtbot):
     """Test the installation of the kgs_brf software."""
-    assert brfmanager
-    assert brfmanager.kgs_brf_installer
+    kgs_brf_installer = KGSBRFInstaller()
+    qtbot.addWidget(kgs_brf_installer)
 
     # In Linux, a warning message will popup telling the user that this
     # feature is not supported for their system.
     mocker.patch.object(QMessageBox, 'warning', return_value=QMessageBox.Ok)
 
     # Install the KGS_BRF software and assert that it was correctly
-    # installed and that the kgs_brf installer was uninstalled correctly.
-    qtbot.mouseClick(brfmanager.kgs_brf_installer.install_btn, Qt.LeftButton)
-
+    # installed.
     if os.name == 'nt':
-        qtbot.waitUntil(lambda: brfmanager.kgs_brf_installer is None)
+        with qtbot.waitSignal(kgs_brf_installer.sig_kgs_brf_installed,
+                              timeout=30000):
+            qtbot.mouseClick(kgs_brf_installer.install_btn, Qt.LeftButton)
         assert KGSBRFInstaller().kgsbrf_is_installed()
     else:
+        qtbot.mouseClick(kgs_brf_installer.install_btn, Qt.LeftButton)
         assert not KGSBRFInstaller().kgsbrf_is_installed()
 
 
-@pytest.mark.skipif(os.name == 'posix',
-                    reason="This feature is not supported on Linux")
 def test_kgs_brf_defaults(brfmanager, wldataset, qtbot):
     """
     Assert that the default values are set as expected when setting
@@ -104,8 +104,6 @@ def test_kgs_brf_defaults(brfmanager, wldataset, qtbot):
     assert brfmanager.get_brfperiod() == [41334.0, 41425.0]
 
 
-@pytest.mark.skipif(os.name == 'posix',
-                    reason="This feature is not supported on Linux")
 def test_set_brfperiod(brfmanager, wldataset, qtbot):
     """
     Test that setting the period in the manager correctly set the values
@@ -120,8 +118,6 @@ def test_set_brfperiod(brfmanager, wldataset, qtbot):
     assert wldataset.get_brfperiod() == expected_brfperiod
 
 
-@pytest.mark.skipif(os.name == 'posix',
-                    reason="This feature is not supported on Linux")
 def test_calcul_brf(brfmanager, wldataset, qtbot):
     """Calcul the brf and assert the the results are plotted as expected."""
     brfmanager.set_wldset(wldataset)
@@ -135,11 +131,55 @@ def test_calcul_brf(brfmanager, wldataset, qtbot):
     assert brfmanager.viewer.toolbar.isEnabled()
 
 
+def test_calcul_brf_without_earthtides(brfmanager, project, mocker, qtbot,
+                                      tmp_path):
+    """
+    Assert that the BRF is calculated without Earth tides when the water
+    level dataset does not contain any Earth tides data.
+    """
+    rootpath = osp.dirname(osp.realpath(__file__))
+    with open(osp.join(rootpath, 'data', 'sample_water_level_datafile.csv'),
+              encoding='utf8') as f:
+        lines = f.read().splitlines()
+    filepath = osp.join(tmp_path, 'water_level_datafile_without_et.csv')
+    with open(filepath, 'w', encoding='utf8') as f:
+        f.write('\n'.join(line.rsplit(',', 1)[0] for line in lines))
+    project.add_wldset('test_brf_wldset_without_et', WLDataset(filepath))
+    wldset = project.get_wldset('test_brf_wldset_without_et')
+    assert not np.any(np.nan_to_num(wldset['ET']))
+
+    brfmanager.set_wldset(wldset)
+    assert brfmanager.nlag_earthtides >= 0
+    qmsgbox_patcher = mocker.patch.object(
+        QMessageBox, 'warning', return_value=QMessageBox.Ok)
+    brfmanager.calc_brf()
+    assert qmsgbox_patcher.call_count == 0
+    assert wldset.brf_count() == 1
+    brf = wldset.get_brf(wldset.get_brfname_at(0))
+    assert brf[['B', 'SumB']].isnull().all().all()
+
+
+def test_calcul_brf_error(brfmanager, wldataset, mocker, qtbot):
+    """
+    Assert that the error raised when calculating the BRF is shown to
+    the user.
+    """
+    brfmanager.set_wldset(wldataset)
+    mocker.patch('gwhat.brf_mod.calc_brf',
+                 side_effect=ValueError('The regression is rank deficient.'))
+    qmsgbox_patcher = mocker.patch.object(
+        QMessageBox, 'warning', return_value=QMessageBox.Ok)
+
+    nbrf = wldataset.brf_count()
+    brfmanager.calc_brf()
+    assert qmsgbox_patcher.call_count == 1
+    assert 'rank deficient' in qmsgbox_patcher.call_args[0][2]
+    assert wldataset.brf_count() == nbrf
+
+
 # =============================================================================
 # ---- Tests BRFViewer
 # =============================================================================
-@pytest.mark.skipif(os.name == 'posix',
-                    reason="This feature is not supported on Linux")
 def test_save_brf_figure(brfmanager, wldataset, mocker, qtbot,
                          tmp_path_factory):
     """Test that the BRF figures are saved correctly from the GUI."""
@@ -158,8 +198,6 @@ def test_save_brf_figure(brfmanager, wldataset, mocker, qtbot,
     os.remove(filename)
 
 
-@pytest.mark.skipif(os.name == 'posix',
-                    reason="This feature is not supported on Linux")
 def test_graph_panel(brfmanager, wldataset, mocker, qtbot):
     brfmanager.set_wldset(wldataset)
 
@@ -217,8 +255,6 @@ def test_graph_panel(brfmanager, wldataset, mocker, qtbot):
     assert(brfmanager.viewer.graph_opt_panel.isVisible() is False)
 
 
-@pytest.mark.skipif(os.name == 'posix',
-                    reason="This feature is not supported on Linux")
 def test_import_viewer_params_in_manager(brfmanager, wldataset, mocker, qtbot):
     """
     Test importing the parameters of the BRF shown in the viewer in the manager
@@ -250,8 +286,6 @@ def test_import_viewer_params_in_manager(brfmanager, wldataset, mocker, qtbot):
     assert brfmanager.detrend_waterlevels is True
 
 
-@pytest.mark.skipif(os.name == 'posix',
-                    reason="This feature is not supported on Linux")
 def test_del_brf_result(brfmanager, wldataset, mocker, qtbot):
     """Test that the BRF results are deleted correctly."""
     brfmanager.set_wldset(wldataset)
@@ -263,8 +297,6 @@ def test_del_brf_result(brfmanager, wldataset, mocker, qtbot):
     assert brfmanager.viewer.toolbar.isEnabled() is False
 
 
-@pytest.mark.skipif(os.name == 'posix',
-                    reason="This feature is not supported on Linux")
 def test_del_all_brf_result(brfmanager, wldataset, mocker, qtbot):
     """Test that the BRF results are deleted correctly."""
     brfmanager.set_wldset(wldataset)
@@ -287,8 +319,26 @@ def test_del_all_brf_result(brfmanager, wldataset, mocker, qtbot):
     assert brfmanager.viewer.toolbar.isEnabled() is False
 
 
-@pytest.mark.skipif(os.name == 'posix',
-                    reason="This feature is not supported on Linux")
+def test_correct_waterlevels_with_brf(brfmanager, wldataset, mocker, qtbot):
+    """
+    Test that the water levels are corrected with the BRF currently
+    displayed in the viewer.
+    """
+    brfmanager.set_wldset(wldataset)
+    brfmanager.calc_brf()
+    assert brfmanager.viewer.current_brf.value() == 1
+    assert wldataset.corrected_waterlevels is None
+
+    qtbot.mouseClick(brfmanager.viewer.btn_correct_wl, Qt.LeftButton)
+    assert wldataset.corrected_waterlevels is not None
+    assert wldataset.dset['WLcorrection'].attrs['brf'] == (
+        wldataset.get_brfname_at(0))
+
+    # Assert that the correction is deleted along with the BRF.
+    qtbot.mouseClick(brfmanager.viewer.btn_del, Qt.LeftButton)
+    assert wldataset.corrected_waterlevels is None
+
+
 def test_sync_bp_and_et_lags(brfmanager, wldataset, qtbot):
     """Test that linking the BP and ET is working as expected."""
     brfmanager.set_wldset(wldataset)
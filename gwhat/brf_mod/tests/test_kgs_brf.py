@@ -9,13 +9,18 @@
 # Standard library imports
 import os
 import os.path as osp
+from shutil import copyfile
+import subprocess
 
 # Third party imports
 import numpy as np
 import pytest
 
 # Local imports
-from gwhat.brf_mod.kgs_brf import read_brf_output
+from gwhat.brf_mod import kgs_brf
+from gwhat.brf_mod.kgs_brf import (
+    read_brf_output, calc_brf, calc_sliding_brf, correct_waterlevels,
+    regularize_brf_data, BRF_COLUMNS, KGSBRFJob, KGSBRFExecutor)
 from gwhat.brf_mod import __install_dir__
 
 BRFOUT_FNAME = osp.join(
@@ -64,5 +69,296 @@ def test_read_brf_output():
             assert a == b
 
 
+@pytest.mark.parametrize('nlines', [1, 4])
+def test_read_truncated_brf_output(tmp_path, nlines):
+    """
+    Test that an error is raised when reading an output data textfile from
+    the KGS_BRF software that is truncated.
+    """
+    with open(BRFOUT_FNAME, 'r') as f:
+        lines = f.read().splitlines()
+    filename = osp.join(tmp_path, 'BRFOutput.txt')
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines[:-nlines]))
+    with pytest.raises(ValueError):
+        read_brf_output(filename)
+
+    # Assert that an error is raised if the header of the results is
+    # missing or the results contain non-numeric values.
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines[:13]))
+    with pytest.raises(ValueError):
+        read_brf_output(filename)
+
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines[:-1] + ['  ******************']))
+    with pytest.raises(ValueError):
+        read_brf_output(filename)
+
+
+@pytest.fixture
+def brf_data():
+    """
+    Return synthetic water levels, barometric pressure and Earth tides
+    data for a well with a known BRF.
+    """
+    rng = np.random.default_rng(0)
+    n = 3000
+    time = 41334 + np.arange(n) / 96
+    bp = 10 + np.cumsum(rng.normal(0, 0.01, n))
+    et = 500 * np.sin(2 * np.pi * time / 0.5175)
+
+    # The water level heights respond to the changes in barometric
+    # pressure and Earth tides with a known response, plus a trend.
+    dbp = np.diff(bp * 3.28084)
+    det = np.diff(et)
+    dh = (np.convolve(dbp, [0.5, -0.1, 0.05])[:n - 1] +
+          np.convolve(det, [1e-5, -2e-6])[:n - 1] +
+          10**-4 + rng.normal(0, 10**-5, n - 1))
+    wl = 5 - np.concatenate(([0], np.cumsum(dh))) / 3.28084
+    return time, wl, bp, et
+
+
+def test_calc_brf(brf_data):
+    """Test that the BRF is calculated as expected from the data."""
+    time, wl, bp, et = brf_data
+    dataf = calc_brf(time, wl, bp, et, lagBP=4, lagET=1,
+                     detrend_waterlevels=True)
+
+    # Assert that the results are in the same format as the output data
+    # file of kgs_brf.exe.
+    expected_dataf = read_brf_output(BRFOUT_FNAME)
+    assert dataf.index.name == expected_dataf.index.name
+    assert list(dataf.columns) == list(expected_dataf.columns)
+    assert dataf.index.tolist() == [0, 1, 2, 3, 4]
+    assert np.allclose(dataf['Lag'], dataf.index * 0.010417)
+
+    # Assert that the known response is recovered.
+    assert np.allclose(dataf['A'], [0.5, -0.1, 0.05, 0, 0], atol=10**-3)
+    assert np.allclose(
+        dataf['SumA'], [0.5, 0.4, 0.45, 0.45, 0.45], atol=10**-3)
+    assert np.allclose(dataf['B'][:2], [1e-5, -2e-6], atol=10**-7)
+    assert dataf['B'][2:].isnull().all()
+    assert np.all(dataf['sdA'] > 0)
+    assert np.all(np.diff(dataf['sdSumA']) > 0)
+
+    # Assert that the standard error of the first cumulative sum is that
+    # of the first coefficient.
+    assert dataf['sdSumA'][0] == dataf['sdA'][0]
+
+
+def test_calc_brf_without_earthtides(brf_data):
+    """
+    Test that the BRF is calculated as expected when Earth tides are
+    not used.
+    """
+    time, wl, bp, et = brf_data
+    dataf = calc_brf(time, wl, bp, et, lagBP=2, lagET=-1,
+                     detrend_waterlevels=False)
+    assert len(dataf) == 3
+    assert dataf[['B', 'sdB', 'SumB', 'sdSumB']].isnull().all().all()
+    assert np.allclose(dataf['A'], [0.5, -0.1, 0.05], atol=10**-2)
+
+    with pytest.raises(ValueError):
+        calc_brf(time[:3], wl[:3], bp[:3], et[:3], lagBP=2, lagET=-1)
+
+
+def test_calc_brf_rank_deficient(brf_data):
+    """
+    Test that a clear error is raised when the BRF is calculated with
+    Earth tides lags, but without Earth tides data.
+    """
+    time, wl, bp, et = brf_data
+    with pytest.raises(ValueError, match='rank deficient'):
+        calc_brf(time, wl, bp, np.zeros(len(time)), lagBP=2, lagET=2)
+
+
+def test_calc_brf_with_gaps(brf_data):
+    """
+    Test that the BRF is calculated as expected from data that were
+    regularized and that contain gaps.
+    """
+    time, wl, bp, et = brf_data
+    expected = calc_brf(time, wl, bp, et, lagBP=4, lagET=1)
+
+    # Remove a short and a long gap of data and add an irregular
+    # timestamp in the data.
+    keep = np.ones(len(time), dtype=bool)
+    keep[500:502] = False
+    keep[1500:1600] = False
+    time = np.insert(time[keep], 10, time[10] + 1 / 86400 * 20)
+    wl, bp, et = (np.insert(x[keep], 10, x[10]) for x in (wl, bp, et))
+
+    time, wl, bp, et, isgap = regularize_brf_data(time, wl, bp, et)
+    assert len(time) == len(brf_data[0])
+    assert np.array_equal(
+        np.where(np.any(isgap, axis=1))[0], np.arange(1500, 1600))
+    assert np.isnan(wl[1500:1600]).all()
+
+    dataf = calc_brf(time, wl, bp, et, lagBP=4, lagET=1)
+    assert np.allclose(dataf['A'], expected['A'], atol=10**-3)
+    assert np.allclose(dataf['B'][:2], expected['B'][:2], atol=10**-6)
+
+
+def test_calc_sliding_brf(brf_data):
+    """
+    Test that the BRF calculated for sliding windows are the same as those
+    calculated separately with the data of each window.
+    """
+    time, wl, bp, et = brf_data
+    wl = wl.copy()
+    wl[2000] = np.nan
+    windows, brfs = calc_sliding_brf(
+        time, wl, bp, et, lagBP=4, lagET=1, window=8, step=2)
+
+    # The data cover 31.25 days, so that 12 windows of 8 days stepped
+    # every 2 days can be fitted after the first 4 lags.
+    assert windows.shape == (12, 2)
+    assert brfs.shape == (12, 5, len(BRF_COLUMNS))
+    assert np.allclose(np.diff(windows, axis=1), 8)
+    assert np.allclose(np.diff(windows[:, 0]), 2)
+    for i in [0, 5, 11]:
+        istart = np.argmin(np.abs(time - windows[i, 0])) - 4
+        iend = np.argmin(np.abs(time - windows[i, 1])) + 1
+        if istart <= 2000 < iend:
+            continue
+        expected = calc_brf(time[istart:iend], wl[istart:iend],
+                            bp[istart:iend], et[istart:iend], 4, 1)
+        assert np.allclose(brfs[i], expected.values, equal_nan=True)
+
+    # Assert that the windows with missing values are still calculated
+    # with the remaining valid data.
+    assert not np.isnan(brfs[:, :, BRF_COLUMNS.index('A')]).any()
+    assert np.allclose(
+        brfs[:, :, BRF_COLUMNS.index('A')], [0.5, -0.1, 0.05, 0, 0],
+        atol=10**-2)
+
+    with pytest.raises(ValueError):
+        calc_sliding_brf(time, wl, bp, et, 4, 1, window=60, step=2)
+
+
+def test_correct_waterlevels(brf_data):
+    """
+    Test that the response to the changes in barometric pressure and Earth
+    tides is removed from the water levels with the BRF.
+    """
+    time, wl, bp, et = brf_data
+    brf = calc_brf(time, wl, bp, et, lagBP=4, lagET=1)
+    corrected = correct_waterlevels(time, wl, bp, et, brf)
+
+    # Only the trend and the noise must remain in the corrected water
+    # levels, which are depths in meters.
+    assert corrected[0] == wl[0]
+    assert np.allclose(
+        np.diff(corrected), -10**-4 / 3.28084, atol=10**-4 / 3.28084)
+    assert np.std(np.diff(corrected)) < np.std(np.diff(wl)) / 10
+
+    # Assert that the water levels whose correction depends on missing
+    # barometric pressure data are set to NaN.
+    expected = corrected
+    bp = bp.copy()
+    bp[1000] = np.nan
+    corrected = correct_waterlevels(time, wl, bp, et, brf)
+    assert np.isnan(corrected).sum() == 6
+    assert np.isnan(corrected[1000:1006]).all()
+
+    # Assert that the changes in barometric pressure across a gap are
+    # kept, so that the water levels after the gap are corrected as if
+    # there were no gap.
+    assert np.allclose(corrected[:1000], expected[:1000], rtol=0, atol=1e-12)
+    assert np.allclose(corrected[1006:], expected[1006:], rtol=0, atol=1e-12)
+
+    gap_bp = bp.copy()
+    gap_bp[1500:1520] = np.nan
+    gap_bp[1520:] += 0.3
+    gap_wl = wl - np.where(np.arange(len(wl)) >= 1520, 0.3 * 0.45, 0)
+    corrected = correct_waterlevels(time, gap_wl, gap_bp, et, brf)
+    assert np.isnan(corrected[1500:1525]).all()
+    assert np.allclose(corrected[1525:], expected[1525:], rtol=0, atol=1e-3)
+
+    # Assert that the water levels that are not sampled at the interval of
+    # the BRF are corrected with the data resampled on a regular grid.
+    bp[1000] = bp[999]
+    jittered_time = time + np.random.default_rng(1).uniform(
+        -5, 5, len(time)) / 86400
+    corrected = correct_waterlevels(jittered_time, wl, bp, et, brf)
+    expected = correct_waterlevels(time, wl, bp, et, brf)
+    assert not np.isnan(corrected).any()
+    assert np.allclose(corrected, expected, atol=10**-4)
+
+
+def test_kgsbrf_jobs(brf_data, mocker):
+    """
+    Test that BRF jobs run with the KGS_BRF program in separate working
+    directories and that their results are collected as expected.
+    """
+    time, wl, bp, et = brf_data
+    workdirs = []
+
+    def run_kgsbrf(workdir):
+        # Mock the KGS_BRF program, which is only available on Windows,
+        # by copying the sample output data file in the working directory.
+        with open(osp.join(workdir, 'kgs_brf.par')) as f:
+            assert osp.join(workdir, 'BRFInput.txt') in f.read()
+        with open(osp.join(workdir, 'BRFInput.txt')) as f:
+            well = f.read().splitlines()[1]
+        workdirs.append((workdir, well))
+        copyfile(BRFOUT_FNAME, osp.join(workdir, 'BRFOutput.txt'))
+    mocker.patch('gwhat.brf_mod.kgs_brf.run_kgsbrf', side_effect=run_kgsbrf)
+
+    job = KGSBRFJob('well0', time, wl, bp, et, lagBP=4, lagET=6)
+    assert not job.done()
+    with pytest.raises(RuntimeError):
+        job.result()
+
+    with KGSBRFExecutor(max_workers=2) as executor:
+        assert executor.max_workers == 2
+        jobs = [executor.submit(KGSBRFJob(
+            'well%d' % i, time, wl, bp, et, lagBP=4, lagET=6))
+            for i in range(4)]
+        completed_jobs = list(executor.as_completed(jobs))
+    assert sorted(completed_jobs, key=jobs.index) == jobs
+
+    expected_dataf = read_brf_output(BRFOUT_FNAME)
+    for job in jobs:
+        assert job.done()
+        assert job.result().equals(expected_dataf)
+
+    # Assert that each job used its own working directory, which was
+    # deleted once the job was completed.
+    assert len(set(workdir for workdir, well in workdirs)) == 4
+    assert sorted(well for workdir, well in workdirs) == [
+        'Well: well%d' % i for i in range(4)]
+    assert not any(osp.exists(workdir) for workdir, well in workdirs)
+    assert not osp.exists(osp.join(__install_dir__, 'BRFInput.txt'))
+
+
+def test_run_kgsbrf_errors(brf_data, tmp_path, mocker):
+    """
+    Test that a clear error is raised when the KGS_BRF program cannot be
+    run or exits with an error.
+    """
+    time, wl, bp, et = brf_data
+    job = KGSBRFJob('well0', time, wl, bp, et, lagBP=4, lagET=6)
+
+    mocker.patch.object(os, 'name', 'posix')
+    with pytest.raises(OSError, match='only be run on Windows'):
+        job.run()
+
+    mocker.patch.object(os, 'name', 'nt')
+    mocker.patch.object(kgs_brf, '__install_dir__', str(tmp_path))
+    with pytest.raises(FileNotFoundError, match='not installed'):
+        job.run()
+
+    # Assert that the exit status of the program is checked.
+    open(osp.join(tmp_path, 'kgs_brf.exe'), 'w').close()
+    mocker.patch.object(
+        subprocess, 'run',
+        side_effect=subprocess.CalledProcessError(1, 'kgs_brf.exe'))
+    with pytest.raises(subprocess.CalledProcessError):
+        job.run()
+    assert subprocess.run.call_args[1]['check'] is True
+
+
 if __name__ == "__main__":
     pytest.main(['-x', __file__, '-v', '-rw'])
@@ -16,6 +16,8 @@ from shutil import rmtree
 
 # ---- Third party imports
 import numpy as np
+import openpyxl
+import xlrd
 import xlsxwriter
 import xlwt
 
@@ -99,6 +101,57 @@ def save_content_to_excel(fname, fcontent):
             raise PermissionError
 
 
+def iter_csv_rows(csvfile, delimiter=','):
+    """
+    Parse and yield the rows of an open csv file one line at a time, so that
+    the position of the file can be used to read the rest of the file.
+    """
+    while True:
+        line = csvfile.readline()
+        if not line:
+            return
+        yield next(csv.reader([line], delimiter=delimiter), [])
+
+
+def iter_excel_rows(filename):
+    """
+    Yield the values of the rows of the first sheet of a xls or xlsx file
+    one row at a time.
+
+    Xlsx files are opened in read-only mode, so that the rows are streamed
+    from the file without loading the whole workbook in memory. Empty cells
+    are returned as None and numerical values that are integers are
+    returned as int, as it is done in pandas.
+    """
+    root, ext = osp.splitext(filename)
+    if ext.lower() == '.xls':
+        with xlrd.open_workbook(filename, on_demand=True) as wb:
+            sheet = wb.sheet_by_index(0)
+            for rowx in range(sheet.nrows):
+                yield [_format_excel_value(value) for value in
+                       sheet.row_values(rowx, start_colx=0, end_colx=None)]
+    elif ext.lower() == '.xlsx':
+        workbook = openpyxl.load_workbook(
+            filename, read_only=True, data_only=True)
+        try:
+            sheet = workbook[workbook.sheetnames[0]]
+            for row in sheet.iter_rows(min_col=1, values_only=True):
+                yield [_format_excel_value(value) for value in row]
+        finally:
+            workbook.close()
+    else:
+        raise ValueError("Supported file format are: ", ['.xls', '.xlsx'])
+
+
+def _format_excel_value(value):
+    """Format a value read from an Excel file."""
+    if isinstance(value, str) and value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
 def create_dirname(fname):
     """Create the dirname of a file if it doesn't exists."""
     dirname = osp.dirname(fname)
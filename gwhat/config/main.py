@@ -29,7 +29,9 @@ DEFAULTS = [
          'fontsize_console': 12,
          'fontsize_menubar': 12,
          'last_project_filepath': '../Projects/Example/Example.gwt',
-         'mainwindow_current_tab': 0
+         'mainwindow_current_tab': 0,
+         'datafile_cache_enabled': True,
+         'datafile_cache_max_size': 256
          }
      ),
     ('hydrocalc',
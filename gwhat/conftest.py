@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+# ---- Standard imports
+import os
+import os.path as osp
+os.environ['GWHAT_PYTEST'] = 'True'
+
+# ---- Third party imports
+import pytest
+
+# ---- Local imports
+from gwhat.config.main import CONFIG_DIR
+from gwhat.utils import datacache
+
+
+# ---- Pytest Fixtures
+@pytest.fixture(scope='session', autouse=True)
+def clear_pytest_datacache():
+    """
+    Clear the data file cache of the pytest config directory, which is
+    still used by the processes spawned by the tests, so that no data
+    cached in a previous session are used.
+    """
+    assert CONFIG_DIR.endswith('_pytest')
+    datacache.clear_datacache()
+    yield
+    datacache.clear_datacache()
+
+
+@pytest.fixture(autouse=True)
+def datacache_dir(tmp_path, monkeypatch):
+    """
+    Cache the data files parsed by each test in a temporary directory,
+    so that the tests do not share their cached data.
+    """
+    cache_dir = osp.join(tmp_path, 'datafile_cache')
+    monkeypatch.setattr(datacache, 'get_datacache_dir', lambda: cache_dir)
+    return cache_dir
@@ -27,6 +27,25 @@ from gwhat.gwrecharge.gwrecharge_calculs import (calcul_surf_water_budget,
                                                  calc_hydrograph_forward)
 
 
+def fill_missing_weather_data(data):
+    """
+    Return a copy of the daily weather data in which the values that are
+    still missing, for example on the days for which none of the stations
+    of a blended weather dataset has data, are filled.
+
+    The missing precipitation is set to 0, while the missing temperature
+    and potential evapotranspiration are linearly interpolated.
+    """
+    data = data.copy()
+    for var in ['Ptot', 'Rain', 'Snow']:
+        if var in data.columns:
+            data[var] = data[var].fillna(0)
+    for var in ['Tmax', 'Tavg', 'Tmin', 'PET']:
+        if var in data.columns:
+            data[var] = data[var].interpolate(limit_direction='both')
+    return data
+
+
 class RechgEvalWorker(QObject):
 
     sig_glue_progress = QSignal(float)
@@ -35,6 +54,7 @@ class RechgEvalWorker(QObject):
     def __init__(self):
         super(RechgEvalWorker, self).__init__()
         self.wxdset = None
+        self.wxdata = None
         self.ETP, self.PTOT, self.TAVG = [], [], []
 
         self.wldset = None
@@ -55,6 +75,10 @@ class RechgEvalWorker(QObject):
         self.rmse_cutoff = 0
         self.rmse_cutoff_enabled = 0
 
+        # Whether to use the water levels corrected for the effects of
+        # barometric pressure and Earth tides.
+        self.use_corrected_waterlevels = False
+
     @property
     def language(self):
         return self.__language
@@ -89,9 +113,10 @@ class RechgEvalWorker(QObject):
         # Setup weather data.
 
         self.wxdset = wxdset
-        self.ETP = self.wxdset.data['PET'].values
-        self.PTOT = self.wxdset.data['Ptot'].values
-        self.TAVG = self.wxdset.data['Tavg'].values
+        self.wxdata = fill_missing_weather_data(wxdset.data)
+        self.ETP = self.wxdata['PET'].values
+        self.PTOT = self.wxdata['Ptot'].values
+        self.TAVG = self.wxdata['Tavg'].values
         self.tweatr = self.wxdset.get_xldates() + self.deltat
         # We introduce a time lag here to take into account the travel time
         # through the unsaturated zone.
@@ -100,8 +125,16 @@ class RechgEvalWorker(QObject):
 
         self.wldset = wldset
         self.A, self.B = wldset.get_mrc()['params']
-        self.twlvl, self.wlobs = self.make_data_daily(
-            wldset.xldates, wldset['WL'])
+        if self.use_corrected_waterlevels:
+            if wldset.corrected_waterlevels is None:
+                error = ("Groundwater recharge cannot be computed with the"
+                         " corrected water levels because they were not"
+                         " calculated for this dataset.")
+                return error
+            wlobs = wldset.corrected_waterlevels
+        else:
+            wlobs = wldset['WL']
+        self.twlvl, self.wlobs = self.make_data_daily(wldset.xldates, wlobs)
 
         if pd.isnull(self.A) and pd.isnull(self.B):
             error = ("Groundwater recharge cannot be computed because a"
@@ -242,12 +275,12 @@ class RechgEvalWorker(QObject):
         glue_rawdata['water levels']['time'] = self.twlvl
         glue_rawdata['water levels']['observed'] = self.wlobs
 
-        glue_rawdata['Weather'] = {'Tmax': self.wxdset.data['Tmax'].values,
-                                   'Tmin': self.wxdset.data['Tmin'].values,
-                                   'Tavg': self.wxdset.data['Tavg'].values,
-                                   'Ptot': self.wxdset.data['Ptot'].values,
-                                   'Rain': self.wxdset.data['Rain'].values,
-                                   'PET': self.wxdset.data['PET'].values}
+        glue_rawdata['Weather'] = {'Tmax': self.wxdata['Tmax'].values,
+                                   'Tmin': self.wxdata['Tmin'].values,
+                                   'Tavg': self.wxdata['Tavg'].values,
+                                   'Ptot': self.wxdata['Ptot'].values,
+                                   'Rain': self.wxdata['Rain'].values,
+                                   'PET': self.wxdata['PET'].values}
 
         # Save the water levels simulated with the mrc, as well as and values
         # of the parameters that characterized this mrc.
@@ -17,7 +17,7 @@ from PyQt5.QtCore import pyqtSlot as QSlot
 from PyQt5.QtCore import pyqtSignal as QSignal
 from PyQt5.QtWidgets import (
     QWidget, QGridLayout, QPushButton, QProgressBar, QLabel, QScrollArea,
-    QApplication, QMessageBox, QFrame, QCheckBox, QGroupBox)
+    QApplication, QMessageBox, QFrame, QCheckBox, QGroupBox, QSpinBox)
 
 # ---- Local imports
 from gwhat.widgets.buttons import ExportDataButton
@@ -40,6 +40,7 @@ class RechgEvalWidget(QFrame):
 
         self.wxdset = None
         self.wldset = None
+        self.projet = None
         self.figstack = FigureStackManager()
 
         self.progressbar = QProgressBar()
@@ -291,6 +292,42 @@ class RechgEvalWidget(QFrame):
 
         cutoff_layout.setColumnStretch(cutoff_layout.columnCount() + 1, 1)
 
+        # Setup the observed water levels group widget.
+        self.corrected_wl_cbox = QCheckBox(
+            'Use water levels corrected with the BRF')
+        self.corrected_wl_cbox.setToolTip(
+            "<p>Use the water levels corrected for the effects of "
+            "barometric pressure and Earth tides with the BRF tool "
+            "to evaluate the models.</p>")
+
+        waterlevels_group = QGroupBox('Observed Water Levels')
+        waterlevels_layout = QGridLayout(waterlevels_group)
+        waterlevels_layout.addWidget(self.corrected_wl_cbox, 0, 0)
+
+        # Setup the weather data group widget.
+        self.blend_wxdsets_cbox = QCheckBox(
+            'Blend the data of the closest weather stations')
+        self.blend_wxdsets_cbox.setToolTip(
+            "<p>Use an inverse-distance-weighted blend of the daily weather "
+            "data of the closest weather stations of the project instead "
+            "of the data of the selected weather station. The missing data "
+            "of a station are filled with the data of the other stations."
+            "</p><p>On the days for which none of the stations has data, "
+            "the precipitation is set to 0 and the temperature is "
+            "interpolated.</p>")
+        self.blend_nstations_sbox = QSpinBox()
+        self.blend_nstations_sbox.setRange(2, 10)
+        self.blend_nstations_sbox.setValue(3)
+        self.blend_nstations_sbox.setToolTip(
+            "<p>The number of closest weather stations to blend.</p>")
+
+        weather_group = QGroupBox('Weather Data')
+        weather_layout = QGridLayout(weather_group)
+        weather_layout.addWidget(self.blend_wxdsets_cbox, 0, 0)
+        weather_layout.addWidget(self.blend_nstations_sbox, 0, 1)
+        weather_layout.addWidget(QLabel('stations'), 0, 2)
+        weather_layout.setColumnStretch(3, 1)
+
         # Setup the scroll area.
         scroll_area_widget = QFrame()
         scroll_area_widget.setObjectName("viewport")
@@ -303,7 +340,9 @@ class RechgEvalWidget(QFrame):
         scroll_area_layout.addWidget(params_space_group, 0, 0)
         scroll_area_layout.addWidget(secondary_group, 1, 0)
         scroll_area_layout.addWidget(cutoff_group, 2, 0)
-        scroll_area_layout.setRowStretch(3, 100)
+        scroll_area_layout.addWidget(waterlevels_group, 3, 0)
+        scroll_area_layout.addWidget(weather_group, 4, 0)
+        scroll_area_layout.setRowStretch(5, 100)
 
         qtitle = QLabel('Parameter Range')
         qtitle.setAlignment(Qt.AlignCenter)
@@ -363,6 +402,24 @@ class RechgEvalWidget(QFrame):
         self.wxdset = wxdset
         self.setEnabled(self.wldset is not None and self.wxdset is not None)
 
+    def set_projet(self, projet):
+        """
+        Set the project from which the weather datasets are blended.
+        """
+        self.projet = projet
+
+    def get_wxdset(self):
+        """
+        Return the weather dataset used to evaluate recharge, which is
+        either the selected weather dataset or a blend of the weather
+        datasets closest to the selected water level dataset.
+        """
+        if (not self.blend_wxdsets_cbox.isChecked() or
+                self.projet is None or self.wldset is None):
+            return self.wxdset
+        return self.projet.get_blended_wxdset(
+            self.wldset.name, k=self.blend_nstations_sbox.value())
+
     def _setup_ranges_from_wldset(self, gluedf):
         """
         Set the parameter range values from the last values that were used
@@ -449,9 +506,18 @@ class RechgEvalWidget(QFrame):
         self.rechg_worker.rmse_cutoff = self.rmsecutoff_sbox.value()
         self.rechg_worker.rmse_cutoff_enabled = int(
             self.rmsecutoff_cbox.isChecked())
+        self.rechg_worker.use_corrected_waterlevels = (
+            self.corrected_wl_cbox.isChecked())
 
         # Set the data and check for errors.
-        error = self.rechg_worker.load_data(self.wxdset, self.wldset)
+        try:
+            wxdset = self.get_wxdset()
+        except (ValueError, KeyError) as e:
+            error = ("The weather data could not be blended because of the "
+                     "following error:<br><br>{}").format(e)
+            QMessageBox.warning(self, 'Warning', error, QMessageBox.Ok)
+            return
+        error = self.rechg_worker.load_data(wxdset, self.wldset)
         if error is not None:
             QMessageBox.warning(self, 'Warning', error, QMessageBox.Ok)
             return
@@ -12,13 +12,18 @@ import os.path as osp
 from shutil import copyfile
 
 # ---- Third party imports
+import numpy as np
+import pandas as pd
 import pytest
 from PyQt5.QtCore import Qt
 
 # ---- Local library imports
 from gwhat import __rootdir__
 from gwhat.projet.reader_projet import ProjetReader
+from gwhat.projet.reader_waterlvl import WLDataset
+from gwhat.meteo.weather_reader import WXDataFrame
 from gwhat.gwrecharge.gwrecharge_gui import RechgEvalWidget
+from gwhat.gwrecharge.gwrecharge_calc2 import RechgEvalWorker
 
 
 # =============================================================================
@@ -63,5 +68,66 @@ def test_calc_gwrecharge(gwrecharge_widget, project, qtbot):
     assert gwrecharge_widget.wldset.glue_count() == 1
 
 
+def test_calc_gwrecharge_blended_wxdset(qtbot, tmp_path):
+    """
+    Test that the weather data used to calculate groundwater recharge can be
+    blended from the closest weather stations and that the days for which
+    none of the stations has data are filled as expected.
+    """
+    project = ProjetReader(osp.join(tmp_path, 'test_blended_wxdset.gwt'))
+
+    wldset = WLDataset(osp.join(
+        __rootdir__, 'brf_mod', 'tests', 'data',
+        'sample_water_level_datafile.csv'))
+    project.add_wldset('wldset', wldset)
+    wldset = project.get_wldset('wldset')
+    wldset.set_mrc(0.1, 0.2, [], [], [], 0, 0, 0)
+
+    # Add two weather datasets that overlap the water level data in time
+    # and that have no data on the same day.
+    wxdset = WXDataFrame(osp.join(
+        __rootdir__, 'projet', 'tests', 'data', 'sample_weather_datafile.csv'))
+    wxdset.data.index = pd.date_range(
+        '2013-03-01', periods=len(wxdset.data), freq='D')
+    wxdset.data['Tavg'] = np.arange(len(wxdset.data), dtype=float)
+    nodata_day = pd.DatetimeIndex(['2013-03-05'])
+    for var in ['Ptot', 'Rain', 'Snow', 'Tmax', 'Tavg', 'Tmin', 'PET']:
+        wxdset.data.loc[nodata_day, var] = np.nan
+        wxdset.missing_value_indexes[var] = nodata_day
+    for name, lat, lon in [('closest', 45.7, -73.3), ('close', 45.5, -73.0)]:
+        wxdset.metadata['Station Name'] = name
+        wxdset.metadata['Latitude'] = lat
+        wxdset.metadata['Longitude'] = lon
+        project.add_wxdset(name, wxdset)
+
+    # The blended weather data are left undefined on the day without data.
+    blended_wxdset = project.get_blended_wxdset('wldset', k=2)
+    assert blended_wxdset.data.loc[nodata_day, 'Ptot'].isnull().all()
+
+    # Make sure the missing precipitation is set to 0 and the missing
+    # temperature is interpolated when evaluating recharge.
+    rechg_worker = RechgEvalWorker()
+    assert rechg_worker.load_data(blended_wxdset, wldset) is None
+    assert not np.isnan(rechg_worker.PTOT).any()
+    assert not np.isnan(rechg_worker.TAVG).any()
+    assert not np.isnan(rechg_worker.ETP).any()
+    assert rechg_worker.PTOT[4] == 0
+    assert rechg_worker.TAVG[4] == 4
+
+    # Make sure the blended weather data are used when requested in the
+    # widget to evaluate recharge.
+    gwrecharge_widget = RechgEvalWidget()
+    qtbot.addWidget(gwrecharge_widget)
+    gwrecharge_widget.set_projet(project)
+    gwrecharge_widget.set_wldset(wldset)
+    gwrecharge_widget.set_wxdset(project.get_wxdset('close'))
+    assert gwrecharge_widget.get_wxdset().name == 'close'
+
+    gwrecharge_widget.blend_wxdsets_cbox.setChecked(True)
+    gwrecharge_widget.blend_nstations_sbox.setValue(2)
+    assert gwrecharge_widget.get_wxdset() is blended_wxdset
+    project.close()
+
+
 if __name__ == "__main__":
     pytest.main(['-x', __file__, '-v', '-rw'])
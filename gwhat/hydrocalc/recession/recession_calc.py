@@ -12,6 +12,7 @@ from __future__ import annotations
 # ---- Standard library imports
 from functools import partial
 from collections import namedtuple
+from concurrent.futures import as_completed
 
 # ---- Third party imports
 import numpy as np
@@ -20,6 +21,62 @@ from scipy.optimize import curve_fit
 
 # ---- Local imports
 from gwhat.utils.math import calc_goodness_of_fit
+from gwhat.utils.concurrency import (
+    get_max_workers, create_process_pool, call_safely)
+
+MAX_MRC_WORKERS = 4
+
+# The coefficients of the master recession curve equation, which is
+# defined at the module level so that it can be pickled.
+Coeffs = namedtuple('Coeffs', ['B', 'A'])
+
+
+def _solve_linear_recurrence(r: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """
+    Return the solution of the linear recurrence x[i] = r[i] * x[i-1] + u[i],
+    where x[-1] = 0.
+
+    The recurrence is solved with a vectorized scan that composes the affine
+    maps x -> r[i] * x + u[i] over intervals of doubling length, so that
+    only log2(n) numpy passes are needed. Values of r equal to 0 break the
+    recurrence, so that the scan can stop as soon as all the products of
+    r over the current interval length are 0.
+    """
+    r = np.array(r, dtype=float)
+    x = np.array(u, dtype=float)
+    shift = 1
+    while shift < len(x):
+        x[shift:] = r[shift:] * x[:-shift] + x[shift:]
+        r[shift:] = r[shift:] * r[:-shift]
+        r[:shift] = 0
+        if not r.any():
+            break
+        shift *= 2
+    return x
+
+
+def _calc_recession_lumps(tdeltas: np.ndarray, B: float, A: float):
+    """
+    Return the time steps of the recession segments along with the
+    coefficients r and c of the discretized master recession curve equation
+    hp[i] = r[i] * hp[i-1] + c[i], which is obtained by integrating
+    ∂h/∂t = -A * h + B with the trapezoidal rule.
+
+    Values of r and c are 0 at the start of each recession segment.
+    """
+    tdeltas = np.asarray(tdeltas, dtype=float)
+    dt = np.zeros(len(tdeltas))
+    dt[1:] = np.diff(tdeltas)
+    is_start = (tdeltas == 0)
+    if len(is_start):
+        is_start[0] = True
+    dt[is_start] = 0
+
+    LUMP3 = (1 + A * dt / 2)**-1
+    r = (1 - A * dt / 2) * LUMP3
+    c = B * dt * LUMP3
+    r[is_start] = 0
+    return dt, is_start, r, c, LUMP3
 
 
 def predict_recession(tdeltas: np.ndarray, B: float, A: float,
@@ -45,22 +102,97 @@ def predict_recession(tdeltas: np.ndarray, B: float, A: float,
         Predicted water levels in meters below the ground surface.
 
     """
-    hp = np.ones(len(h)) * np.nan
-    for i in range(len(tdeltas)):
-        if tdeltas[i] == 0:
-            hp[i] = h[i]
-        else:
-            dt = tdeltas[i] - tdeltas[i - 1]
-            LUMP1 = (1 - A * dt / 2)
-            LUMP2 = B * dt
-            LUMP3 = (1 + A * dt / 2)**-1
+    dt, is_start, r, c, _ = _calc_recession_lumps(tdeltas, B, A)
+    u = np.where(is_start, h, c)
+    return _solve_linear_recurrence(r, u)
 
-            hp[i] = (LUMP1 * hp[i - 1] + LUMP2) * LUMP3
 
-    return hp
+def predict_recession_jac(tdeltas: np.ndarray, B: float, A: float,
+                          h: np.ndarray) -> np.ndarray:
+    """
+    Return the Jacobian of the water levels predicted with
+    predict_recession with respect to the coefficients B and A of the
+    master recession curve equation.
 
+    Returns
+    -------
+    jac : np.ndarray
+        An array of shape (n, 2) containing the partial derivatives of the
+        predicted water levels with respect to B and A respectively.
+    """
+    dt, is_start, r, c, LUMP3 = _calc_recession_lumps(tdeltas, B, A)
+    hp = _solve_linear_recurrence(r, np.where(is_start, h, c))
+
+    # The derivatives of the predicted water levels follow the same
+    # recurrence as the predicted water levels, with a value of 0 at the
+    # start of each recession segment.
+    dr_dA = -dt * LUMP3**2
+    dc_dA = -B * dt**2 / 2 * LUMP3**2
+    dc_dB = dt * LUMP3
+
+    hp_prev = np.zeros(len(hp))
+    hp_prev[1:] = hp[:-1]
+    jac = np.empty((len(hp), 2))
+    jac[:, 0] = _solve_linear_recurrence(r, np.where(is_start, 0, dc_dB))
+    jac[:, 1] = _solve_linear_recurrence(
+        r, np.where(is_start, 0, hp_prev * dr_dA + dc_dA))
+    return jac
+
+
+class RecessionSegmentIndex(object):
+    """
+    An index of the recession segments of a hydrograph.
+
+    The indexes of the first and last time steps of each recession period
+    are found with a binary search over the sorted time axis and are cached,
+    so that only the periods that were added since the last time the
+    segments were extracted need to be searched.
+    """
 
-def calculate_mrc(t, h, periods: list(tuple), mrctype: int = 1):
+    def __init__(self, t: np.ndarray):
+        self.t = np.asarray(t, dtype=float)
+        self._bounds = {}
+
+    def get_bounds(self, period: tuple) -> tuple:
+        """
+        Return the index of the first time step and the index after the
+        last time step of the hydrograph that are within period.
+        """
+        key = (float(min(period)), float(max(period)))
+        if key not in self._bounds:
+            self._bounds[key] = (
+                int(np.searchsorted(self.t, key[0], side='left')),
+                int(np.searchsorted(self.t, key[1], side='right')))
+        return self._bounds[key]
+
+    def get_segments(self, periods: list(tuple)):
+        """
+        Return the indexes of the time steps of the recession segments
+        corresponding to periods and the time in days after the start of
+        the segment for each of these time steps, along with the indexes of
+        the first and after last time steps of each segment.
+
+        Segments that are smaller than two time steps are ignored.
+        """
+        bounds = np.array(
+            [self.get_bounds(period) for period in periods],
+            dtype=int).reshape(-1, 2)
+        bounds = bounds[(bounds[:, 1] - bounds[:, 0]) >= 2]
+        istart, iend = bounds[:, 0], bounds[:, 1]
+
+        # Build the indexes of all the segments at once in a single
+        # preallocated array.
+        lengths = iend - istart
+        offsets = np.cumsum(lengths) - lengths
+        seg_istart = np.repeat(istart, lengths)
+        index_seg = seg_istart + (
+            np.arange(np.sum(lengths)) - np.repeat(offsets, lengths))
+        tdeltas = self.t[index_seg] - self.t[seg_istart]
+        return index_seg, tdeltas, istart, iend
+
+
+def calculate_mrc(t, h, periods: list(tuple), mrctype: int = 1,
+                  segment_index: RecessionSegmentIndex = None):
     """
     Calculate the master recession curve (MRC).
 
@@ -77,6 +209,9 @@ def calculate_mrc(t, h, periods: list(tuple), mrctype: int = 1):
         Equation type of the MRC. The default is 1.
             mrctype = 0 -> linear (dh/dt = b)
             mrctype = 1 -> exponential (dh/dt = -a*h + b)
+    segment_index : RecessionSegmentIndex, optional
+        The index of the recession segments of the hydrograph. A new index
+        is created if None.
 
     Returns
     -------
@@ -93,46 +228,39 @@ def calculate_mrc(t, h, periods: list(tuple), mrctype: int = 1):
         The root mean square error (RMSE) of the water levels predicted
         with the MRC.
     """
-    index = np.arange(len(t)).astype(int)
+    if segment_index is None:
+        segment_index = RecessionSegmentIndex(t)
+    h = np.asarray(h)
 
     # Extract relevant information and data for each segment identified as
     # a recession period.
-    tdeltas = np.array([])
-    h_seg = np.array([])
-    t_seg = np.array([])
-    index_seg = np.array([], dtype=int)
-    B0_seg = []
-    for period in periods:
-        mask = (t >= min(period)) & (t <= max(period))
-        if len(mask) < 2:
-            # Segments that are smaller than two time steps are ignored.
-            continue
-
-        h_seg = np.append(h_seg, h[mask])
-        t_seg = np.append(t_seg, t[mask])
-        index_seg = np.append(index_seg, index[mask])
-        tdeltas = np.append(tdeltas, t[mask] - t[mask][0])
-        B0_seg.append((h[mask][-1] - h[mask][0]) / (t[mask][-1] - t[mask][0]))
+    index_seg, tdeltas, istart, iend = segment_index.get_segments(periods)
+    h_seg = h[index_seg]
 
     # Define initial guess for the parameters.
+    t = segment_index.t
     A0 = 0
-    B0 = np.mean(B0_seg)
+    B0 = np.mean(
+        (h[iend - 1] - h[istart]) / (t[iend - 1] - t[istart]))
 
     if mrctype == 1:  # exponential (dh/dt = -a*h + b)
         coeffs, coeffs_cov = curve_fit(
             f=partial(predict_recession, h=h_seg),
             xdata=tdeltas, ydata=h_seg,
             p0=[B0, A0],
-            bounds=([-np.inf, 0], [np.inf, np.inf]))
-        coeffs = namedtuple('Coeffs', ['B', 'A'])(*coeffs)
+            bounds=([-np.inf, 0], [np.inf, np.inf]),
+            jac=partial(predict_recession_jac, h=h_seg))
+        coeffs = Coeffs(*coeffs)
     elif mrctype == 0:  # linear (dh/dt = b)
         coeffs, coeffs_cov = curve_fit(
             f=partial(predict_recession, A=0, h=h_seg),
-            xdata=tdeltas, ydata=h_seg, p0=[B0])
+            xdata=tdeltas, ydata=h_seg, p0=[B0],
+            jac=lambda tdeltas, B: predict_recession_jac(
+                tdeltas, B, 0, h_seg)[:, :1])
 
         # In order to return a consistent signature regardless of the type
         # of the MRC equation, we return a value of 0 for the coefficient A.
-        coeffs = namedtuple('Coeffs', ['B', 'A'])(coeffs[0], 0)
+        coeffs = Coeffs(coeffs[0], 0)
 
     hp = np.zeros(len(t)) * np.nan
     hp[index_seg] = predict_recession(
@@ -143,6 +271,310 @@ def calculate_mrc(t, h, periods: list(tuple), mrctype: int = 1):
     return coeffs, hp, std_err, r_squared, rmse
 
 
+def find_recession_periods(t: np.ndarray, h: np.ndarray,
+                           min_length: float = 5,
+                           precip_time: np.ndarray = None,
+                           precip: np.ndarray = None,
+                           precip_threshold: float = 1,
+                           exclusion_window: float = 2) -> list(tuple):
+    """
+    Find the recession segments of a hydrograph, which are the falling
+    limbs of the hydrograph along which the water levels decrease
+    monotonically for at least min_length days.
+
+    Parameters
+    ----------
+    t : np.ndarray
+        Time in days since epoch.
+    h : np.ndarray
+        Water levels in meters below the ground surface.
+    min_length : float, optional
+        The minimum duration in days of the recession segments.
+        The default is 5.
+    precip_time : np.ndarray, optional
+        Time in days since epoch of the daily precipitation values.
+    precip : np.ndarray, optional
+        Daily precipitation in mm.
+    precip_threshold : float, optional
+        The daily precipitation in mm above which a day is considered
+        rainy. The default is 1.
+    exclusion_window : float, optional
+        The duration in days after a rainy day during which the water
+        levels cannot be part of a recession segment. The default is 2.
+
+    Returns
+    -------
+    periods : list(tuple)
+        List of tuples containing the boundaries of the recession
+        segments, in the format expected by calculate_mrc.
+    """
+    t = np.asarray(t, dtype=float)
+    h = np.asarray(h, dtype=float)
+    if len(t) < 2:
+        return []
+
+    # Flag the water levels that are valid and not affected by rain.
+    is_valid = ~np.isnan(h)
+    if precip is not None and precip_time is not None:
+        precip_time = np.asarray(precip_time, dtype=float)
+        rain_days = precip_time[np.asarray(precip) > precip_threshold]
+        if len(rain_days):
+            irain = np.searchsorted(rain_days, t, side='right') - 1
+            last_rain_day = rain_days[np.maximum(irain, 0)]
+            is_valid &= ~(
+                (irain >= 0) & (t < last_rain_day + 1 + exclusion_window))
+
+    # Find the runs of consecutive time steps along which the water levels
+    # are deepening, since they are in meters below the ground surface.
+    is_falling = (np.diff(h) >= 0) & is_valid[1:] & is_valid[:-1]
+    edges = np.diff(np.concatenate(([0], is_falling.astype(int), [0])))
+    istart = np.flatnonzero(edges == 1)
+    iend = np.flatnonzero(edges == -1)
+
+    is_long = (t[iend] - t[istart]) >= min_length
+    return list(zip(t[istart[is_long]], t[iend[is_long]]))
+
+
+def calculate_project_mrcs(project, wldset_names: list = None,
+                           mrctype: int = 1, max_workers: int = None,
+                           n_bootstrap: int = 0, level: float = 0.95,
+                           corrected_waterlevels: bool = False,
+                           **kwargs) -> dict:
+    """
+    Calculate the master recession curve (MRC) of the water level datasets
+    of a project from recession segments detected automatically, and save
+    the results in the project.
+
+    The recession segments of each water level dataset are found with
+    find_recession_periods, using the daily rain of the weather dataset
+    closest to the well. The MRCs, and the bootstrap resamples used to
+    estimate their confidence intervals, are calculated concurrently in a
+    single pool of processes, while the results are saved in the project
+    from the calling process.
+
+    Parameters
+    ----------
+    project : ProjetReader
+        The project containing the water level datasets.
+    wldset_names : list, optional
+        The names of the water level datasets for which to calculate the
+        MRC. The MRC is calculated for all datasets if None.
+    mrctype : int, optional
+        Equation type of the MRC. The default is 1.
+    max_workers : int, optional
+        The maximum number of processes used to calculate the MRCs.
+    n_bootstrap : int, optional
+        The number of bootstrap resamples used to estimate the confidence
+        intervals of the coefficients of the MRCs with bootstrap_mrc.
+        The confidence intervals are not estimated if 0, which is
+        the default.
+    level : float, optional
+        The confidence level of the intervals. The default is 0.95.
+    corrected_waterlevels : bool, optional
+        Whether to use the water levels corrected for the effects of
+        barometric pressure and Earth tides. Datasets whose water levels
+        were not corrected are skipped. The default is False.
+    **kwargs
+        Keyword arguments passed to find_recession_periods.
+
+    Returns
+    -------
+    coeffs : dict
+        The optimal coefficients of the MRC calculated for each water
+        level dataset. Datasets for which the MRC could not be
+        calculated are omitted.
+    """
+    # We import the project reader here, since it is not needed by the
+    # processes that are spawned to calculate the MRCs.
+    from gwhat.projet.reader_projet import WLDatasetHDF5, WXDataFrameHDF5
+
+    if wldset_names is None:
+        wldset_names = project.wldsets
+    paired_wxdsets = project.pair_wldsets_with_closest_wxdset()
+
+    # Detect the recession periods of each water level dataset.
+    tasks = {}
+    for name in wldset_names:
+        wldset = WLDatasetHDF5(project.db['wldsets'][name])
+        t = wldset.xldates
+        try:
+            h = wldset.get_waterlevels(corrected_waterlevels)
+        except ValueError:
+            print("WARNING: The water levels of {} were not corrected."
+                  .format(name))
+            continue
+        precip_kwargs = {}
+        if paired_wxdsets.get(name) is not None:
+            wxdset = WXDataFrameHDF5(
+                project.db['wxdsets'][paired_wxdsets[name]])
+            precip_kwargs = {'precip_time': wxdset.xldates,
+                             'precip': wxdset.data['Rain'].values}
+        periods = find_recession_periods(t, h, **precip_kwargs, **kwargs)
+        if len(periods) == 0:
+            print("WARNING: No recession period found for {}.".format(name))
+            continue
+        tasks[name] = (wldset, t, h, periods)
+
+    max_workers = get_max_workers(
+        max_workers, MAX_MRC_WORKERS, len(tasks) * (1 + n_bootstrap))
+    results = {}
+    params_ci = {}
+    if max_workers == 1:
+        for name, (wldset, t, h, periods) in tasks.items():
+            results[name] = call_safely(calculate_mrc, t, h, periods, mrctype)
+            if n_bootstrap and results[name][0] is not None:
+                params_ci[name] = bootstrap_mrc(
+                    t, h, periods, mrctype, n_bootstrap, level, max_workers=1)
+    else:
+        # The MRCs and the bootstrap resamples of all the datasets are
+        # calculated in the same pool, so that the processes are spawned
+        # only once.
+        with create_process_pool(max_workers) as executor:
+            futures = {
+                executor.submit(
+                    call_safely, calculate_mrc, t, h, periods, mrctype):
+                name for name, (wldset, t, h, periods) in tasks.items()}
+            bootstrap_futures = {}
+            if n_bootstrap:
+                for name, (wldset, t, h, periods) in tasks.items():
+                    bootstrap_futures[name] = _submit_bootstrap_mrc(
+                        executor, t, h, periods, mrctype, n_bootstrap,
+                        n_chunks=4 * max_workers)
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+            for name, chunk_futures in bootstrap_futures.items():
+                params_ci[name] = _calc_bootstrap_ci(
+                    np.vstack([future.result() for
+                               future in chunk_futures]),
+                    level)
+
+    # Save the results in the project.
+    mrc_coeffs = {}
+    for name, (wldset, t, h, periods) in tasks.items():
+        result, error = results[name]
+        if result is None:
+            print("WARNING: Failed to calculate the MRC of {} because of "
+                  "the following error: {}".format(name, error))
+            continue
+        coeffs, hp, std_err, r_squared, rmse = result
+        wldset.set_mrc(
+            coeffs.A, coeffs.B, periods, t, hp, std_err, r_squared, rmse)
+        if n_bootstrap:
+            wldset.set_mrc_ci(params_ci[name], level)
+        mrc_coeffs[name] = coeffs
+    return mrc_coeffs
+
+
+def bootstrap_mrc(t, h, periods: list(tuple), mrctype: int = 1,
+                  n_samples: int = 200, level: float = 0.95,
+                  max_workers: int = None, seed: int = None) -> np.ndarray:
+    """
+    Estimate the confidence intervals of the coefficients of the master
+    recession curve (MRC) by bootstrapping the recession segments.
+
+    The recession periods are resampled with replacement n_samples times
+    and the MRC is refitted for each resample concurrently in a pool
+    of processes.
+
+    Parameters
+    ----------
+    t : np.ndarray
+        Time in days since epoch.
+    h : np.ndarray
+        Water levels in meters below the ground surface.
+    periods : list(tuple)
+        List of tuples containing the boundaries of the segments of
+        the hydrograph that need to be used to evaluate the MRC.
+    mrctype : int, optional
+        Equation type of the MRC. The default is 1.
+    n_samples : int, optional
+        The number of bootstrap resamples. The default is 200.
+    level : float, optional
+        The confidence level of the intervals. The default is 0.95.
+    max_workers : int, optional
+        The maximum number of processes used to refit the MRCs.
+    seed : int, optional
+        The seed used to resample the recession periods.
+
+    Returns
+    -------
+    params_ci : np.ndarray
+        An array of shape (2, 2) containing the lower and upper bounds of
+        the confidence intervals of the coefficients A and B respectively.
+    """
+    max_workers = get_max_workers(max_workers, MAX_MRC_WORKERS, n_samples)
+    if max_workers == 1:
+        coeffs = _bootstrap_mrc_chunk(
+            t, h, list(periods),
+            _resample_periods(periods, n_samples, seed), mrctype)
+    else:
+        with create_process_pool(max_workers) as executor:
+            futures = _submit_bootstrap_mrc(
+                executor, t, h, periods, mrctype, n_samples, seed,
+                n_chunks=4 * max_workers)
+            coeffs = np.vstack([future.result() for future in futures])
+    return _calc_bootstrap_ci(coeffs, level)
+
+
+def _resample_periods(periods, n_samples, seed=None):
+    """
+    Return the indexes of the recession periods resampled with replacement
+    n_samples times.
+    """
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, len(periods), size=(n_samples, len(periods)))
+
+
+def _submit_bootstrap_mrc(executor, t, h, periods, mrctype, n_samples,
+                          seed=None, n_chunks=1):
+    """
+    Submit to executor the calculation of the MRC coefficients for
+    n_samples resamples of the recession periods and return the futures.
+
+    The resamples are split in n_chunks chunks, so that the data are sent
+    only a few times to each process.
+    """
+    periods = list(periods)
+    resamples = _resample_periods(periods, n_samples, seed)
+    return [executor.submit(
+                _bootstrap_mrc_chunk, t, h, periods, chunk, mrctype)
+            for chunk in np.array_split(resamples, n_chunks) if len(chunk)]
+
+
+def _calc_bootstrap_ci(coeffs, level):
+    """
+    Return the confidence intervals at the specified level of the MRC
+    coefficients calculated for each bootstrap resample.
+    """
+    bounds = 100 * np.array([(1 - level) / 2, (1 + level) / 2])
+    if np.all(np.isnan(coeffs)):
+        return np.full((2, 2), np.nan)
+    return np.nanpercentile(coeffs, bounds, axis=0).T
+
+
+def _bootstrap_mrc_chunk(t, h, periods, resamples, mrctype):
+    """
+    Return the coefficients A and B of the MRC calculated for each
+    resample of the recession periods, with values of NaN when the MRC
+    could not be calculated.
+
+    The errors are not raised, since the resamples for which the MRC cannot
+    be calculated are simply ignored when estimating the confidence
+    intervals.
+    """
+    segment_index = RecessionSegmentIndex(t)
+    coeffs = np.full((len(resamples), 2), np.nan)
+    for i, resample in enumerate(resamples):
+        try:
+            mrc_coeffs = calculate_mrc(
+                t, h, [periods[j] for j in resample], mrctype,
+                segment_index=segment_index)[0]
+        except Exception:
+            continue
+        coeffs[i] = (mrc_coeffs.A, mrc_coeffs.B)
+    return coeffs
+
+
 if __name__ == '__main__':
     from gwhat.projet.reader_waterlvl import WLDataset
     import matplotlib.pyplot as plt
@@ -17,7 +17,7 @@ import pandas as pd
 from qtpy.QtCore import Qt, Signal
 from qtpy.QtWidgets import (
     QWidget, QComboBox, QTextEdit, QSizePolicy, QPushButton, QGridLayout,
-    QLabel, QApplication, QFileDialog, QMessageBox)
+    QLabel, QApplication, QFileDialog, QMessageBox, QCheckBox)
 
 # ---- Local imports
 from gwhat.hydrocalc.recession.recession_calc import calculate_mrc
@@ -60,6 +60,13 @@ class MasterRecessionCalcTool(WLCalcTool, SaveFileMixin):
         self.cbox_mrc_type.addItems(['Linear', 'Exponential'])
         self.cbox_mrc_type.setCurrentIndex(1)
 
+        self.corrected_wl_cbox = QCheckBox(
+            'Use water levels corrected with the BRF')
+        self.corrected_wl_cbox.setToolTip(
+            "Calculate the MRC with the water levels corrected for the "
+            "effects of barometric pressure and Earth tides with the "
+            "BRF tool.")
+
         self.txtedit_mrc_results = QTextEdit()
         self.txtedit_mrc_results.setReadOnly(True)
         self.txtedit_mrc_results.setMinimumHeight(25)
@@ -119,6 +126,8 @@ class MasterRecessionCalcTool(WLCalcTool, SaveFileMixin):
         layout.addWidget(QLabel('MRC Type :'), row, 0)
         layout.addWidget(self.cbox_mrc_type, row, 1)
         row += 1
+        layout.addWidget(self.corrected_wl_cbox, row, 0, 1, 3)
+        row += 1
         layout.addWidget(self.txtedit_mrc_results, row, 0, 1, 3)
         row += 1
         layout.addWidget(mrc_tb, row, 0, 1, 3)
@@ -289,14 +298,23 @@ class MasterRecessionCalcTool(WLCalcTool, SaveFileMixin):
                 "is currently selected on the hydrograph.")
             QMessageBox.warning(self, 'Warning', message, QMessageBox.Ok)
             return
+        use_corrected = self.corrected_wl_cbox.isChecked()
+        if use_corrected and self.wldset.corrected_waterlevels is None:
+            message = (
+                "The MRC cannot be assessed with the corrected water levels "
+                "because they were not calculated with the BRF tool for "
+                "this dataset.")
+            QMessageBox.warning(self, 'Warning', message, QMessageBox.Ok)
+            return
 
         QApplication.setOverrideCursor(Qt.WaitCursor)
 
         coeffs, hp, std_err, r_squared, rmse = calculate_mrc(
             self.wldset.xldates,
-            self.wldset.waterlevels,
+            self.wldset.get_waterlevels(use_corrected),
             self._mrc_period_xdata,
-            self.cbox_mrc_type.currentIndex())
+            self.cbox_mrc_type.currentIndex(),
+            segment_index=self.wldset.get_recession_segment_index())
         A = coeffs.A
         B = coeffs.B
         print('MRC Parameters: A={}, B={}'.format(
@@ -452,4 +470,13 @@ class MasterRecessionCalcTool(WLCalcTool, SaveFileMixin):
                     text += label.format('N/A')
                 else:
                     text += label.format('{:0.5f}'.format(value))
+
+            if not pd.isnull(mrc_data['ci_level']):
+                text += (
+                    "<br><br>Bootstrap {:0.0f}% confidence intervals :<br>"
+                    "A = [{:0.5f}, {:0.5f}] day<sup>-1</sup><br>"
+                    "B = [{:0.5f}, {:0.5f}] m/day"
+                    ).format(mrc_data['ci_level'] * 100,
+                             *mrc_data['params_ci'][0],
+                             *mrc_data['params_ci'][1])
         self.txtedit_mrc_results.setHtml(text)
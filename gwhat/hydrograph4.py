@@ -277,7 +277,7 @@ class Hydrograph(Figure):
             self.RAIN = np.array([])
         else:
             self.name_meteo = wxdset.metadata['Station Name']
-            self.TIMEmeteo = datetimeindex_to_xldates(wxdset.data.index)
+            self.TIMEmeteo = wxdset.get_xldates()
             self.TMAX = wxdset.data['Tmax'].values
             self.PTOT = wxdset.data['Ptot'].values
             self.RAIN = wxdset.data['Rain'].values
@@ -8,12 +8,27 @@
 # -----------------------------------------------------------------------------
 
 
+# ---- Standard library imports
+from collections import OrderedDict
+
 # ---- Third party imports
 import numpy as np
 from numpy import pi, sin, cos, arccos, arcsin
 import pandas as pd
 
 
+# The day length and extraterrestrial radiation tables that were already
+# calculated for a given latitude.
+_DAYLENGTH_TABLES = {}
+_RADIATION_TABLES = {}
+
+# The solar constant in MJ/m²/min.
+SOLAR_CONSTANT = 0.0820
+
+# The latent heat of vaporization of water in MJ/kg.
+LATENT_HEAT = 2.45
+
+
 def calcul_thornthwaite(Tavg, latitude):
     """
     Calcul reference potential evapotranspiration, PET0(mm/d) with
@@ -38,52 +53,269 @@ def calcul_thornthwaite(Tavg, latitude):
         for estimating daily reference evapotranspiration. Agricultural Water
         Management, 66, 251-257.
     """
-    Ta = Tavg.groupby(Tavg.index.month).mean()
-    Ta[Ta < 0] = 0
+    PET0 = calcul_thornthwaite_batch(Tavg.to_frame(), [latitude])
+    return PET0.iloc[:, 0].rename(None)
+
+
+def calcul_thornthwaite_batch(Tavg, latitudes):
+    """
+    Calcul reference potential evapotranspiration, PET0(mm/d) with
+    the method of Thornwaite (1948) for several stations at once.
+
+    Parameters
+    ----------
+    Tavg: :class:`pandas.DataFrame`
+        A pandas dataframe with a datetime index containing the average
+        daily air temperatures in Celcius of each station in its columns.
+    latitudes: array-like
+        The latitudes in decimal degrees of the stations, in the same order
+        as the columns of Tavg.
+
+    Returns
+    -------
+    PET0:
+        A :class:`pandas.DataFrame` containing the corresponding reference
+        daily potential evapotranspiration values in mm/d of each station.
+    """
+    latitudes = np.asarray(latitudes, dtype='float64')
+    if len(latitudes) != len(Tavg.columns):
+        raise ValueError(
+            "The number of latitudes must match the number of stations.")
 
-    I = np.sum((0.2 * Ta)**1.514)  # Heat index
+    Ta = Tavg.groupby(Tavg.index.month).mean().values
+    Ta[Ta < 0] = 0
+    I = np.nansum((0.2 * Ta)**1.514, axis=0)  # Heat index
     a = (6.75e-7 * I**3) - (7.71e-5 * I**2) + (1.7912e-2 * I) + 0.49239
 
-    # Calcul photoperiod in hours per day.
-    day_length = calcul_daylength(Tavg.index, latitude)
+    # Get the photoperiod in hours per day of each station.
+    day_length = get_daylength_tables(latitudes)[
+        :, Tavg.index.dayofyear.values - 1].T
 
-    # Calcul the reference evapotranspiration.
+    # Calcul the reference evapotranspiration. The operations are done
+    # in place to avoid allocating temporary arrays for large batches.
 
     # Note that we need to force all negative values to zeros in the
     # average air temperature time series.
-    Tavg_corr = Tavg.copy(deep=True)
-    Tavg_corr[Tavg_corr < 0] = 0
-    PET0 = 16 * (10 * Tavg_corr / I)**a * (day_length / (12 * 30))
+    PET0 = np.maximum(Tavg.to_numpy(dtype='float64'), 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        PET0 *= 10 / I
+        np.power(PET0, a, out=PET0)
+    PET0 *= day_length
+    PET0 *= 16 / (12 * 30)
 
-    return PET0
+    return pd.DataFrame(PET0, index=Tavg.index, columns=Tavg.columns)
 
 
-def calcul_daylength(dtimes, latitude):
-    """Calculate the photoperiod for the given latitude and dates
+def calcul_hargreaves_batch(Tmax, Tmin, Tavg, latitudes):
+    """
+    Calcul reference potential evapotranspiration, PET0(mm/d) with
+    the method of Hargreaves and Samani (1985) for several stations at once.
 
     Parameters
     ----------
-    dtimes: :class:`pandas.DatetimeIndex`
-        A :class:`pandas.DatetimeIndex` containing a series of dates for which
-        we want to calculate the photoperiod for the specified latitude.
-    latitude: float
-        The latitude in decimal degrees where we want to calculate the
-        photoperiod for the specified dates.
+    Tmax, Tmin, Tavg: :class:`pandas.DataFrame`
+        Pandas dataframes with a datetime index containing the maximum,
+        minimum and average daily air temperatures in Celcius of each
+        station in their columns.
+    latitudes: array-like
+        The latitudes in decimal degrees of the stations, in the same order
+        as the columns of the dataframes.
 
     Returns
     -------
-    daylength:
-        A :class:`pandas.DatetimeIndex` containing the photoperiod for the
-        specified dates and latitude.
+    PET0:
+        A :class:`pandas.DataFrame` containing the corresponding reference
+        daily potential evapotranspiration values in mm/d of each station.
+
+    Hargreaves, G.H. and Z.A. Samani. 1985. Reference crop evapotranspiration
+        from temperature. Applied Engineering in Agriculture, 1(2), 96-99.
+    """
+    Ra = _get_daily_radiation(Tavg, latitudes)
+
+    # Note that we need to force negative temperature ranges and
+    # evapotranspiration values to zeros.
+    Trange = np.maximum(
+        Tmax.to_numpy(dtype='float64') - Tmin.to_numpy(dtype='float64'), 0)
+    PET0 = Tavg.to_numpy(dtype='float64') + 17.8
+    PET0 *= np.sqrt(Trange)
+    PET0 *= Ra
+    PET0 *= 0.0023 / LATENT_HEAT
+    np.maximum(PET0, 0, out=PET0)
+
+    return pd.DataFrame(PET0, index=Tavg.index, columns=Tavg.columns)
+
+
+def calcul_oudin_batch(Tavg, latitudes):
+    """
+    Calcul reference potential evapotranspiration, PET0(mm/d) with
+    the method of Oudin et al. (2005) for several stations at once.
+
+    Parameters
+    ----------
+    Tavg: :class:`pandas.DataFrame`
+        A pandas dataframe with a datetime index containing the average
+        daily air temperatures in Celcius of each station in its columns.
+    latitudes: array-like
+        The latitudes in decimal degrees of the stations, in the same order
+        as the columns of Tavg.
+
+    Returns
+    -------
+    PET0:
+        A :class:`pandas.DataFrame` containing the corresponding reference
+        daily potential evapotranspiration values in mm/d of each station.
+
+    Oudin, L., F. Hervieu, C. Michel, C. Perrin, V. Andréassian, F. Anctil
+        and C. Loumagne. 2005. Which potential evapotranspiration input for
+        a lumped rainfall-runoff model? Part 2. Journal of Hydrology, 303,
+        290-306.
+    """
+    Ra = _get_daily_radiation(Tavg, latitudes)
+
+    # Note that evapotranspiration is null when the average air
+    # temperature is below -5 Celcius.
+    PET0 = np.maximum(Tavg.to_numpy(dtype='float64') + 5, 0)
+    PET0 *= Ra
+    PET0 *= 1 / (LATENT_HEAT * 100)
+
+    return pd.DataFrame(PET0, index=Tavg.index, columns=Tavg.columns)
+
+
+def _get_daily_radiation(data, latitudes):
+    """
+    Return the extraterrestrial radiation in MJ/m²/day for the dates of
+    the index of data at the latitudes of the stations in its columns.
+    """
+    latitudes = np.asarray(latitudes, dtype='float64')
+    if len(latitudes) != len(data.columns):
+        raise ValueError(
+            "The number of latitudes must match the number of stations.")
+    return get_radiation_tables(latitudes)[
+        :, data.index.dayofyear.values - 1].T
+
+
+# The methods that are available to calculate potential evapotranspiration
+# with the function that calculates it for several stations at once and
+# the temperature variables that this function requires.
+PET_METHODS = OrderedDict([
+    ('thornthwaite', (calcul_thornthwaite_batch, ['Tavg'])),
+    ('hargreaves', (calcul_hargreaves_batch, ['Tmax', 'Tmin', 'Tavg'])),
+    ('oudin', (calcul_oudin_batch, ['Tavg']))
+    ])
+
+
+def calcul_pet_batch(method, latitudes, **temperatures):
+    """
+    Calcul reference potential evapotranspiration, PET0(mm/d) with the
+    specified method for several stations at once.
+
+    Parameters
+    ----------
+    method: str
+        The method to use to calculate the potential evapotranspiration.
+        Must be one of the keys of PET_METHODS.
+    latitudes: array-like
+        The latitudes in decimal degrees of the stations, in the same order
+        as the columns of the temperature dataframes.
+    **temperatures: :class:`pandas.DataFrame`
+        The 'Tmax', 'Tmin' and 'Tavg' dataframes that are required by the
+        method, with a datetime index and one column per station.
+
+    Returns
+    -------
+    PET0:
+        A :class:`pandas.DataFrame` containing the corresponding reference
+        daily potential evapotranspiration values in mm/d of each station.
+    """
+    if method not in PET_METHODS:
+        raise ValueError("'method' must be one of {}.".format(
+            list(PET_METHODS.keys())))
+    func, variables = PET_METHODS[method]
+    missing = [var for var in variables if var not in temperatures]
+    if missing:
+        raise ValueError("The {} method requires {}.".format(
+            method, ', '.join(missing)))
+    return func(*[temperatures[var] for var in variables], latitudes)
+
+
+def get_daylength_tables(latitudes):
+    """
+    Return the photoperiod in hours per day for each day of the year at
+    the given latitudes.
+
+    The tables are calculated in a single vectorized step for the latitudes
+    for which they were not calculated already and are memoized.
+
+    Parameters
+    ----------
+    latitudes: array-like
+        The latitudes in decimal degrees for which we want the photoperiod.
+
+    Returns
+    -------
+    daylength_tables:
+        A numpy array of shape (n, 366), where n is the number of latitudes,
+        containing the photoperiod for each day of the year.
     """
-    latitude = np.radians(latitude)
+    return _get_memoized_tables(
+        _DAYLENGTH_TABLES, _calcul_daylength_tables, latitudes)
+
+
+def get_radiation_tables(latitudes):
+    """
+    Return the extraterrestrial radiation in MJ/m²/day for each day of the
+    year at the given latitudes.
+
+    The tables are calculated in a single vectorized step for the latitudes
+    for which they were not calculated already and are memoized.
+
+    Parameters
+    ----------
+    latitudes: array-like
+        The latitudes in decimal degrees for which we want the
+        extraterrestrial radiation.
+
+    Returns
+    -------
+    radiation_tables:
+        A numpy array of shape (n, 366), where n is the number of latitudes,
+        containing the extraterrestrial radiation for each day of the year.
+    """
+    return _get_memoized_tables(
+        _RADIATION_TABLES, _calcul_radiation_tables, latitudes)
+
+
+def _get_memoized_tables(cache, func, latitudes):
+    """
+    Return the tables saved in cache for the given latitudes. The tables
+    of the latitudes that are not in the cache are calculated with func
+    and are saved in the cache as read-only arrays.
+    """
+    latitudes = np.atleast_1d(np.asarray(latitudes, dtype='float64'))
+    new_latitudes = np.unique([lat for lat in latitudes if lat not in cache])
+    if len(new_latitudes):
+        tables = func(new_latitudes)
+        tables.flags.writeable = False
+        for lat, table in zip(new_latitudes, tables):
+            cache[lat] = table
+    if len(latitudes) == 0:
+        return np.empty((0, 366))
+    return np.vstack([cache[lat] for lat in latitudes])
+
+
+def _calcul_daylength_tables(latitudes):
+    """
+    Calculate the photoperiod for each day of the year at the given
+    latitudes.
+    """
+    latitudes = np.radians(latitudes)[:, np.newaxis]
 
     # Calculate sun declination.
     # http://en.wikipedia.org/wiki/Position_of_the_Sun#Calculations
 
     # N is the number of days since midnight UT as January 1 begins (
     # i.e. the days part of the ordinal date −1)
-    N = dtimes.dayofyear.values - 1
+    N = np.arange(366)[np.newaxis, :]
     A = 2 * pi / 365.24 * (N - 2)
     B = 2 * pi / pi * 0.0167
     C = 2 * pi / 365.24 * (N + 10)
@@ -95,13 +327,62 @@ def calcul_daylength(dtimes, latitude):
 
     # We take the equation that take into account corrections for
     # astronomical refraction and solar disc diameter.
-    num = sin(-0.83 * pi / 180) - sin(latitude) * sin(sun_declination)
-    denum = cos(latitude) * cos(sun_declination)
-    hour_angle = arccos(num / denum)
+    num = sin(-0.83 * pi / 180) - sin(latitudes) * sin(sun_declination)
+    denum = cos(latitudes) * cos(sun_declination)
+    with np.errstate(invalid='ignore'):
+        hour_angle = arccos(num / denum)
+
+    return 2 * hour_angle * 24 / (2 * pi)
+
+
+def _calcul_radiation_tables(latitudes):
+    """
+    Calculate the extraterrestrial radiation for each day of the year at
+    the given latitudes with equations 21 to 25 of FAO-56.
+
+    Allen, R.G., L.S. Pereira, D. Raes and M. Smith. 1998. Crop
+        evapotranspiration - Guidelines for computing crop water
+        requirements. FAO Irrigation and drainage paper 56. FAO, Rome.
+    """
+    latitudes = np.radians(latitudes)[:, np.newaxis]
+
+    # J is the number of the day in the year.
+    J = np.arange(1, 367)[np.newaxis, :]
+
+    # Inverse relative distance Earth-Sun and solar declination.
+    dr = 1 + 0.033 * cos(2 * pi / 365 * J)
+    sun_declination = 0.409 * sin(2 * pi / 365 * J - 1.39)
+
+    # Sunset hour angle. The values are clipped for polar days and nights.
+    sunset_hour_angle = arccos(np.clip(
+        -np.tan(latitudes) * np.tan(sun_declination), -1, 1))
 
-    daylen = 2 * hour_angle * 24 / (2 * pi)
+    return (24 * 60 / pi * SOLAR_CONSTANT * dr * (
+        sunset_hour_angle * sin(latitudes) * sin(sun_declination) +
+        cos(latitudes) * cos(sun_declination) * sin(sunset_hour_angle)))
+
+
+def calcul_daylength(dtimes, latitude):
+    """Calculate the photoperiod for the given latitude and dates
 
-    return pd.Series(daylen, index=dtimes)
+    Parameters
+    ----------
+    dtimes: :class:`pandas.DatetimeIndex`
+        A :class:`pandas.DatetimeIndex` containing a series of dates for which
+        we want to calculate the photoperiod for the specified latitude.
+    latitude: float
+        The latitude in decimal degrees where we want to calculate the
+        photoperiod for the specified dates.
+
+    Returns
+    -------
+    daylength:
+        A :class:`pandas.DatetimeIndex` containing the photoperiod for the
+        specified dates and latitude.
+    """
+    daylength_table = get_daylength_tables([latitude])[0]
+    return pd.Series(
+        daylength_table[dtimes.dayofyear.values - 1], index=dtimes)
 
 
 if __name__ == '__main__':
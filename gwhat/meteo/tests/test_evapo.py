@@ -16,7 +16,11 @@ import pytest
 import numpy as np
 
 # ---- Local library imports
-from gwhat.meteo.evapotranspiration import calcul_daylength
+from gwhat.meteo import evapotranspiration
+from gwhat.meteo.evapotranspiration import (
+    calcul_daylength, calcul_thornthwaite, calcul_thornthwaite_batch,
+    get_daylength_tables, get_radiation_tables, calcul_pet_batch,
+    calcul_hargreaves_batch, calcul_oudin_batch)
 
 
 # =============================================================================
@@ -43,5 +47,96 @@ def test_calcul_daylength():
     assert np.max(np.abs(daylength - expected_daylength)) < 0.1
 
 
+def test_daylength_tables_memoization():
+    """
+    Test that the day length tables are calculated only once per latitude
+    and that they cannot be modified.
+    """
+    evapotranspiration._DAYLENGTH_TABLES.clear()
+    tables = get_daylength_tables([46.82, 45.5, 46.82])
+    assert tables.shape == (3, 366)
+    assert np.array_equal(tables[0], tables[2])
+    assert sorted(evapotranspiration._DAYLENGTH_TABLES) == [45.5, 46.82]
+
+    table = evapotranspiration._DAYLENGTH_TABLES[46.82]
+    assert get_daylength_tables([46.82])[0] is not table
+    assert np.array_equal(get_daylength_tables([46.82])[0], table)
+    assert evapotranspiration._DAYLENGTH_TABLES[46.82] is table
+    with pytest.raises(ValueError):
+        table[0] = 0
+
+
+def test_calcul_thornthwaite_batch():
+    """
+    Test that calculating the potential evapotranspiration of several
+    stations at once yields the same results as calculating it for each
+    station individually.
+    """
+    np.random.seed(1234)
+    dtimes = pd.date_range('2000-01-01', '2009-12-31')
+    seasonal = 10 - 15 * np.cos(2 * np.pi * dtimes.dayofyear.values / 365)
+    Tavg = pd.DataFrame(
+        seasonal[:, None] + np.random.normal(0, 3, (len(dtimes), 3)),
+        index=dtimes, columns=['sta1', 'sta2', 'sta3'])
+    Tavg.iloc[100:200, 1] = np.nan
+    latitudes = [45.5, 48.2, 52.1]
+
+    PET0 = calcul_thornthwaite_batch(Tavg, latitudes)
+    assert PET0.shape == Tavg.shape
+    assert PET0.columns.tolist() == ['sta1', 'sta2', 'sta3']
+    for column, latitude in zip(Tavg.columns, latitudes):
+        expected_PET0 = calcul_thornthwaite(Tavg[column], latitude)
+        assert np.allclose(PET0[column].values, expected_PET0.values,
+                           equal_nan=True)
+    assert PET0['sta2'].iloc[100:200].isnull().all()
+    assert (PET0.min() >= 0).all()
+
+    with pytest.raises(ValueError):
+        calcul_thornthwaite_batch(Tavg, latitudes[:2])
+
+
+def test_radiation_tables():
+    """
+    Test that the extraterrestrial radiation is calculated as expected.
+    """
+    # The expected value is taken from example 8 of FAO-56 for the 3rd
+    # of September at a latitude of 20°S.
+    assert abs(get_radiation_tables([-20])[0, 245] - 32.2) < 0.05
+
+    # Assert that the radiation is null during the polar night.
+    assert get_radiation_tables([85])[0, 0] == 0
+
+
+def test_calcul_hargreaves_and_oudin():
+    """
+    Test that the potential evapotranspiration calculated with the methods
+    of Hargreaves-Samani and Oudin is as expected.
+    """
+    dtimes = pd.DatetimeIndex(['2019-09-03', '2019-09-03'])
+    Tmax = pd.DataFrame([[25.1, 25.1], [0, -10]], index=dtimes)
+    Tmin = pd.DataFrame([[19.1, 19.1], [2, -30]], index=dtimes)
+    Tavg = pd.DataFrame([[22.1, 22.1], [1, -20]], index=dtimes)
+    Ra = get_radiation_tables([-20, 45])[:, 245]
+
+    PET0 = calcul_hargreaves_batch(Tmax, Tmin, Tavg, [-20, 45])
+    expected_PET0 = 0.0023 * (22.1 + 17.8) * 6**0.5 * Ra / 2.45
+    assert np.allclose(PET0.values[0], expected_PET0)
+    assert PET0.values[1].tolist() == [0, 0]
+
+    PET0 = calcul_oudin_batch(Tavg, [-20, 45])
+    expected_PET0 = Ra / 2.45 * (22.1 + 5) / 100
+    assert np.allclose(PET0.values[0], expected_PET0)
+    assert np.allclose(PET0.values[1], [Ra[0] / 2.45 * 6 / 100, 0])
+
+    # Assert that calculating the evapotranspiration with the generic
+    # function is working as expected.
+    assert calcul_pet_batch(
+        'oudin', [-20, 45], Tavg=Tavg).equals(PET0)
+    with pytest.raises(ValueError):
+        calcul_pet_batch('hargreaves', [-20, 45], Tavg=Tavg)
+    with pytest.raises(ValueError):
+        calcul_pet_batch('penman', [-20, 45], Tavg=Tavg)
+
+
 if __name__ == "__main__":
     pytest.main(['-x', os.path.basename(__file__), '-v', '-rw'])
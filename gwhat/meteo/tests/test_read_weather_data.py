@@ -18,7 +18,9 @@ import pandas as pd
 import pytest
 
 # ---- Local library imports
-from gwhat.meteo.weather_reader import WXDataFrame, read_weather_datafile
+from gwhat import __rootdir__
+from gwhat.meteo.weather_reader import (
+    WXDataFrame, read_weather_datafile, read_weather_log)
 
 
 @pytest.mark.parametrize(
@@ -66,6 +68,101 @@ def test_read_weather_datafile(filename):
     assert np.array_equal(expected_values, data.astype(str).values)
 
 
+def test_wxdataframe_pet_method():
+    """
+    Test that the potential evapotranspiration of weather datasets is
+    calculated with the selected method.
+    """
+    wxdset = WXDataFrame(
+        osp.join(osp.dirname(__file__), "sample_weather_datafile.xlsx"))
+    assert wxdset.metadata['PET method'] == 'thornthwaite'
+    thornthwaite_pet = wxdset.data['PET'].copy()
+
+    wxdset.set_pet_method('hargreaves')
+    assert wxdset.metadata['PET method'] == 'hargreaves'
+    assert wxdset.data.columns[-1] == 'PET'
+    assert not np.allclose(wxdset.data['PET'], thornthwaite_pet)
+    assert (wxdset.data['PET'] >= 0).all()
+
+    wxdset.set_pet_method('thornthwaite')
+    assert np.allclose(wxdset.data['PET'], thornthwaite_pet)
+
+
+def test_read_weather_datafile_with_invalid_values(tmp_path, capsys):
+    """
+    Test that blank values, nan tokens and values that cannot be converted
+    to numeric values are read as nan from weather csv datafiles.
+    """
+    filename = osp.join(tmp_path, 'weather_datafile_with_invalid_values.csv')
+    with open(filename, 'w') as csvfile:
+        csvfile.write(
+            "Station Name,MARIEVILLE\n"
+            "Climate Identifier,7024627\n"
+            "Latitude,45.4\n"
+            "\n"
+            "Year,Month,Day,Max Temp (°C),Min Temp (°C),Mean Temp (°C),"
+            "Total Precip (mm),Data Quality\n"
+            "2000,1,1,2, -12.8,-4.9,0,E\n"
+            "2000,1,2,,-6,None,6.8,\n"
+            "2000,1,3,NaN,-3.5,-0.5,6,\n"
+            )
+
+    # Assert that the data are read as expected when all values can be
+    # converted to numeric values.
+    metadata, data = read_weather_datafile(filename)
+    assert metadata['Station Name'] == 'MARIEVILLE'
+    assert metadata['Station ID'] == '7024627'
+    assert metadata['Latitude'] == 45.4
+    assert data.columns.values.tolist() == ['Tmax', 'Tmin', 'Tavg', 'Ptot']
+    assert (data.dtypes == 'float64').all()
+    expected_values = np.array(
+        [['2.0', '-12.8', '-4.9', '0.0'],
+         ['nan', '-6.0', 'nan', '6.8'],
+         ['nan', '-3.5', '-0.5', '6.0']])
+    assert np.array_equal(expected_values, data.astype(str).values)
+    assert 'could not be converted' not in capsys.readouterr().out
+
+    # Assert that values that cannot be converted to numeric values are
+    # coerced to nan and that a message is printed.
+    with open(filename, 'a') as csvfile:
+        csvfile.write("2000,1,4,1.5,T,0.5,1,\n")
+    metadata, data = read_weather_datafile(filename)
+    assert (data.dtypes == 'float64').all()
+    expected_values = np.vstack((
+        expected_values, [['1.5', 'nan', '0.5', '1.0']]))
+    assert np.array_equal(expected_values, data.astype(str).values)
+    assert ("Some Tmin data could not be converted to numeric value" in
+            capsys.readouterr().out)
+
+
+@pytest.mark.parametrize("delimiter", [',', '\t'])
+def test_read_weather_log(delimiter, tmp_path):
+    """
+    Test that the dates of the gapfilled values are read as expected from
+    comma and tab delimited weather log files.
+    """
+    filename = osp.join(tmp_path, 'sample_weather_datafile.log')
+    with open(osp.join(__rootdir__, 'tests', 'sample_weather_datafile.log'),
+              'r') as f:
+        content = f.read()
+    with open(filename, 'w') as f:
+        f.write(content.replace(',', delimiter))
+
+    log_indexes = read_weather_log(filename)
+    assert list(log_indexes.keys()) == ['Tmax', 'Tmin', 'Tavg', 'Ptot']
+    assert [len(log_indexes[var]) for var in log_indexes] == [
+        517, 546, 657, 457]
+    for index in log_indexes.values():
+        assert isinstance(index, pd.DatetimeIndex)
+    assert log_indexes['Tmax'][0] == datetime(2000, 2, 1)
+    assert log_indexes['Tmax'][1] == datetime(2000, 2, 2)
+
+    # Assert that None is returned when the delimiter cannot be detected.
+    with open(filename, 'w') as f:
+        f.write(content.replace(',', ';'))
+    assert read_weather_log(filename) is None
+
+
 def test_init_wxdataframe_from_input_file():
     """
     Test that the WXDataFrame can be initiated properly from an input
@@ -82,6 +179,7 @@ def test_init_wxdataframe_from_input_file():
     assert np.array_equal(
         wxdset.get_xldates(),
         np.arange(36526, 36526 + 366 + 365 + 365))
+    assert wxdset.get_xldates() is wxdset.xldates
     assert np.array_equal(
         wxdset.data.index,
         pd.date_range(start=dt.datetime(2000, 1, 1),
@@ -183,5 +281,43 @@ def test_wxdata_monthly_yearly_normals():
     assert round(yearly_normals.loc['Tmin'], 1) == 1.7
 
 
+def test_wxdata_cached_aggregates(mocker):
+    """
+    Test that the monthly and yearly values and normals are calculated only
+    once and that they are updated when the data change.
+    """
+    wxdset = WXDataFrame(
+        osp.join(osp.dirname(__file__), "sample_weather_datafile.xlsx"))
+    spy = mocker.spy(wxdset, '_calcul_monthly_values')
+
+    monthly_normals = wxdset.get_monthly_normals()
+    for year_range in [(2000, 2001), (2001, 2002), (2000, 2002)]:
+        expected = wxdset.get_monthly_values()
+        expected = expected.loc[
+            (expected.index.get_level_values(0) >= year_range[0]) &
+            (expected.index.get_level_values(0) <= year_range[1])]
+        expected = expected.groupby(level=[1]).mean()
+        normals = wxdset.get_monthly_normals(year_range)
+        assert np.allclose(normals.values, expected.values)
+        assert normals.index.tolist() == expected.index.tolist()
+    assert spy.call_count == 1
+
+    # Assert that the returned values can be modified without affecting
+    # the cached values.
+    monthly = wxdset.get_monthly_values()
+    monthly.insert(0, 'Year', monthly.index.get_level_values(0))
+    assert 'Year' not in wxdset.get_monthly_values().columns
+
+    # Assert that the aggregates are updated when the data change.
+    wxdset.set_pet(wxdset.data['PET'] * 2, 'datafile')
+    assert np.allclose(wxdset.get_monthly_normals()['PET'],
+                       monthly_normals['PET'] * 2)
+    assert spy.call_count == 2
+
+    wxdset.data = wxdset.data.copy()
+    wxdset.get_monthly_normals()
+    assert spy.call_count == 3
+
+
 if __name__ == "__main__":
     pytest.main(['-x', __file__, '-v', '-rw'])
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+# ---- Standard library imports
+import os.path as osp
+
+# ---- Third party imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# ---- Local library imports
+from gwhat.meteo.weather_reader import WXDataFrame
+from gwhat.meteo.weather_blender import WXDataFrameBlend
+
+
+# ---- Pytest Fixtures
+@pytest.fixture
+def wxdsets():
+    """
+    Create two weather datasets located at 10 and 20 km from the
+    location (45.4, -73.13).
+    """
+    filename = osp.join(osp.dirname(__file__), 'basic_weather_datafile.csv')
+    wxdsets = []
+    for i, (lat, value) in enumerate([(45.4 + 10 / 111.19, 1),
+                                      (45.4 - 20 / 111.19, 4)]):
+        wxdset = WXDataFrame(filename)
+        wxdset.metadata['Station Name'] = 'station{}'.format(i + 1)
+        wxdset.metadata['Latitude'] = lat
+        wxdset.data[:] = value
+        wxdset.missing_value_indexes = {
+            var: pd.DatetimeIndex([]) for var in wxdset.data.columns}
+        wxdsets.append(wxdset)
+
+    # Flag some values of the first dataset as missing.
+    wxdsets[0].missing_value_indexes['Ptot'] = pd.DatetimeIndex(
+        ['2000-01-02', '2000-01-04'])
+
+    # Flag some values of the second dataset as missing.
+    wxdsets[1].missing_value_indexes['Ptot'] = pd.DatetimeIndex(
+        ['2000-01-04', '2000-01-05'])
+
+    return wxdsets
+
+
+# ---- Tests
+def test_blend_wxdsets_idw(wxdsets):
+    """
+    Test that composing a weather dataset with inverse distance weighting
+    is working as expected.
+    """
+    wxdset = WXDataFrameBlend(wxdsets, 45.4, -73.13, method='idw', power=2)
+
+    # The weight of the first station is 4 times the weight of the second.
+    expected_ptot = [(4 * 1 + 4) / 5, 4, (4 * 1 + 4) / 5, 1, 1]
+    assert np.allclose(wxdset.data['Ptot'].values, expected_ptot)
+    assert np.allclose(wxdset.data['Tmax'].values, (4 * 1 + 4) / 5)
+
+    # The 2000-01-04 is missing in both datasets, so the value of the
+    # closest dataset is used.
+    assert wxdset.missing_value_indexes['Ptot'].strftime(
+        '%Y-%m-%d').tolist() == ['2000-01-04']
+    assert len(wxdset.missing_value_indexes['Tmax']) == 0
+
+    assert wxdset.metadata['Station Name'] == 'station1 + station2'
+    assert wxdset.metadata['Latitude'] == 45.4
+    assert wxdset.metadata['Blending'] == 'idw (k=2)'
+
+
+def test_blend_wxdsets_elevation(wxdsets):
+    """
+    Test that the elevation of the composed dataset is weighted the same
+    way as the data.
+    """
+    wxdsets[0].metadata['Elevation'] = 100
+    wxdsets[1].metadata['Elevation'] = 200
+
+    wxdset = WXDataFrameBlend(wxdsets, 45.4, -73.13, method='idw', power=2)
+    assert np.isclose(wxdset.metadata['Elevation'], (4 * 100 + 200) / 5)
+
+    wxdset = WXDataFrameBlend(wxdsets, 45.4, -73.13, method='idw', power=1)
+    assert np.isclose(wxdset.metadata['Elevation'], (2 * 100 + 200) / 3)
+
+    wxdset = WXDataFrameBlend(wxdsets, 45.4, -73.13, method='nearest')
+    assert wxdset.metadata['Elevation'] == 100
+
+
+def test_blend_wxdsets_no_data(wxdsets):
+    """
+    Test that the days for which none of the datasets has data are
+    left as NaN instead of being filled with zeros.
+    """
+    # The closest dataset has no data after the 2000-01-03 and the
+    # precipitation of the other dataset is missing on the 2000-01-04
+    # and 2000-01-05.
+    wxdsets[0].data = wxdsets[0].data.iloc[:3]
+
+    wxdset = WXDataFrameBlend(wxdsets, 45.4, -73.13, method='nearest')
+    assert np.array_equal(
+        wxdset.data['Ptot'].values, [1, 4, 1, np.nan, np.nan],
+        equal_nan=True)
+    assert wxdset.data['Tmax'].values.tolist() == [1, 1, 1, 4, 4]
+    assert wxdset.missing_value_indexes['Ptot'].strftime(
+        '%Y-%m-%d').tolist() == ['2000-01-04', '2000-01-05']
+
+
+def test_blend_wxdsets_nearest(wxdsets):
+    """
+    Test that composing a weather dataset from the nearest valid values
+    is working as expected.
+    """
+    wxdset = WXDataFrameBlend(wxdsets[::-1], 45.4, -73.13, method='nearest')
+
+    assert wxdset.data['Ptot'].values.tolist() == [1, 4, 1, 1, 1]
+    assert wxdset.data['Tmax'].values.tolist() == [1, 1, 1, 1, 1]
+    assert wxdset.missing_value_indexes['Ptot'].strftime(
+        '%Y-%m-%d').tolist() == ['2000-01-04']
+
+
+if __name__ == "__main__":
+    pytest.main(['-x', __file__, '-v', '-rw'])
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+# ---- Standard library imports
+import os.path as osp
+from types import SimpleNamespace
+
+# ---- Third party imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# ---- Local library imports
+from gwhat.meteo.weather_reader import WXDataFrame
+from gwhat.meteo.weather_gapfill import gapfill_weather_data
+
+
+# ---- Pytest Fixtures
+@pytest.fixture
+def data():
+    """
+    Create four years of daily weather data with a seasonal temperature
+    cycle and a gap of 3 days and a gap of 10 days.
+    """
+    index = pd.date_range('2000-01-01', '2003-12-31', freq='D')
+    seasonal = np.sin(2 * np.pi * index.dayofyear.values / 366)
+    data = pd.DataFrame(
+        {'Tmax': 10 + 15 * seasonal,
+         'Tmin': -5 + 15 * seasonal,
+         'Tavg': 2.5 + 15 * seasonal,
+         'Ptot': np.resize([0., 2., 0., 4.], len(index))},
+        index=index)
+    data.iloc[100:103] = np.nan
+    data.iloc[200:210] = np.nan
+    return data
+
+
+@pytest.fixture
+def neighbour(data):
+    """
+    Create a neighbour weather dataset without any missing value whose
+    temperature is 2 degrees colder and precipitation twice as large.
+    """
+    index = data.index
+    seasonal = np.sin(2 * np.pi * index.dayofyear.values / 366)
+    ndata = pd.DataFrame(
+        {'Tmax': 8 + 15 * seasonal,
+         'Tmin': -7 + 15 * seasonal,
+         'Tavg': 0.5 + 15 * seasonal,
+         'Ptot': np.resize([0., 4., 0., 8.], len(index))},
+        index=index)
+    return SimpleNamespace(
+        data=ndata,
+        missing_value_indexes={
+            'Ptot': pd.DatetimeIndex([index[201]])})
+
+
+# ---- Tests
+def test_gapfill_default(data):
+    """
+    Test that the default gapfill pipeline fills the temperature by linear
+    interpolation and the remaining missing values with 0.
+    """
+    filled, filled_indexes = gapfill_weather_data(data)
+
+    expected = data.copy()
+    for var in ['Tmax', 'Tmin', 'Tavg']:
+        expected[var] = expected[var].interpolate()
+    expected = expected.fillna(0)
+    pd.testing.assert_frame_equal(filled, expected)
+    for var in data.columns:
+        assert filled_indexes[var].equals(data.index[data[var].isnull()])
+
+
+def test_gapfill_max_interp_gap(data):
+    """
+    Test that gaps longer than max_interp_gap are not filled by
+    interpolation, but by the next steps of the pipeline.
+    """
+    filled, filled_indexes = gapfill_weather_data(
+        data, steps=['interpolate'], max_interp_gap=5)
+    assert filled['Tmax'].iloc[100:103].notnull().all()
+    assert filled['Tmax'].iloc[200:210].isnull().all()
+    assert filled['Ptot'].isnull().sum() == 13
+    assert len(filled_indexes['Tmax']) == 3
+    assert len(filled_indexes['Ptot']) == 0
+
+    filled, filled_indexes = gapfill_weather_data(
+        data, steps=['interpolate', 'climatology'], max_interp_gap=5)
+    assert filled.notnull().all().all()
+    assert len(filled_indexes['Tmax']) == 13
+
+    # The seasonal cycle is the same every year, so the climatology must be
+    # close to the true values, apart from the bias due to the smoothing.
+    true_tmax = 10 + 15 * np.sin(
+        2 * np.pi * data.index.dayofyear.values[200:210] / 366)
+    assert np.allclose(filled['Tmax'].iloc[200:210], true_tmax, atol=0.5)
+    assert np.all(filled['Ptot'].iloc[200:210] >= 0)
+
+
+def test_gapfill_regression(data, neighbour):
+    """
+    Test that the missing values are filled with a linear regression with
+    the data of the neighbour stations.
+    """
+    filled, filled_indexes = gapfill_weather_data(
+        data, steps=['regression', 'zero'], neighbours=[neighbour])
+
+    assert np.allclose(
+        filled['Tmax'].iloc[200:210], neighbour.data['Tmax'].iloc[200:210] + 2)
+    assert np.allclose(
+        filled['Ptot'].iloc[100:103], neighbour.data['Ptot'].iloc[100:103] / 2)
+
+    # The value of the neighbour that is flagged as missing must not be used.
+    assert filled['Ptot'].iloc[201] == 0
+    assert np.allclose(
+        filled['Ptot'].iloc[202:210], neighbour.data['Ptot'].iloc[202:210] / 2)
+
+    # Neighbours that do not overlap enough with the station must be
+    # ignored.
+    filled, filled_indexes = gapfill_weather_data(
+        data, steps=['regression'], neighbours=[neighbour],
+        min_overlap=len(data))
+    assert filled.isnull().sum().sum() == data.isnull().sum().sum()
+
+
+def test_gapfill_invalid_step(data):
+    """Test that an error is raised when a gapfill step is not valid."""
+    with pytest.raises(ValueError):
+        gapfill_weather_data(data, steps=['interpolate', 'dummy'])
+
+
+def test_wxdataframe_gapfill_kwargs():
+    """
+    Test that the gapfill pipeline used to load a weather dataset from a
+    file can be configured.
+    """
+    filename = osp.join(osp.dirname(__file__), 'basic_weather_datafile.csv')
+    wxdset = WXDataFrame(filename)
+    assert wxdset.metadata['Gapfill'] == 'interpolate + zero'
+    for var in ['Tmax', 'Tmin', 'Tavg', 'Ptot']:
+        assert wxdset.filled_value_indexes[var].equals(
+            wxdset.missing_value_indexes[var].sort_values())
+
+    wxdset = WXDataFrame(filename, gapfill_kwargs={
+        'steps': ['interpolate', 'climatology', 'zero'],
+        'max_interp_gap': 1})
+    assert wxdset.metadata['Gapfill'] == 'interpolate + climatology + zero'
+    variables = ['Tmax', 'Tmin', 'Tavg', 'Ptot']
+    assert not wxdset.data[variables].isnull().any().any()
+
+
+if __name__ == "__main__":
+    pytest.main(['-x', __file__, '-v', '-rw'])
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+# ---- Third party imports
+import numpy as np
+import pandas as pd
+
+# ---- Local library imports
+from gwhat.common.utils import calc_dist_from_coord
+from gwhat.meteo.weather_reader import WXDataFrameBase, METEO_VARIABLES
+
+BLENDING_METHODS = ['idw', 'nearest']
+
+
+class WXDataFrameBlend(WXDataFrameBase):
+    """
+    A daily weather dataset that is composed from the data of several
+    weather datasets located around a given location.
+
+    Parameters
+    ----------
+    wxdsets : list of WXDataFrameBase
+        The weather datasets from which to compose the daily series.
+    lat : float
+        The latitude of the location, in decimal degrees.
+    lon : float
+        The longitude of the location, in decimal degrees.
+    method : str
+        Either 'idw' to use an inverse-distance-weighted average of the
+        valid values of all datasets, or 'nearest' to use the valid value
+        of the closest dataset.
+    power : float
+        The power parameter of the inverse distance weighting.
+    """
+
+    def __init__(self, wxdsets, lat, lon, method='idw', power=2,
+                 *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__load_dataset__(wxdsets, lat, lon, method, power)
+
+    def __getitem__(self, key):
+        raise NotImplementedError
+
+    def __setitem__(self, key, value):
+        raise NotImplementedError
+
+    def __iter__(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        return len(self.data)
+
+    def __load_dataset__(self, wxdsets, lat, lon, method, power):
+        if method not in BLENDING_METHODS:
+            raise ValueError("'method' must be one of {}.".format(
+                BLENDING_METHODS))
+        if len(wxdsets) == 0:
+            raise ValueError("At least one weather dataset is required.")
+
+        dists = calc_dist_from_coord(
+            lat, lon,
+            np.array([wxdset.metadata['Latitude'] for wxdset in wxdsets]),
+            np.array([wxdset.metadata['Longitude'] for wxdset in wxdsets]))
+        order = np.argsort(dists, kind='stable')
+        wxdsets = [wxdsets[i] for i in order]
+        dists = dists[order]
+
+        if method == 'idw':
+            # We use a minimum distance of 1 m to avoid dividing by zero
+            # when a station is located exactly at the location.
+            weights = 1 / np.maximum(dists, 0.001)**power
+        else:
+            weights = np.zeros(len(wxdsets))
+            weights[0] = 1
+
+        self.data, self.missing_value_indexes = blend_wxdsets_data(
+            wxdsets, weights, method)
+
+        self.metadata['Station Name'] = ' + '.join(
+            [wxdset.metadata['Station Name'] for wxdset in wxdsets])
+        self.metadata['Station ID'] = ' + '.join(
+            [str(wxdset.metadata['Station ID']) for wxdset in wxdsets])
+        self.metadata['Location'] = wxdsets[0].metadata['Location']
+        self.metadata['Latitude'] = lat
+        self.metadata['Longitude'] = lon
+        self.metadata['Elevation'] = float(np.average(
+            [wxdset.metadata['Elevation'] for wxdset in wxdsets],
+            weights=weights))
+        self.metadata['Blending'] = '{} (k={})'.format(method, len(wxdsets))
+
+    @property
+    def name(self):
+        return 'Blend of ' + self.metadata['Station Name']
+
+
+def blend_wxdsets_data(wxdsets, weights, method='idw'):
+    """
+    Compose daily weather series from the data of several weather datasets.
+
+    The weather datasets must be sorted from the closest to the farthest.
+    Values saved in the 'missing_value_indexes' of a dataset are considered
+    not valid and are replaced with the data of the other datasets. Values
+    that are missing in all datasets are taken from the closest dataset and
+    are saved in the 'missing_value_indexes' of the composed series. Days
+    for which none of the datasets has data are left as NaN, except for
+    the temperature and PET, which are interpolated between valid days.
+
+    Returns
+    -------
+    data : pandas.DataFrame
+        A dataframe with the composed daily weather series.
+    missing_value_indexes : dict
+        A dictionary with the datetime indexes where data could not be
+        filled from any of the weather datasets.
+    """
+    index = wxdsets[0].data.index
+    for wxdset in wxdsets[1:]:
+        index = index.union(wxdset.data.index)
+
+    weights = np.asarray(weights, dtype='float64')[np.newaxis, :]
+    data = pd.DataFrame([], index=index, columns=METEO_VARIABLES)
+    missing_value_indexes = {}
+    for var in METEO_VARIABLES:
+        values = np.column_stack([
+            wxdset.data[var].reindex(index).values.astype('float64') for
+            wxdset in wxdsets])
+        valid = np.column_stack([
+            ~index.isin(wxdset.missing_value_indexes.get(
+                var, pd.DatetimeIndex([]))) for
+            wxdset in wxdsets])
+        valid &= ~np.isnan(values)
+        any_valid = valid.any(axis=1)
+
+        if method == 'idw':
+            varweights = weights * valid
+            sumweights = varweights.sum(axis=1)
+            sumweights[~any_valid] = 1
+            blended = np.sum(
+                np.where(valid, values, 0) * varweights, axis=1) / sumweights
+        else:
+            first_valid = np.argmax(valid, axis=1)
+            blended = values[np.arange(len(index)), first_valid]
+
+        # Use the values of the closest dataset where no valid values
+        # are available in any of the datasets.
+        blended[~any_valid] = values[~any_valid, 0]
+
+        data[var] = blended
+        missing_value_indexes[var] = index[~any_valid]
+    data.index.names = ['Datetime']
+
+    # Interpolate the temperature and PET between valid days the same way
+    # it is done in WXDataFrame. The other values that are still missing
+    # are left as NaN, since there is no data to fill them.
+    for var in ['Tmax', 'Tavg', 'Tmin', 'PET']:
+        data[var] = data[var].interpolate(limit_area='inside')
+
+    return data, missing_value_indexes
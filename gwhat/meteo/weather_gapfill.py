@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+# ---- Third party imports
+import numpy as np
+import pandas as pd
+
+# The steps that can be used to fill the missing values of daily weather
+# data, in the order in which they are usually applied.
+GAPFILL_STEPS = ['interpolate', 'regression', 'climatology', 'zero']
+
+# The variables that are filled by linear interpolation.
+INTERPOLATED_VARIABLES = ['Tmax', 'Tavg', 'Tmin', 'PET']
+
+# The variables for which the regression with the neighbour stations is
+# forced through the origin, so that no negative values are estimated.
+PRECIP_VARIABLES = ['Ptot', 'Rain', 'Snow']
+
+
+def gapfill_weather_data(data, steps=('interpolate', 'zero'),
+                         max_interp_gap=None, neighbours=None,
+                         min_overlap=365, climatology_window=15):
+    """
+    Fill the missing values of daily weather data with a pipeline of
+    vectorized gapfilling steps that are applied in the specified order.
+
+    Each step only fills the values that are still missing after the
+    previous steps. The available steps are:
+
+    'interpolate'
+        Linear interpolation within the station of the temperature and
+        evapotranspiration data, for gaps no longer than max_interp_gap days.
+    'regression'
+        Linear regression with the data of the neighbour stations, which
+        are used in order of preference. Only the neighbours with at least
+        min_overlap days of valid data in common with the station are used.
+    'climatology'
+        The mean value of the station for the same day of the year,
+        smoothed with a centered window of climatology_window days.
+    'zero'
+        The remaining missing values are set to 0.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        A dataframe with a continuous daily datetime index containing the
+        weather data to fill, with missing values set to NaN.
+    steps : list of str
+        The steps of the pipeline.
+    max_interp_gap : int
+        The maximum length in days of the gaps that are filled by
+        interpolation. Gaps of any length are filled if None.
+    neighbours : list of WXDataFrameBase
+        The weather datasets of the neighbour stations, sorted in order of
+        preference. Values saved in the 'missing_value_indexes' of
+        a neighbour are not used.
+    min_overlap : int
+        The minimum number of days of valid data in common with a neighbour
+        that is required to use it in the regression step.
+    climatology_window : int
+        The width in days of the window used to smooth the climatology.
+
+    Returns
+    -------
+    data : pandas.DataFrame
+        A copy of the dataframe with the missing values filled.
+    filled_indexes : dict
+        A dictionary with the datetime indexes of the values that were
+        filled for each variable.
+    """
+    for step in steps:
+        if step not in GAPFILL_STEPS:
+            raise ValueError("The gapfill steps must be one of {}.".format(
+                GAPFILL_STEPS))
+
+    isnull = data.isnull()
+    data = data.copy()
+    for step in steps:
+        if step == 'interpolate':
+            columns = [
+                col for col in INTERPOLATED_VARIABLES if col in data.columns]
+            data[columns] = _interpolate_gaps(data[columns], max_interp_gap)
+        elif step == 'regression' and neighbours:
+            for col in data.columns:
+                data[col] = _fill_from_neighbours(
+                    data[col], neighbours, min_overlap)
+        elif step == 'climatology':
+            data = data.fillna(
+                _calcul_climatology(data.where(~isnull), climatology_window))
+        elif step == 'zero':
+            data = data.fillna(0)
+
+    filled = isnull & data.notnull()
+    filled_indexes = {
+        col: data.index[filled[col].values] for col in data.columns}
+    return data, filled_indexes
+
+
+def _interpolate_gaps(data, max_gap=None):
+    """
+    Fill the missing values of the columns of data by linear interpolation,
+    leaving untouched the gaps that are longer than max_gap values.
+    """
+    interpolated = data.interpolate()
+    if max_gap is None:
+        return interpolated
+
+    isnull = data.isnull().values
+    # Label each gap with the number of valid values preceding it, so that
+    # the values of a same gap share the same label in a column.
+    labels = np.cumsum(~isnull, axis=0)
+    too_long = np.zeros_like(isnull)
+    for j in range(isnull.shape[1]):
+        gap_lengths = np.bincount(
+            labels[isnull[:, j], j], minlength=len(data) + 1)
+        too_long[:, j] = isnull[:, j] & (gap_lengths[labels[:, j]] > max_gap)
+    return interpolated.mask(too_long)
+
+
+def _fill_from_neighbours(series, neighbours, min_overlap=365):
+    """
+    Fill the missing values of series with the values of the neighbours
+    estimated with a linear regression. The value of the first neighbour,
+    in order of preference, with a valid value is used for each missing
+    value.
+    """
+    var = series.name
+    isnull = series.isnull().values
+    if not isnull.any():
+        return series
+
+    # Stack the valid values of the neighbours in an array of shape (n, k).
+    values = []
+    for neighbour in neighbours:
+        if var not in neighbour.data.columns:
+            continue
+        nvalues = neighbour.data[var].reindex(series.index).values.astype(
+            'float64')
+        missing = neighbour.missing_value_indexes.get(var)
+        if missing is not None and len(missing):
+            nvalues[series.index.isin(missing)] = np.nan
+        values.append(nvalues)
+    if not values:
+        return series
+    x = np.column_stack(values)
+    y = series.values.astype('float64')[:, np.newaxis]
+
+    # Calcul the regression coefficients of all the neighbours at once
+    # with the values that are valid for both the station and a neighbour.
+    overlap = ~np.isnan(x) & ~np.isnan(y)
+    count = overlap.sum(axis=0)
+    xo = np.where(overlap, x, 0)
+    yo = np.where(overlap, y, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if var in PRECIP_VARIABLES:
+            slope = yo.sum(axis=0) / xo.sum(axis=0)
+            intercept = np.zeros_like(slope)
+        else:
+            xmean = xo.sum(axis=0) / count
+            ymean = yo.sum(axis=0) / count
+            slope = (
+                np.sum(overlap * (xo - xmean) * (yo - ymean), axis=0) /
+                np.sum(overlap * (xo - xmean)**2, axis=0))
+            intercept = ymean - slope * xmean
+    usable = (count >= min_overlap) & np.isfinite(slope)
+    if not usable.any():
+        return series
+
+    # Use the estimate of the first usable neighbour with a valid value.
+    estimates = intercept[usable] + slope[usable] * x[:, usable]
+    valid = ~np.isnan(estimates)
+    has_valid = valid.any(axis=1)
+    first_valid = np.argmax(valid, axis=1)
+    estimated = estimates[np.arange(len(estimates)), first_valid]
+    if var in PRECIP_VARIABLES:
+        estimated = np.maximum(estimated, 0)
+
+    fill = isnull & has_valid
+    series = series.copy()
+    series.values[fill] = estimated[fill]
+    return series
+
+
+def _calcul_climatology(data, window=15):
+    """
+    Return a dataframe with the same index as data containing the mean
+    value of each column for the same day of the year, smoothed with a
+    centered circular window of the specified number of days.
+    """
+    dayofyear = data.index.dayofyear.values - 1
+    valid = data.notnull().values
+    sums = np.zeros((366, data.shape[1]))
+    counts = np.zeros((366, data.shape[1]))
+    np.add.at(sums, dayofyear, np.where(valid, data.values, 0))
+    np.add.at(counts, dayofyear, valid)
+
+    # Smooth the sums and counts with a circular window.
+    half_window = window // 2
+    kernel = np.ones(2 * half_window + 1)
+    wrapped_sums = np.vstack(
+        (sums[-half_window:], sums, sums[:half_window]))
+    wrapped_counts = np.vstack(
+        (counts[-half_window:], counts, counts[:half_window]))
+    smoothed_sums = np.column_stack([
+        np.convolve(wrapped_sums[:, j], kernel, mode='valid') for
+        j in range(data.shape[1])])
+    smoothed_counts = np.column_stack([
+        np.convolve(wrapped_counts[:, j], kernel, mode='valid') for
+        j in range(data.shape[1])])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        climatology = smoothed_sums / smoothed_counts
+
+    return pd.DataFrame(
+        climatology[dayofyear], index=data.index, columns=data.columns)
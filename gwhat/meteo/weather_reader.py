@@ -9,8 +9,8 @@
 
 
 # ---- Standard library imports
+from contextlib import closing
 import csv
-import datetime as dt
 import os
 import os.path as osp
 import re
@@ -23,13 +23,16 @@ from abc import abstractmethod
 import numpy as np
 import pandas as pd
 from pandas.errors import EmptyDataError
-import xlrd
-from xlrd.xldate import xldate_as_datetime
 
 # ---- Local library imports
-from gwhat.meteo.evapotranspiration import calcul_thornthwaite
-from gwhat.common.utils import save_content_to_file
+from gwhat.meteo.evapotranspiration import calcul_pet_batch
+from gwhat.meteo.weather_gapfill import gapfill_weather_data
+from gwhat.common.utils import (
+    save_content_to_file, iter_csv_rows, iter_excel_rows)
 from gwhat.utils.math import nan_as_text_tolist
+from gwhat.utils.dates import datetimeindex_to_xldates
+from gwhat.utils.datacache import (
+    load_cached_datafile, save_cached_datafile)
 from gwhat import __namever__
 
 
@@ -60,9 +63,14 @@ class WXDataFrameBase(Mapping):
             'Latitude': 0,
             'Longitude': 0,
             'Elevation': 0}
+        self._aggregates = {}
         self.data = pd.DataFrame([], columns=METEO_VARIABLES)
         self.missing_value_indexes = {
             var: pd.DatetimeIndex([]) for var in METEO_VARIABLES}
+        self.filled_value_indexes = {
+            var: pd.DatetimeIndex([]) for var in METEO_VARIABLES}
+        self._xldates = None
+        self._xldates_index = None
 
     @abstractmethod
     def __load_dataset__(self):
@@ -111,6 +119,27 @@ class WXDataFrameBase(Mapping):
         fcontent.extend(nan_as_text_tolist(data.values))
         save_content_to_file(filename, fcontent)
 
+    @property
+    def data(self):
+        """Return the dataframe containing the daily weather data."""
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        """Set the daily weather data and clear the cached aggregates."""
+        self._data = data
+        self.clear_aggregates()
+
+    def clear_aggregates(self):
+        """
+        Clear the monthly and yearly values and the normals that were
+        calculated and cached for this dataset.
+
+        This needs to be called when the values of the data are changed
+        in place.
+        """
+        self._aggregates = {}
+
     def get_data_period(self):
         """
         Return the year range for which data are available for this
@@ -118,14 +147,27 @@ class WXDataFrameBase(Mapping):
         """
         return (self.data.index.min().year, self.data.index.max().year)
 
+    @property
+    def xldates(self):
+        """
+        Return a read-only numpy array containing the Excel numerical dates
+        corresponding to the dates of the dataset.
+
+        The dates are converted only once and are cached until the index
+        of the data is replaced.
+        """
+        if self._xldates_index is not self.data.index:
+            self._xldates = datetimeindex_to_xldates(self.data.index)
+            self._xldates.flags.writeable = False
+            self._xldates_index = self.data.index
+        return self._xldates
+
     def get_xldates(self):
         """
         Return a numpy array containing the Excel numerical dates
         corresponding to the dates of the dataset.
         """
-        timedeltas = self.data.index - xldate_as_datetime(4000, 0)
-        xldates = timedeltas.total_seconds() / (3600 * 24) + 4000
-        return xldates.values
+        return self.xldates
 
     # ---- utilities
     def strftime(self):
@@ -135,66 +177,177 @@ class WXDataFrameBase(Mapping):
         """
         return self.data.index.strftime("%Y-%m-%dT%H:%M:%S").values.tolist()
 
+    # ---- Potential evapotranspiration
+    def set_pet_method(self, method):
+        """
+        Calculate the daily potential evapotranspiration of this dataset
+        from its temperature data with the specified method.
+
+        See PET_METHODS in gwhat.meteo.evapotranspiration for the list of
+        available methods.
+        """
+        set_wxdsets_pet_method([self], method)
+
+    def set_pet(self, pet, method):
+        """
+        Set the daily potential evapotranspiration values of this dataset
+        and save the method used to calculate them in the metadata.
+        """
+        self.data['PET'] = np.asarray(pet, dtype='float64')
+        self.metadata['PET method'] = method
+        self.clear_aggregates()
+
     # ---- Monthly and yearly values
-    def get_monthly_values(self):
+    def _get_aggregate(self, key, func):
         """
-        Return the monthly mean or cummulative values for the weather
-        variables saved in this data frame.
+        Return the aggregate of the data saved in the cache at key,
+        calculating it with func if it is not cached yet.
         """
-        group = self.data.groupby(
-            [self.data.index.year, self.data.index.month])
-        df = pd.concat(
+        if key not in self._aggregates:
+            self._aggregates[key] = func()
+        return self._aggregates[key]
+
+    def _calcul_aggregated_values(self, by):
+        """
+        Return the sum of the precipitation and evapotranspiration and the
+        mean of the temperature of the data grouped by the specified keys.
+        """
+        group = self.data.groupby(by)
+        return pd.concat(
             [group[['Ptot', 'Rain', 'Snow', 'PET']].sum(),
              group[['Tmax', 'Tavg', 'Tmin']].mean()],
             axis=1)
+
+    def _calcul_monthly_values(self):
+        df = self._calcul_aggregated_values(
+            [self.data.index.year, self.data.index.month])
         df.index.rename(['Year', 'Month'], inplace=True)
         return df
 
+    def _calcul_yearly_values(self):
+        df = self._calcul_aggregated_values(self.data.index.year)
+        df.index.rename('Year', inplace=True)
+        return df
+
+    def get_monthly_values(self):
+        """
+        Return the monthly mean or cummulative values for the weather
+        variables saved in this data frame.
+        """
+        return self._get_aggregate(
+            'monthly', self._calcul_monthly_values).copy()
+
     def get_yearly_values(self):
         """
         Return the yearly mean or cummulative values for the weather
         variables saved in this data frame.
         """
-        group = self.data.groupby(self.data.index.year)
-        df = pd.concat(
-            [group[['Ptot', 'Rain', 'Snow', 'PET']].sum(),
-             group[['Tmax', 'Tavg', 'Tmin']].mean()],
-            axis=1)
-        df.index.rename('Year', inplace=True)
-        return df
+        return self._get_aggregate(
+            'yearly', self._calcul_yearly_values).copy()
 
     # ---- Normals
+    def _calcul_monthly_cumsums(self):
+        """
+        Return the years of the monthly values, along with the cumulative
+        sums over the years of the monthly values, of the number of valid
+        monthly values and of the number of months with data.
+        """
+        df = self._get_aggregate('monthly', self._calcul_monthly_values)
+        years = np.unique(df.index.get_level_values(0))
+        irows = np.searchsorted(years, df.index.get_level_values(0))
+        imonths = df.index.get_level_values(1) - 1
+
+        values = np.full((len(years), 12, df.shape[1]), np.nan)
+        values[irows, imonths] = df.values
+        has_data = np.zeros((len(years), 12), dtype=int)
+        has_data[irows, imonths] = 1
+        return (years,
+                _cumsum_with_zero(np.nan_to_num(values)),
+                _cumsum_with_zero(~np.isnan(values)),
+                _cumsum_with_zero(has_data))
+
+    def _calcul_yearly_cumsums(self):
+        """
+        Return the years of the yearly values, along with the cumulative
+        sums over the years of the yearly values and of the number of
+        valid yearly values.
+        """
+        df = self._get_aggregate('yearly', self._calcul_yearly_values)
+        return (df.index.values,
+                _cumsum_with_zero(np.nan_to_num(df.values)),
+                _cumsum_with_zero(df.notnull().values))
+
     def get_monthly_normals(self, year_range=None):
         """
         Return the monthly normals for the weather variables saved in this
         data frame.
         """
-        df = self.get_monthly_values()
-        if year_range:
-            df = df.loc[(df.index.get_level_values(0) >= year_range[0]) &
-                        (df.index.get_level_values(0) <= year_range[1])]
-        df = df.groupby(level=[1]).mean()
-        df.index.rename('Month', inplace=True)
-        return df
+        years, sums, counts, has_data = self._get_aggregate(
+            'monthly_cumsums', self._calcul_monthly_cumsums)
+        i, j = _get_year_range_slice(years, year_range)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normals = (sums[j] - sums[i]) / (counts[j] - counts[i])
+        months = (has_data[j] - has_data[i]) > 0
+
+        columns = self._get_aggregate(
+            'monthly', self._calcul_monthly_values).columns
+        return pd.DataFrame(
+            normals[months],
+            index=pd.Index(np.arange(1, 13)[months], name='Month'),
+            columns=columns)
 
     def get_yearly_normals(self, year_range=None):
         """
         Return the yearly normals for the weather variables saved in this
         data frame.
         """
-        df = self.get_yearly_values()
-        if year_range:
-            df = df.loc[(df.index >= year_range[0]) &
-                        (df.index <= year_range[1])]
-        return df.mean()
+        years, sums, counts = self._get_aggregate(
+            'yearly_cumsums', self._calcul_yearly_cumsums)
+        i, j = _get_year_range_slice(years, year_range)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normals = (sums[j] - sums[i]) / (counts[j] - counts[i])
+
+        columns = self._get_aggregate(
+            'yearly', self._calcul_yearly_values).columns
+        return pd.Series(normals, index=columns)
+
+
+def _cumsum_with_zero(values):
+    """
+    Return the cumulative sums along the first axis of values, with a
+    leading row of zeros, so that the sum of values[i:j] is given by
+    cumsums[j] - cumsums[i].
+    """
+    cumsums = np.zeros((len(values) + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=cumsums[1:])
+    return cumsums
+
+
+def _get_year_range_slice(years, year_range=None):
+    """
+    Return the indexes of the first and after last element of the sorted
+    array of years that are within the specified year range.
+    """
+    if not year_range:
+        return 0, len(years)
+    return (np.searchsorted(years, year_range[0], side='left'),
+            np.searchsorted(years, year_range[1], side='right'))
 
 
 class WXDataFrame(WXDataFrameBase):
-    """A daily weather dataset container that loads its data from a file."""
+    """
+    A daily weather dataset container that loads its data from a file.
 
-    def __init__(self, filename, *args, **kwargs):
+    The missing values of the dataset are filled with the gapfilling
+    pipeline of gapfill_weather_data, which can be configured with a
+    dictionary of keyword arguments passed with gapfill_kwargs. By default,
+    the temperature and evapotranspiration data are filled by linear
+    interpolation and the remaining missing values are set to 0.
+    """
+
+    def __init__(self, filename, *args, gapfill_kwargs=None, **kwargs):
         super(WXDataFrame, self).__init__(*args, **kwargs)
-        self.__load_dataset__(filename)
+        self.__load_dataset__(filename, gapfill_kwargs)
 
     def __getitem__(self, key):
         raise NotImplementedError
@@ -211,7 +364,7 @@ class WXDataFrame(WXDataFrameBase):
     def __str__(self):
         return self.data.__str__()
 
-    def __load_dataset__(self, filename):
+    def __load_dataset__(self, filename, gapfill_kwargs=None):
         """Loads the dataset from a file and saves it in the store."""
         print('-' * 78)
         print('Reading weather data from "%s"...' % os.path.basename(filename))
@@ -224,14 +377,15 @@ class WXDataFrame(WXDataFrameBase):
         finfo = root + '.log'
         if os.path.exists(finfo):
             print('Reading gapfill data from "%s"...' % osp.basename(finfo))
-            var_labels = [('Tmax', 'Max Temp (deg C)'),
-                          ('Tmin', 'Min Temp (deg C)'),
-                          ('Tavg', 'Mean Temp (deg C)'),
-                          ('Ptot', 'Total Precip (mm)')]
-            for var, label in var_labels:
+            log_indexes = read_weather_log(finfo)
+            if log_indexes is None:
+                print('WARNING: the format of the gapfill data file is '
+                      'not valid.')
+                log_indexes = {}
+            for var, index in log_indexes.items():
                 self.missing_value_indexes[var] = (
                     self.missing_value_indexes[var]
-                    .append(load_weather_log(finfo, label))
+                    .append(index)
                     .drop_duplicates()
                     )
 
@@ -246,14 +400,15 @@ class WXDataFrame(WXDataFrameBase):
                     .append(self.data.index[pd.isnull(self.data[var])])
                     .drop_duplicates())
 
-        # Fill missing with values with in-stations linear interpolation for
-        # temperature based variables.
-        for var in ['Tmax', 'Tavg', 'Tmin', 'PET']:
-            if var in self.data.columns:
-                self.data[var] = self.data[var].interpolate()
-
-        # We fill the remaining missing value with 0.
-        self.data = self.data.fillna(0)
+        # Fill the missing values and store the time indexes of the values
+        # that were filled. Note that the filled values are all tracked in
+        # the missing value indexes stored above.
+        gapfill_kwargs = dict(gapfill_kwargs or {})
+        gapfill_kwargs.setdefault('steps', ['interpolate', 'zero'])
+        self.data, filled_indexes = gapfill_weather_data(
+            self.data, **gapfill_kwargs)
+        self.filled_value_indexes.update(filled_indexes)
+        self.metadata['Gapfill'] = ' + '.join(gapfill_kwargs['steps'])
 
         # Generate rain and snow daily series if it was not present in the
         # datafile.
@@ -265,9 +420,10 @@ class WXDataFrame(WXDataFrameBase):
 
         # Calculate potential evapotranspiration if missing.
         if 'PET' not in self.data.columns:
-            self.data['PET'] = calcul_thornthwaite(
-                self.data['Tavg'], self.metadata['Latitude'])
+            self.set_pet_method('thornthwaite')
             print("Potential evapotranspiration evaluated with Thornthwaite.")
+        else:
+            self.metadata['PET method'] = 'datafile'
 
         isnull = self.data.isnull().any()
         if isnull.any():
@@ -276,15 +432,169 @@ class WXDataFrame(WXDataFrameBase):
         print('-' * 78)
 
 
+# The regexes and types used to read the metadata from the header of the
+# weather data files.
+HEADER_REGEX_TYPE = OrderedDict([
+    ('Station Name', (r'(stationname|name)', str)),
+    ('Station ID', (r'(stationid|id|climateidentifier)', str)),
+    ('Latitude', (r'(latitude)', float)),
+    ('Longitude', (r'(longitude)', float)),
+    ('Location', (r'(location|province)', str)),
+    ('Elevation', (r'(elevation|altitude)', float))])
+
+# The data must contain the following columns :
+# (1) Tmax, (2) Tavg, (3) Tmin, (4) Ptot.
+# The dataframe can also have these optional columns:
+# (5) Rain, (6) Snow, (7) PET
+COLUMN_NAMES_REGEXES = OrderedDict([
+    ('Year', r'(year)'),
+    ('Month', r'(month)'),
+    ('Day', r'(day)'),
+    ('Tmax', r'(maxtemp)'),
+    ('Tmin', r'(mintemp)'),
+    ('Tavg', r'(meantemp)'),
+    ('Ptot', r'(totalprecip)'),
+    ('PET', r'(etp|evapo)'),
+    ('Rain', r'(rain)'),
+    ('Snow', r'(snow)')])
+
+# The values that are considered missing in the weather data files, in
+# addition to blank values.
+NA_VALUES = ['nan', 'NaN', 'NAN', 'none', 'None', 'NONE']
+
+
+def _read_weather_header(rows, metadata):
+    """
+    Read the metadata from the header rows of a weather datafile and save
+    them in metadata.
+
+    Return the index of the row containing the column names of the data
+    and the content of this row. The iteration over the rows stops at the
+    row containing the column names, so that the rows can be streamed from
+    an open file.
+    """
+    for i, row in enumerate(rows):
+        if len(row) == 0 or pd.isnull(row[0]):
+            continue
+
+        label = str(row[0]).replace(" ", "").replace("_", "")
+        for key, (regex, dtype) in HEADER_REGEX_TYPE.items():
+            if re.search(regex, label, re.IGNORECASE):
+                try:
+                    metadata[key] = dtype(row[1])
+                except ValueError:
+                    print("Wrong format for entry '{}'.".format(key))
+                else:
+                    break
+        else:
+            if re.search(r'(year)', label, re.IGNORECASE):
+                return i, row
+    raise ValueError("Cannot find the beginning of the data.")
+
+
+def _map_weather_columns(columns):
+    """
+    Return the indexes of the columns of a weather datafile that are
+    recognized and the names to which they are mapped. Only the first
+    column that is mapped to a given name is kept.
+    """
+    usecols = []
+    names = []
+    for j, column in enumerate(columns):
+        column_ = str(column).replace(" ", "").replace("_", "")
+        for key, regex in COLUMN_NAMES_REGEXES.items():
+            if re.search(regex, column_, re.IGNORECASE):
+                if key not in names:
+                    usecols.append(j)
+                    names.append(key)
+                break
+    return usecols, names
+
+
+def _coerce_to_numeric(data):
+    """
+    Convert the columns of data to numeric values. Values that cannot be
+    converted are set to NaN.
+    """
+    for col in data.columns:
+        values = data[col]
+        numeric_values = pd.to_numeric(values, errors='coerce')
+        is_invalid = (
+            numeric_values.isnull() & values.notnull() &
+            ~values.astype(str).str.strip().isin([''] + NA_VALUES))
+        if is_invalid.any():
+            print("Some {} data could not be converted to numeric value"
+                  .format(col))
+        data[col] = numeric_values.astype('float64')
+    return data
+
+
+def read_weather_csv(filename):
+    """
+    Read the metadata and the data of a weather csv datafile in a single
+    pass. Only the header lines are scanned for the metadata, then the
+    columns of the data that are recognized are parsed directly by pandas
+    as floats, with blank values and nan tokens read as NaN.
+    """
+    metadata = {}
+    with open(filename, 'r') as csvfile:
+        i, columns = _read_weather_header(iter_csv_rows(csvfile), metadata)
+        usecols, names = _map_weather_columns(columns)
+        data_start = csvfile.tell()
+        try:
+            data = pd.read_csv(
+                csvfile, header=None, usecols=usecols, dtype='float64',
+                na_values=NA_VALUES, skipinitialspace=True)
+        except EmptyDataError:
+            data = pd.DataFrame([], columns=usecols, dtype='float64')
+        except ValueError:
+            # Some values cannot be converted to floats, so we read
+            # the values as strings and coerce them.
+            csvfile.seek(data_start)
+            data = pd.read_csv(
+                csvfile, header=None, usecols=usecols, dtype=str,
+                na_values=NA_VALUES, skipinitialspace=True)
+            data.columns = names
+            data = _coerce_to_numeric(data)
+    data.columns = names
+    return metadata, data
+
+
+def read_weather_excel(filename):
+    """
+    Read the metadata and the data of a weather xls or xlsx datafile in a
+    single pass. The rows of the file are streamed, so that only the values
+    of the columns that are recognized are kept in memory.
+    """
+    metadata = {}
+    with closing(iter_excel_rows(filename)) as rows:
+        i, columns = _read_weather_header(rows, metadata)
+        usecols, names = _map_weather_columns(columns)
+        values = [[row[j] if j < len(row) else None for j in usecols] for
+                  row in rows]
+    data = pd.DataFrame(values, columns=names)
+    data = _coerce_to_numeric(data)
+    return metadata, data
+
+
 def read_weather_datafile(filename):
     """
     Read the weather data from the provided filename.
 
+    The parsed data are saved in a cache, so that the file is not parsed
+    again if it did not change the next time it is read.
+
     Parameters
     ----------
     filename : str
         The absolute path of an input weather data file.
     """
+    cached = load_cached_datafile(filename, __name__)
+    if cached is not None:
+        metadata, data = cached
+        metadata['filename'] = filename
+        return metadata, data
+
     metadata = {'filename': filename,
                 'Station Name': '',
                 'Station ID': '',
@@ -293,83 +603,16 @@ def read_weather_datafile(filename):
                 'Longitude': 0,
                 'Elevation': 0}
 
-    # Read the file.
+    # Read the metadata and the numerical data from the file.
     root, ext = osp.splitext(filename)
     if ext in ['.csv', '.out']:
-        with open(filename, 'r') as csvfile:
-            data = list(csv.reader(csvfile, delimiter=','))
+        header, data = read_weather_csv(filename)
     elif ext in ['.xls', '.xlsx']:
-        data = pd.read_excel(filename, dtype='str', header=None)
-        data = data.values.tolist()
+        header, data = read_weather_excel(filename)
     else:
         raise ValueError("Supported file format are: ",
                          ['.csv', '.out', '.xls', '.xlsx'])
-
-    # Read the metadata and try to find the row where the
-    # numerical data begin.
-    header_regex_type = {
-        'Station Name': (r'(stationname|name)', str),
-        'Station ID': (r'(stationid|id|climateidentifier)', str),
-        'Latitude': (r'(latitude)', float),
-        'Longitude': (r'(longitude)', float),
-        'Location': (r'(location|province)', str),
-        'Elevation': (r'(elevation|altitude)', float)}
-    for i, row in enumerate(data):
-        if len(row) == 0 or pd.isnull(row[0]):
-            continue
-
-        label = row[0].replace(" ", "").replace("_", "")
-        for key, (regex, dtype) in header_regex_type.items():
-            if re.search(regex, label, re.IGNORECASE):
-                try:
-                    metadata[key] = dtype(row[1])
-                except ValueError:
-                    print("Wrong format for entry '{}'.".format(key))
-                else:
-                    break
-        else:
-            if re.search(r'(year)', label, re.IGNORECASE):
-                break
-    else:
-        raise ValueError("Cannot find the beginning of the data.")
-
-    # Extract and format the numerical data from the file.
-    data = pd.DataFrame(data[i + 1:], columns=data[i])
-    data = data.replace(r'(?i)^\s*$|nan|none', np.nan, regex=True)
-
-    # The data must contain the following columns :
-    # (1) Tmax, (2) Tavg, (3) Tmin, (4) Ptot.
-    # The dataframe can also have these optional columns:
-    # (5) Rain, (6) Snow, (7) PET
-    # The dataframe must use a datetime index.
-
-    column_names_regexes = OrderedDict([
-        ('Year', r'(year)'),
-        ('Month', r'(month)'),
-        ('Day', r'(day)'),
-        ('Tmax', r'(maxtemp)'),
-        ('Tmin', r'(mintemp)'),
-        ('Tavg', r'(meantemp)'),
-        ('Ptot', r'(totalprecip)'),
-        ('PET', r'(etp|evapo)'),
-        ('Rain', r'(rain)'),
-        ('Snow', r'(snow)')])
-    for i, column in enumerate(data.columns):
-        column_ = column.replace(" ", "").replace("_", "")
-        for key, regex in column_names_regexes.items():
-            if re.search(regex, column_, re.IGNORECASE):
-                data = data.rename(columns={column: key})
-                break
-        else:
-            data = data.drop([column], axis=1)
-
-    for col in data.columns:
-        try:
-            data[col] = pd.to_numeric(data[col])
-        except ValueError:
-            data[col] = pd.to_numeric(data[col], errors='coerce')
-            print("Some {} data could not be converted to numeric value"
-                  .format(col))
+    metadata.update(header)
 
     # We now create the time indexes for the dataframe form the year,
     # month, and day data.
@@ -386,33 +629,78 @@ def read_weather_datafile(filename):
     if 'Snow' in data.columns:
         print('Snow data imported from datafile.')
 
+    save_cached_datafile(filename, __name__, metadata, data)
     return metadata, data
 
 
-def open_weather_log(fname):
+# The labels used for the variables in the weather log files.
+LOG_VARIABLES = OrderedDict([
+    ('Tmax', 'Max Temp (deg C)'),
+    ('Tmin', 'Min Temp (deg C)'),
+    ('Tavg', 'Mean Temp (deg C)'),
+    ('Ptot', 'Total Precip (mm)')])
+
+# The number of rows before the detailed report of the weather log files.
+LOG_HEADER_NROWS = 36
+
+
+def read_weather_log(filename):
     """
-    Open the csv file and try to guess the delimiter.
-    Return None if this fails.
+    Read the dates of the values that were gapfilled for each variable
+    from a weather log file in a single pass.
+
+    The delimiter of the file is detected from its first line. Return a
+    dict with the DatetimeIndex of the gapfilled values of each variable,
+    or None if the delimiter cannot be detected.
     """
-    for dlm in [',', '\t']:
-        with open(fname, 'r') as f:
-            reader = list(csv.reader(f, delimiter=dlm))
-            if reader[0][0] == 'Station Name':
-                return reader[36:]
-    else:
-        return None
-
-
-def load_weather_log(fname, varname):
-    reader = open_weather_log(fname)
-    datetimes = []
-    for i in range(len(reader)):
-        if reader[i][0] == varname:
-            year = int(float(reader[i][1]))
-            month = int(float(reader[i][2]))
-            day = int(float(reader[i][3]))
-            datetimes.append(dt.datetime(year, month, day))
-    return pd.DatetimeIndex(datetimes)
+    with open(filename, 'r') as f:
+        first_row = f.readline()
+        for delimiter in [',', '\t']:
+            row = next(csv.reader([first_row], delimiter=delimiter), [])
+            if len(row) and row[0] == 'Station Name':
+                break
+        else:
+            return None
+
+        for i in range(LOG_HEADER_NROWS - 1):
+            f.readline()
+        try:
+            data = pd.read_csv(
+                f, sep=delimiter, header=None, usecols=[0, 1, 2, 3],
+                names=['Variable', 'Year', 'Month', 'Day'],
+                dtype={'Variable': str})
+        except EmptyDataError:
+            data = pd.DataFrame(
+                [], columns=['Variable', 'Year', 'Month', 'Day'])
+
+    data = data[data['Variable'].isin(LOG_VARIABLES.values())]
+    datetimes = pd.DatetimeIndex(pd.to_datetime(dict(
+        year=data['Year'].astype(float).astype(int),
+        month=data['Month'].astype(float).astype(int),
+        day=data['Day'].astype(float).astype(int))))
+    return {var: datetimes[(data['Variable'] == label).values] for
+            var, label in LOG_VARIABLES.items()}
+
+
+def set_wxdsets_pet_method(wxdsets, method):
+    """
+    Calculate the daily potential evapotranspiration of several weather
+    datasets at once from their temperature data with the specified method.
+
+    The temperature data of all datasets are aligned on a common daily
+    index, so that the evapotranspiration of all datasets is calculated in
+    a single vectorized step.
+    """
+    if len(wxdsets) == 0:
+        return
+    temperatures = {
+        var: pd.concat([wxdset.data[var] for wxdset in wxdsets],
+                       axis=1, keys=range(len(wxdsets)))
+        for var in ['Tmax', 'Tmin', 'Tavg']}
+    latitudes = [wxdset.metadata['Latitude'] for wxdset in wxdsets]
+    pet = calcul_pet_batch(method, latitudes, **temperatures)
+    for i, wxdset in enumerate(wxdsets):
+        wxdset.set_pet(pet[i].reindex(wxdset.data.index).values, method)
 
 
 # ----- Base functions: secondary variables
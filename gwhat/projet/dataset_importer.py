@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+# ---- Standard library imports
+from concurrent.futures import wait, FIRST_COMPLETED
+
+# ---- Third party imports
+from PyQt5.QtCore import QObject
+from PyQt5.QtCore import pyqtSignal as QSignal
+
+# ---- Local library imports
+from gwhat.projet.reader_waterlvl import WLDataset
+from gwhat.meteo.weather_reader import WXDataFrame
+from gwhat.utils.concurrency import (
+    get_max_workers, create_process_pool, call_safely)
+
+MAX_IMPORT_WORKERS = 4
+
+# The interval in seconds at which the worker checks whether the import
+# was cancelled while waiting for the datasets to be read.
+CANCEL_POLL_INTERVAL = 0.1
+
+
+def read_dataset(datatype, filename):
+    """
+    Read and return the water level or daily weather dataset saved in
+    filename.
+    """
+    if datatype == 'water level':
+        return WLDataset(filename)
+    elif datatype == 'daily weather':
+        return WXDataFrame(filename)
+    else:
+        raise ValueError("Unknown datatype '{}'.".format(datatype))
+
+
+class DatasetImportWorker(QObject):
+    """
+    A worker that reads water level or daily weather datasets from a list
+    of files and streams the datasets back as soon as they are read. When
+    there are several files, all but the first are read concurrently in a
+    pool of processes.
+
+    The worker is meant to be moved to a QThread, so that waiting for the
+    results of the process pool does not block the event loop of the GUI.
+    """
+    sig_dataset_loaded = QSignal(str, object, str)
+    sig_import_finished = QSignal()
+
+    def __init__(self, datatype, max_workers=None):
+        super(DatasetImportWorker, self).__init__()
+        self.datatype = datatype
+        self.max_workers = max_workers
+        self._filenames = []
+        self._cancelled = False
+
+    def set_filenames(self, filenames):
+        """Set the list of files from which to read the datasets."""
+        self._filenames = list(filenames)
+        self._cancelled = False
+
+    def cancel(self):
+        """
+        Cancel the import of the datasets that were not read yet. Datasets
+        that are currently being read are discarded.
+
+        This can be called from any thread and returns immediately. The
+        worker stops waiting for the results of the pool shortly after and
+        does not wait for the processes to finish reading their file.
+        """
+        self._cancelled = True
+
+    def import_datasets(self):
+        """
+        Read the datasets from the list of files and emit them one by one
+        in the order in which they finish reading.
+
+        The first file is read directly in the thread of the worker, so
+        that it is available without waiting for the processes of the pool
+        to start. The other files, if any, are read in the meantime in
+        a pool of processes.
+        """
+        if not self._filenames:
+            self.sig_import_finished.emit()
+            return
+        first_filename, *filenames = self._filenames
+        executor = None
+        futures = {}
+        try:
+            if filenames:
+                executor = create_process_pool(get_max_workers(
+                    self.max_workers, MAX_IMPORT_WORKERS, len(filenames)))
+                futures = {
+                    executor.submit(
+                        call_safely, read_dataset, self.datatype, filename):
+                    filename for filename in filenames}
+
+            dataset, error = call_safely(
+                read_dataset, self.datatype, first_filename)
+            if not self._cancelled:
+                self.sig_dataset_loaded.emit(first_filename, dataset, error)
+
+            pending = set(futures)
+            while pending and not self._cancelled:
+                # We wait with a timeout, so that a cancellation is handled
+                # promptly even when a large file is being read.
+                done, pending = wait(
+                    pending, timeout=CANCEL_POLL_INTERVAL,
+                    return_when=FIRST_COMPLETED)
+                for future in done:
+                    if self._cancelled:
+                        break
+                    filename = futures[future]
+                    try:
+                        dataset, error = future.result()
+                    except Exception as e:
+                        # This happens if the process that was reading the
+                        # file died unexpectedly.
+                        dataset, error = None, str(e) or type(e).__name__
+                    self.sig_dataset_loaded.emit(filename, dataset, error)
+        finally:
+            # We do not wait for the processes that are still reading a
+            # file, so that a cancelled import returns right away.
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self.sig_import_finished.emit()
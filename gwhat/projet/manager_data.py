@@ -13,8 +13,7 @@ import os
 import os.path as osp
 
 # ---- Third party imports
-import numpy as np
-from PyQt5.QtCore import Qt, QCoreApplication
+from PyQt5.QtCore import Qt, QCoreApplication, QThread
 from PyQt5.QtCore import pyqtSignal as QSignal
 from PyQt5.QtWidgets import (
     QWidget, QCheckBox, QComboBox, QGridLayout, QLabel, QMessageBox,
@@ -28,8 +27,8 @@ from gwhat.meteo.weather_viewer import WeatherViewer, ExportWeatherButton
 from gwhat.utils.icons import get_icon, get_iconsize
 from gwhat.utils.qthelpers import create_toolbutton
 import gwhat.common.widgets as myqt
-from gwhat.common.utils import calc_dist_from_coord
 from gwhat.projet.reader_waterlvl import WLDataset
+from gwhat.projet.dataset_importer import DatasetImportWorker
 from gwhat.projet.reader_projet import INVALID_CHARS, is_dsetname_valid
 from gwhat.meteo.weather_reader import WXDataFrame
 from gwhat.widgets.buttons import ToolBarWidget
@@ -495,11 +494,9 @@ class DataManager(QWidget):
         if self._wldset is None or self.wxdataset_count() == 0:
             return None
 
-        dist = calc_dist_from_coord(self._wldset['Latitude'],
-                                    self._wldset['Longitude'],
-                                    self.projet.get_wxdsets_lat(),
-                                    self.projet.get_wxdsets_lon())
-        closest_station = self.wxdsets[np.argmin(dist)]
+        names, dists = self.projet.get_closest_wxdsets(
+            self._wldset['Latitude'], self._wldset['Longitude'], k=1)
+        closest_station = names[0]
         self.set_current_wxdset(closest_station)
         return closest_station
 
@@ -547,8 +544,20 @@ class NewDatasetDialog(QDialog):
         self._queued_filenames = []
         self._import_progress = 0
 
+        # The datasets that were read in the background, but that were not
+        # accepted or skipped yet by the user, and the files that are
+        # still being read.
+        self._current_filename = None
+        self._loaded_datasets = {}
+        self._pending_filenames = set()
+
         self.__initUI__()
 
+        # The workers and threads of the imports that were stopped, but
+        # that did not finish yet.
+        self._stopped_imports = []
+        self._setup_import_worker()
+
     def __initUI__(self):
         # Setup the guid to select an input dataset file.
         self.directory = QLineEdit()
@@ -757,21 +766,118 @@ class NewDatasetDialog(QDialog):
         self.sig_new_dataset_loaded.emit(filename)
 
     def load_datasets(self, filenames):
-        """Start the process of loading datasets from a list of file names."""
+        """
+        Start the process of loading datasets from a list of file names.
+
+        The datasets are read concurrently in the background and are
+        displayed one at a time as soon as they are available, so that
+        the user can accept or skip them while the others are being read.
+        """
+        self._stop_importing_datasets()
+
         self._len_filenames = len(filenames)
-        self._queued_filenames = filenames
+        self._queued_filenames = list(filenames)
         self._import_progress = 1
+        self._loaded_datasets = {}
+        self._pending_filenames = set(filenames)
+
+        self.ConsoleSignal.emit(
+            "<font color=black>Loading %d %s data files...</font>" %
+            (len(self._pending_filenames), self._datatype))
+        self.import_worker.set_filenames(dict.fromkeys(filenames))
+        self.import_thread.start()
+
         current_filename = self._queued_filenames.pop(0)
         self.btn_skip.setEnabled(len(self._queued_filenames) > 0)
-        self.load_dataset(current_filename)
+        self._load_queued_dataset(current_filename)
+
+    def _load_queued_dataset(self, filename):
+        """
+        Display the dataset read from filename if it is available or
+        wait for it to be read in the background otherwise.
+        """
+        self._current_filename = filename
+        if filename in self._pending_filenames:
+            self._dataset = None
+            self.update_gui(filename)
+        else:
+            self._display_loaded_dataset(filename)
+
+    def _display_loaded_dataset(self, filename):
+        """Display the dataset that was read in the background."""
+        self._dataset = self._loaded_datasets.get(filename)
+        self.update_gui(filename)
+        self.sig_new_dataset_loaded.emit(filename)
+
+    def _handle_dataset_loaded(self, filename, dataset, error):
+        """
+        Handle when a dataset was read in the background, or when it failed
+        to be read.
+        """
+        if filename not in self._pending_filenames:
+            # This dataset was read for a previous import that was stopped.
+            return
+        self._pending_filenames.remove(filename)
+        self._loaded_datasets[filename] = dataset
+        if dataset is None:
+            print(error)
+            self.ConsoleSignal.emit(
+                "<font color=red>Failed to load %s data from %s: %s</font>" %
+                (self._datatype, osp.basename(filename), error))
+
+        if filename == self._current_filename:
+            self._display_loaded_dataset(filename)
+        else:
+            self._update_progress_label()
+
+    def _setup_import_worker(self):
+        """
+        Setup the worker and thread to read the datasets in the background.
+        """
+        self.import_worker = DatasetImportWorker(self._datatype)
+        self.import_worker.sig_dataset_loaded.connect(
+            self._handle_dataset_loaded)
+        self.import_thread = QThread()
+        self.import_worker.moveToThread(self.import_thread)
+        self.import_thread.started.connect(self.import_worker.import_datasets)
+        self.import_worker.sig_import_finished.connect(
+            self.import_thread.quit)
+
+    def _stop_importing_datasets(self):
+        """Stop reading datasets in the background and clear the results."""
+        if self.import_thread.isRunning():
+            # We do not wait for the thread to finish, so that the GUI is
+            # not blocked. Instead, the results of the stopped import are
+            # discarded and a new worker is used for the next import. A
+            # reference to the thread is kept until it finishes, since a
+            # QThread must not be destroyed while it is running.
+            stopped_import = (self.import_worker, self.import_thread)
+            self.import_worker.sig_dataset_loaded.disconnect()
+            self.import_worker.cancel()
+            self.import_thread.finished.connect(
+                lambda: self._stopped_imports.remove(stopped_import))
+            self._stopped_imports.append(stopped_import)
+            self._setup_import_worker()
+        self._current_filename = None
+        self._loaded_datasets = {}
+        self._pending_filenames = set()
+
+    def _update_progress_label(self):
+        """Update the progress of the import of the queued datasets."""
+        text = "File {} of {}".format(
+            self._import_progress, self._len_filenames)
+        if self._pending_filenames:
+            text += " ({} of {} read)".format(
+                self._len_filenames - len(self._pending_filenames),
+                self._len_filenames)
+        self._progress_label.setText(text)
 
     def update_gui(self, filename=None):
         """
         Display the values stored in the dataset. Disable the UI and show
         an error message if the dataset is not valid.
         """
-        self._progress_label.setText("File {} of {}".format(
-            self._import_progress, self._len_filenames))
+        self._update_progress_label()
 
         if filename is not None:
             self.directory.setText(filename)
@@ -825,7 +931,7 @@ class NewDatasetDialog(QDialog):
         self._import_progress += 1
         current_filename = self._queued_filenames.pop(0)
         self.btn_skip.setEnabled(len(self._queued_filenames) > 0)
-        self.load_dataset(current_filename)
+        self._load_queued_dataset(current_filename)
 
     def accept_dataset(self):
         """Accept and emit the dataset."""
@@ -871,6 +977,7 @@ class NewDatasetDialog(QDialog):
     def close(self):
         """Qt method override."""
         super(NewDatasetDialog, self).close()
+        self._stop_importing_datasets()
         self._dataset = None
         self.directory.clear()
         self.update_gui()
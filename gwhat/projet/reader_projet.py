@@ -24,12 +24,17 @@ import pandas as pd
 import datetime
 
 # ---- Local library imports
-from gwhat.meteo.weather_reader import WXDataFrameBase, METEO_VARIABLES
+from gwhat.meteo.weather_reader import (
+    WXDataFrameBase, METEO_VARIABLES, set_wxdsets_pet_method)
+from gwhat.meteo.weather_blender import WXDataFrameBlend
 from gwhat.projet.reader_waterlvl import WLDatasetBase, WLDataFrame
 from gwhat.gwrecharge.glue import GLUEDataFrameBase
 from gwhat.common.utils import save_content_to_file
 from gwhat.utils.math import nan_as_text_tolist, calcul_rmse
-from gwhat.utils.dates import xldates_to_datetimeindex, xldates_to_strftimes
+from gwhat.utils.dates import (
+    xldates_to_datetimeindex, xldates_to_strftimes, datetimeindex_to_dayruns,
+    dayruns_to_datetimeindex)
+from gwhat.utils.spatial import StationSpatialIndex
 
 INVALID_CHARS = ['\\', '/', ':', '*', '?', '"', '<', '>', '|']
 
@@ -37,6 +42,8 @@ INVALID_CHARS = ['\\', '/', ':', '*', '?', '"', '<', '>', '|']
 class ProjetReader(object):
     def __init__(self, filename):
         self.__db = None
+        self._wxdsets_spatial_index = None
+        self._blended_wxdsets = {}
         self.load_projet(filename)
 
     def __del__(self):
@@ -57,6 +64,8 @@ class ProjetReader(object):
     def load_projet(self, filename):
         """Open the hdf5 project file."""
         self.close()
+        self._wxdsets_spatial_index = None
+        self._blended_wxdsets = {}
         print("Loading project from '{}'... ".format(osp.basename(filename)),
               end='')
         try:
@@ -291,6 +300,7 @@ class ProjetReader(object):
         """Delete the specified water level dataset."""
         del self.db['wldsets/%s' % name]
         self.db.flush()
+        self._blended_wxdsets = {}
 
     # ---- Weather Dataset Handlers
     @property
@@ -305,15 +315,82 @@ class ProjetReader(object):
         """
         Return a list with the latitude coordinates of the weather datasets.
         """
-        return [self.db['wxdsets/%s' % name].attrs['Latitude'] for
-                name in self.wxdsets]
+        return self.get_wxdsets_spatial_index().lats.tolist()
 
     def get_wxdsets_lon(self):
         """
         Return a list with the longitude coordinates of the weather datasets.
         """
-        return [self.db['wxdsets/%s' % name].attrs['Longitude'] for
-                name in self.wxdsets]
+        return self.get_wxdsets_spatial_index().lons.tolist()
+
+    def get_wxdsets_spatial_index(self):
+        """
+        Return a spatial index of the coordinates of the weather datasets.
+
+        The coordinates are read from the project file only once and the
+        index is cached until a weather dataset is added or deleted.
+        """
+        if self._wxdsets_spatial_index is None:
+            names = self.wxdsets
+            lats = [self.db['wxdsets'][name].attrs['Latitude'] for
+                    name in names]
+            lons = [self.db['wxdsets'][name].attrs['Longitude'] for
+                    name in names]
+            self._wxdsets_spatial_index = StationSpatialIndex(
+                names, lats, lons)
+        return self._wxdsets_spatial_index
+
+    def get_closest_wxdsets(self, lat, lon, k=1):
+        """
+        Return the names of and the distances in km to the k weather datasets
+        that are closest to the location(s) given in decimal degrees.
+        """
+        return self.get_wxdsets_spatial_index().query_nearest(lat, lon, k)
+
+    def get_wxdsets_within(self, lat, lon, radius):
+        """
+        Return the names of and the distances in km to the weather datasets
+        that are located within the given radius in km of a location
+        given in decimal degrees.
+        """
+        return self.get_wxdsets_spatial_index().query_radius(
+            lat, lon, radius)
+
+    def pair_wldsets_with_closest_wxdset(self):
+        """
+        Return a dictionary with the name of the closest weather dataset
+        for each water level dataset saved in the project.
+        """
+        wldsets = self.wldsets
+        if not wldsets or not self.wxdsets:
+            return {name: None for name in wldsets}
+        lats = [self.db['wldsets'][name].attrs['Latitude'] for
+                name in wldsets]
+        lons = [self.db['wldsets'][name].attrs['Longitude'] for
+                name in wldsets]
+        names, dists = self.get_closest_wxdsets(lats, lons, k=1)
+        return {wldset: wxdset for wldset, wxdset in
+                zip(wldsets, names[:, 0])}
+
+    def get_blended_wxdset(self, wldset_name, k=3, method='idw', power=2):
+        """
+        Return a weather dataset composed from the data of the k weather
+        datasets that are closest to the specified water level dataset.
+
+        The composed weather datasets are cached until a dataset is
+        added or deleted from the project.
+        """
+        key = (wldset_name, k, method, power)
+        if key not in self._blended_wxdsets:
+            grp = self.db['wldsets'][wldset_name]
+            lat = grp.attrs['Latitude']
+            lon = grp.attrs['Longitude']
+            names, dists = self.get_closest_wxdsets(lat, lon, k)
+            wxdsets = [WXDataFrameHDF5(self.db['wxdsets'][name]) for
+                       name in names]
+            self._blended_wxdsets[key] = WXDataFrameBlend(
+                wxdsets, lat, lon, method, power)
+        return self._blended_wxdsets[key]
 
     def get_last_opened_wxdset(self):
         """
@@ -345,6 +422,22 @@ class ProjetReader(object):
             print('failed')
             return None
 
+    def set_wxdsets_pet_method(self, method, names=None):
+        """
+        Calculate the daily potential evapotranspiration of the weather
+        datasets with the specified names, or of all the weather datasets
+        of the project if names is None, with the specified method.
+
+        The evapotranspiration of all datasets is calculated at once and
+        is saved in the project.
+        """
+        names = self.wxdsets if names is None else names
+        set_wxdsets_pet_method(
+            [WXDataFrameHDF5(self.db['wxdsets/%s' % name]) for
+             name in names],
+            method)
+        self._blended_wxdsets = {}
+
     def add_wxdset(self, name, wxdset):
         """
         Add the weather dataset to the project hdf5 file.
@@ -355,6 +448,8 @@ class ProjetReader(object):
         if not is_dsetname_valid(name):
             raise ValueError("The name of the dataset is not valid.")
         grp = self.db['wxdsets'].create_group(name)
+        self._wxdsets_spatial_index = None
+        self._blended_wxdsets = {}
 
         # Save the metadata.
         for key, value in wxdset.metadata.items():
@@ -373,15 +468,19 @@ class ProjetReader(object):
             grp.create_dataset(
                 variable, data=np.copy(wxdset.data[variable].values))
 
-        # Save times where data was missing.
+        # Save the days where data was missing as runs of consecutive days.
+        for variable in METEO_VARIABLES:
+            grp.create_dataset(
+                'Missing {}'.format(variable),
+                data=datetimeindex_to_dayruns(
+                    wxdset.missing_value_indexes[variable]))
+
+        # Save the days where data was filled as runs of consecutive days.
         for variable in METEO_VARIABLES:
-            datetimeindex = wxdset.missing_value_indexes[variable]
-            strtimes = np.array(
-                datetimeindex.strftime("%Y-%m-%dT%H:%M:%S").values.tolist(),
-                dtype=h5py.string_dtype()
-                )
             grp.create_dataset(
-                'Missing {}'.format(variable), data=strtimes)
+                'Filled {}'.format(variable),
+                data=datetimeindex_to_dayruns(
+                    wxdset.filled_value_indexes[variable]))
 
         print('Dataset {} created sucessfully.'.format(name))
         self.db.flush()
@@ -390,6 +489,8 @@ class ProjetReader(object):
         """Delete the specified weather dataset."""
         del self.db['wxdsets/%s' % name]
         self.db.flush()
+        self._wxdsets_spatial_index = None
+        self._blended_wxdsets = {}
 
 
 class WLDatasetHDF5(WLDatasetBase):
@@ -459,6 +560,12 @@ class WLDatasetHDF5(WLDatasetBase):
             # Added in version 0.3.1 (see PR #184)
             self.dset.create_group('glue')
             self.dset.file.flush()
+        if 'params_ci' not in self.dset['mrc'].keys():
+            # Added in version 0.6.0.
+            self.dset['mrc'].create_dataset(
+                'params_ci', data=np.full((2, 2), np.nan), dtype='float64')
+            self.dset['mrc'].attrs['ci_level'] = np.nan
+            self.dset.file.flush()
         if self.dset['mrc/peak_indx'].dtype != np.dtype('float64'):
             # We need to convert peak_indx data to the format used in
             # gwhat >= 0.5.1, where we store the mrc periods as a series of
@@ -501,11 +608,58 @@ class WLDatasetHDF5(WLDatasetBase):
     def commit(self):
         """Commit the changes made to the water level data to the project."""
         if self.has_uncommited_changes:
+            # Note that the correction of the water levels for the effects
+            # of barometric pressure and Earth tides does not depend on the
+            # water levels, so that it remains valid after the commit.
             self.dset['WL'][:] = np.copy(self.waterlevels)
             self.dset.file.flush()
             self._undo_stack = []
             print('Changes commited successfully.')
 
+    # ---- Corrected water levels
+    @property
+    def corrected_waterlevels(self):
+        """
+        Return the water levels corrected for the effects of barometric
+        pressure and Earth tides or None if they were not calculated.
+
+        Only the correction is saved in the project, so that the corrected
+        water levels always reflect the changes made to the water levels.
+        """
+        if 'WLcorrection' not in self.dset.keys():
+            return None
+        return self.waterlevels + self.dset['WLcorrection'][...]
+
+    def correct_waterlevels(self, name):
+        """
+        Correct the water levels for the effects of barometric pressure and
+        Earth tides with the BRF saved at the specified name, save the
+        correction in the project as a chunked array and return the
+        corrected water levels.
+        """
+        from gwhat.brf_mod.kgs_brf import calc_waterlevels_correction
+
+        print('Correcting water levels with BRF %s...' % name, end=' ')
+        correction = calc_waterlevels_correction(
+            self.xldates, self['BP'], self['ET'], self.get_brf(name))
+        self.clear_waterlevels_correction()
+        self.dset.create_dataset(
+            'WLcorrection', data=correction, dtype='float64', chunks=True,
+            compression='gzip')
+        self.dset['WLcorrection'].attrs['brf'] = name
+        self.dset.file.flush()
+        print('done')
+        return self.corrected_waterlevels
+
+    def clear_waterlevels_correction(self):
+        """
+        Delete the correction of the water levels for the effects of
+        barometric pressure and Earth tides saved in the project.
+        """
+        if 'WLcorrection' in self.dset.keys():
+            del self.dset['WLcorrection']
+            self.dset.file.flush()
+
     # ---- Hydrological cycle events
     def read_hydro_cycle_events(self):
         """
@@ -580,6 +734,20 @@ class WLDatasetHDF5(WLDatasetBase):
         self.dset['mrc'].attrs['r_squared'] = r_squared
         self.dset['mrc'].attrs['rmse'] = rmse
 
+        # The confidence intervals of the previous MRC are not valid
+        # anymore for the new MRC.
+        self.dset['mrc/params_ci'][...] = np.nan
+        self.dset['mrc'].attrs['ci_level'] = np.nan
+
+        self.dset.file.flush()
+
+    def set_mrc_ci(self, params_ci, level):
+        """
+        Save to the hdf5 project file the confidence intervals of the
+        coefficients A and B of the mrc for the specified confidence level.
+        """
+        self.dset['mrc/params_ci'][...] = params_ci
+        self.dset['mrc'].attrs['ci_level'] = level
         self.dset.file.flush()
 
     def get_mrc(self):
@@ -596,8 +764,9 @@ class WLDatasetHDF5(WLDatasetBase):
             'params': namedtuple('Coeffs', ['A', 'B'])(*coeffs),
             'peak_indx': peak_indx,
             'time': self['mrc/time'].copy(),
-            'recess': self['mrc/recess'].copy()}
-        for key in ['std_err', 'r_squared', 'rmse']:
+            'recess': self['mrc/recess'].copy(),
+            'params_ci': self['mrc/params_ci'].copy()}
+        for key in ['std_err', 'r_squared', 'rmse', 'ci_level']:
             try:
                 mrc_data[key] = self.dset['mrc'].attrs[key]
             except KeyError:
@@ -628,6 +797,11 @@ class WLDatasetHDF5(WLDatasetBase):
             ['A (1/day)', mrc_data['params'].A],
             ['B (m/day)', mrc_data['params'].B],
             []])
+        if not pd.isnull(mrc_data['ci_level']):
+            level = '{:0.0f}%'.format(mrc_data['ci_level'] * 100)
+            fheader[-1:-1] = [
+                ['A {} CI (1/day)'.format(level), *mrc_data['params_ci'][0]],
+                ['B {} CI (m/day)'.format(level), *mrc_data['params_ci'][1]]]
 
         labels = ['RMSE (m)', 'R-squared', 'S (m)']
         keys = ['rmse', 'r_squared', 'std_err']
@@ -713,11 +887,13 @@ class WLDatasetHDF5(WLDatasetBase):
         this dataset.
         """
         grp = self.dset.require_group('brf')
-        return list(grp.keys())
+        # The BRF evaluations are saved in groups named with an integer id,
+        # while the sliding-window BRF is saved in the 'sliding' group.
+        return [name for name in grp.keys() if name.isdigit()]
 
     def brf_count(self):
         """Return the number of BRF evaluation saved for this datased."""
-        return len(list(self.dset['brf'].keys()))
+        return len(self.saved_brf())
 
     def save_brfperiod(self, period):
         """
@@ -745,8 +921,7 @@ class WLDatasetHDF5(WLDatasetBase):
 
     def get_brfname_at(self, index):
         if index < self.brf_count():
-            names = list(self.dset['brf'].keys())
-            names = np.array(names).astype(int)
+            names = np.array(self.saved_brf()).astype(int)
             names.sort()
             return str(names[index])
         else:
@@ -807,8 +982,8 @@ class WLDatasetHDF5(WLDatasetBase):
         """
         print('Saving BRF results...', end=' ')
         # Create a new h5py group to save the data.
-        if list(self.dset['brf'].keys()):
-            idnum = np.array(list(self.dset['brf'].keys())).astype(int)
+        if self.saved_brf():
+            idnum = np.array(self.saved_brf()).astype(int)
             idnum = np.max(idnum) + 1
         else:
             idnum = 1
@@ -827,10 +1002,59 @@ class WLDatasetHDF5(WLDatasetBase):
         self.dset.file.flush()
         print('done')
 
+    def save_sliding_brf(self, windows, brfs, lagBP, lagET, window, step,
+                         detrending=None):
+        """
+        Save the BRF results calculated for sliding windows of time as
+        returned by calc_sliding_brf. The sliding-window BRF previously
+        saved for this dataset is overwritten.
+        """
+        from gwhat.brf_mod.kgs_brf import BRF_COLUMNS
+
+        grp = self.dset.require_group('brf')
+        if 'sliding' in grp.keys():
+            del grp['sliding']
+        grp = grp.create_group('sliding')
+        grp.create_dataset('windows', data=windows, dtype='float64')
+        grp.create_dataset(
+            'brfs', data=brfs, dtype='float64', compression='gzip',
+            chunks=(min(len(brfs), 128),) + brfs.shape[1:])
+        grp.attrs['columns'] = BRF_COLUMNS
+        grp.attrs['lagBP'] = lagBP
+        grp.attrs['lagET'] = lagET
+        grp.attrs['window'] = window
+        grp.attrs['step'] = step
+        grp.attrs['detrending'] = {
+            True: 'Yes', False: 'No', None: ''}[detrending]
+        self.dset.file.flush()
+
+    def get_sliding_brf(self):
+        """
+        Return a dictionary with the BRF results calculated for sliding
+        windows of time or None if no sliding-window BRF was saved for
+        this dataset.
+        """
+        grp = self.dset.require_group('brf')
+        if 'sliding' not in grp.keys():
+            return None
+        grp = grp['sliding']
+        sliding_brf = {
+            'windows': grp['windows'][...],
+            'brfs': grp['brfs'][...],
+            'columns': [str(col) for col in grp.attrs['columns']]}
+        for key in ['lagBP', 'lagET', 'window', 'step', 'detrending']:
+            sliding_brf[key] = grp.attrs[key]
+        return sliding_brf
+
     def del_brf(self, name):
         """Delete the BRF evaluation saved with the specified name."""
         if name in list(self.dset['brf'].keys()):
             del self.dset['brf'][name]
+            # The water levels cannot be corrected anymore with the BRF
+            # that was deleted.
+            if ('WLcorrection' in self.dset.keys() and
+                    self.dset['WLcorrection'].attrs['brf'] == name):
+                del self.dset['WLcorrection']
             self.dset.file.flush()
             print('BRF %s deleted successfully' % name)
         else:
@@ -1022,6 +1246,18 @@ class WXDataFrameHDF5(WXDataFrameBase):
                     dataset.create_dataset(key, data=strtimes)
                 dataset.file.flush()
                 print('done')
+            if key in dataset.keys() and dataset[key].ndim == 1:
+                # Missing data times are saved as runs of consecutive days
+                # instead of ISO date strings since version 0.6.0.
+                print(("Saving missing {} data time as runs of consecutive "
+                       "days instead of ISO date strings...").format(variable),
+                      end=' ')
+                dayruns = datetimeindex_to_dayruns(pd.to_datetime(
+                    dataset[key].asstr()[...], infer_datetime_format=True))
+                del dataset[key]
+                dataset.create_dataset(key, data=dayruns)
+                dataset.file.flush()
+                print('done')
 
         # Get the metadata.
         for key in dataset.attrs.keys():
@@ -1043,8 +1279,27 @@ class WXDataFrameHDF5(WXDataFrameBase):
         for variable in METEO_VARIABLES:
             key = 'Missing {}'.format(variable)
             if key in dataset.keys():
-                self.missing_value_indexes[variable] = pd.to_datetime(
-                    dataset[key].asstr()[...], infer_datetime_format=True)
+                self.missing_value_indexes[variable] = (
+                    dayruns_to_datetimeindex(dataset[key][...]))
+
+        # Get the filled value datetime indexes, which are not saved in
+        # projects created with older versions of GWHAT.
+        for variable in METEO_VARIABLES:
+            key = 'Filled {}'.format(variable)
+            if key in dataset.keys():
+                self.filled_value_indexes[variable] = (
+                    dayruns_to_datetimeindex(dataset[key][...]))
+
+    def set_pet(self, pet, method):
+        """
+        Set the daily potential evapotranspiration values of this dataset,
+        save the method used to calculate them in the metadata and save
+        both in the project.
+        """
+        super().set_pet(pet, method)
+        self._dataset['PET'][...] = self.data['PET'].values
+        self._dataset.attrs['PET method'] = method
+        self._dataset.file.flush()
 
     @property
     def name(self):
@@ -9,6 +9,7 @@
 
 
 # ---- Standard library imports
+from contextlib import closing
 from copy import deepcopy
 import re
 import os
@@ -20,10 +21,14 @@ from collections.abc import Mapping
 # ---- Third party imports
 import numpy as np
 import pandas as pd
-import xlrd
-import openpyxl
 from pandas.api.types import is_number, is_string_dtype
 
+# ---- Local library imports
+from gwhat.common.utils import iter_csv_rows, iter_excel_rows
+from gwhat.utils.datacache import (
+    load_cached_datafile, save_cached_datafile)
+from gwhat.utils.dates import (
+    xldates_to_datetimeindex, datetimeindex_to_xldates)
 
 FILE_EXTS = ['.csv', '.xls', '.xlsx']
 
@@ -56,6 +61,19 @@ HEADER_REGEX = {
     }
 
 
+def _match_column_name(column):
+    """
+    Return the name of the column of the WLDataFrame corresponding to the
+    specified column name of a datafile or None if it does not correspond
+    to any column.
+    """
+    str_ = str(column).replace(" ", "").replace("_", "")
+    for colname, regex in COL_REGEX.items():
+        if re.search(regex, str_, re.IGNORECASE):
+            return colname
+    return None
+
+
 def _format_column_names(df):
     """
     Rename valid columns, drop invalid columns, and add missing columns.
@@ -64,13 +82,11 @@ def _format_column_names(df):
     drop = []
     rename = {}
     for column in df.columns:
-        for colname, regex in COL_REGEX.items():
-            str_ = column.replace(" ", "").replace("_", "")
-            if re.search(regex, str_, re.IGNORECASE):
-                rename[column] = colname
-                break
-        else:
+        colname = _match_column_name(column)
+        if colname is None:
             drop.append(column)
+        else:
+            rename[column] = colname
     df = df.rename(columns=rename)
     df = df.drop(columns=drop)
 
@@ -101,13 +117,11 @@ def _format_datetime_data(df):
             # We check first if the dates are stored in the
             # Excel numeric format.
             datetimes = df['Time'].astype('float64', errors='raise')
-            datetimes = pd.to_datetime(
-                datetimes.apply(
-                    lambda date: xlrd.xldate.xldate_as_datetime(date, 0)))
+            datetimes = xldates_to_datetimeindex(datetimes.values)
 
             # Get rid of milliseconds to avoid introducting
             # round-off errors.
-            datetimes = datetimes.dt.round('S')
+            datetimes = datetimes.round('S')
 
             df['Time'] = datetimes
         except (ValueError, TypeError):
@@ -135,10 +149,19 @@ def _drop_duplicates(df):
 
 
 class WLDataFrame(pd.DataFrame):
-    def __init__(self, data=None, columns=None, metadata=None):
+    # Declare the custom attributes, so that they are propagated by pandas
+    # and preserved when the dataframe is pickled.
+    _metadata = ['filename']
+
+    def __init__(self, data=None, columns=None, metadata=None,
+                 formatted=False):
         if data is None:
             super().__init__(data=[], columns=COLUMNS)
             self.set_index(INDEX, drop=True, inplace=True)
+        elif formatted:
+            # The data were already formatted by a previous instance, for
+            # example when they are restored from the data file cache.
+            super().__init__(data)
         else:
             df = pd.DataFrame(data, columns=columns)
             df = _format_column_names(df)
@@ -164,38 +187,29 @@ def open_water_level_datafile(filename):
     if ext == '.csv':
         with open(filename, 'r', encoding='utf8') as f:
             data = list(csv.reader(f, delimiter=','))
-    elif ext == '.xls':
-        with xlrd.open_workbook(filename, on_demand=True) as wb:
-            sheet = wb.sheet_by_index(0)
-            data = [sheet.row_values(rowx, start_colx=0, end_colx=None) for
-                    rowx in range(sheet.nrows)]
-    elif ext == '.xlsx':
-        try:
-            workbook = openpyxl.load_workbook(filename)
-            sheet = workbook[workbook.sheetnames[0]]
-            data = [list(row_values) for row_values in
-                    sheet.iter_rows(min_col=1, values_only=True)]
-        finally:
-            workbook.close()
+    else:
+        data = list(iter_excel_rows(filename))
     return data
 
 
-def read_water_level_datafile(filename):
+def _read_header(rows):
     """
-    Load a water level dataset from a csv or an Excel file and format the
-    data in a Pandas dataframe with the dates used as index.
-    """
-    reader = open_water_level_datafile(filename)
+    Read the metadata from the header rows of a water level datafile.
 
-    # Fetch the metadata from the header.
+    Return the metadata, the index of the row containing the column names of
+    the data and the content of this row. The iteration over the rows stops
+    at the row containing the column names, so that the rows can be
+    streamed from an open file. Return None for the index and the content
+    of the row if the column names cannot be found.
+    """
     header = deepcopy(HEADER)
-    for i, row in enumerate(reader):
+    for i, row in enumerate(rows):
         if not len(row):
             continue
 
         label = str(row[0]).replace(" ", "").replace("_", "")
         if re.search(COL_REGEX[INDEX], label, re.IGNORECASE):
-            break
+            return header, i, row
 
         for key in HEADER.keys():
             if re.search(HEADER_REGEX[key], label, re.IGNORECASE):
@@ -207,26 +221,138 @@ def read_water_level_datafile(filename):
                 else:
                     header[key] = str(row[1])
                 break
-    else:
-        print("ERROR: no data found in input water level file.")
-        return WLDataFrame(metadata=header)
+    return header, None, None
+
+
+def read_water_level_csv(filename, engine=None):
+    """
+    Read the metadata and the data of a water level csv datafile in a single
+    pass. Only the header lines are scanned for the metadata, then the
+    columns of the data are parsed directly by pandas with explicit dtypes.
 
+    The 'pyarrow' engine of pandas is used if it is specified and available,
+    else the default 'c' engine is used.
+
+    Return the metadata and a pandas dataframe containing the data or None
+    if no data are found in the file.
+    """
+    if engine == 'pyarrow':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("WARNING: pyarrow is not installed, "
+                  "using the default 'c' engine instead.")
+            engine = 'c'
+
+    with open(filename, 'r', encoding='utf8') as csvfile:
+        header, i, columns = _read_header(iter_csv_rows(csvfile))
+        if columns is None:
+            return header, None
+
+        # Only the recognized columns of the file are parsed.
+        usecols = []
+        names = []
+        colnames = []
+        dtype = {}
+        for j, column in enumerate(columns):
+            colname = _match_column_name(column)
+            if colname is None or colname in colnames:
+                continue
+            usecols.append(j)
+            names.append(column)
+            colnames.append(colname)
+            if colname != INDEX:
+                dtype[j] = 'float64'
+
+        if engine == 'pyarrow':
+            data = pd.read_csv(
+                filename, engine='pyarrow', header=None, skiprows=i + 1,
+                usecols=usecols)
+        else:
+            data_start = csvfile.tell()
+            try:
+                data = pd.read_csv(
+                    csvfile, header=None, usecols=usecols, dtype=dtype)
+            except ValueError:
+                # Some values cannot be converted to floats, so we let
+                # pandas infer the dtypes. The values that cannot be
+                # converted are coerced later on.
+                csvfile.seek(data_start)
+                data = pd.read_csv(csvfile, header=None, usecols=usecols)
+    data.columns = names
+    return header, data
+
+
+def read_water_level_excel(filename):
+    """
+    Read the metadata and the data of a water level xls or xlsx datafile in
+    a single pass. The rows of the file are streamed, so that only the
+    values of the columns that are recognized are kept in memory.
+
+    Return the metadata and a pandas dataframe containing the data or None
+    if no data are found in the file.
+    """
+    with closing(iter_excel_rows(filename)) as rows:
+        header, i, columns = _read_header(rows)
+        if columns is None:
+            return header, None
+
+        usecols = []
+        names = []
+        colnames = []
+        for j, column in enumerate(columns):
+            colname = _match_column_name(column)
+            if colname is None or colname in colnames:
+                continue
+            usecols.append(j)
+            names.append(column)
+            colnames.append(colname)
+
+        values = [[row[j] if j < len(row) else None for j in usecols] for
+                  row in rows]
+
+    data = pd.DataFrame(values, columns=names)
+    data = data.dropna(how='all')
+    for name, colname in zip(names, colnames):
+        if colname != INDEX:
+            data[name] = pd.to_numeric(data[name], errors='coerce')
+    return header, data
+
+
+def read_water_level_datafile(filename, engine=None):
+    """
+    Load a water level dataset from a csv or an Excel file and format the
+    data in a Pandas dataframe with the dates used as index.
+
+    The formatted data are saved in a cache, so that the file is not parsed
+    again if it did not change the next time it is loaded.
+    """
     root, ext = osp.splitext(filename)
-    if ext.lower() in ['.xls', '.xlsx']:
-        data = pd.read_excel(
-            filename,
-            header=i,
-            parse_dates=[row[0]]
-            )
+    if ext.lower() not in FILE_EXTS:
+        raise ValueError("Supported file format are: ", FILE_EXTS)
+    print('Loading waterlvl time-series from "%s"...' %
+          osp.basename(filename))
+
+    cached = load_cached_datafile(filename, __name__)
+    if cached is not None:
+        header, data = cached
+        dataf = WLDataFrame(data, metadata=header, formatted=True)
+        dataf.filename = filename
+        return dataf
+
+    if ext.lower() == '.csv':
+        header, data = read_water_level_csv(filename, engine)
     else:
-        data = pd.read_csv(
-            filename,
-            skip_blank_lines=False,
-            header=i)
+        header, data = read_water_level_excel(filename)
+
+    if data is None:
+        print("ERROR: no data found in input water level file.")
+        return WLDataFrame(metadata=header)
 
     # Cast the data into a Pandas dataframe.
     dataf = WLDataFrame(data, columns=None, metadata=header)
     dataf.filename = filename
+    save_cached_datafile(filename, __name__, dataf.attrs, dataf)
 
     return dataf
 
@@ -296,6 +422,9 @@ class WLDatasetBase(Mapping):
         self.dset = None
         self._undo_stack = []
         self._dataf = WLDataFrame()
+        self._xldates = None
+        self._xldates_index = None
+        self._recession_segment_index = None
 
     def __load_dataset__(self):
         """Loads the dataset and save it in a store."""
@@ -318,17 +447,34 @@ class WLDatasetBase(Mapping):
     @property
     def xldates(self):
         """
-        Return a numpy array containing the Excel numerical dates
+        Return a read-only numpy array containing the Excel numerical dates
         corresponding to the dates of the dataset.
+
+        The dates are converted only once and are cached until the index
+        of the data is replaced.
+        """
+        if self._xldates_index is not self._dataf.index:
+            self._xldates = datetimeindex_to_xldates(self._dataf.index)
+            self._xldates.flags.writeable = False
+            self._xldates_index = self._dataf.index
+        return self._xldates
+
+    def get_recession_segment_index(self):
         """
-        if 'XLDATES' not in self._dataf.columns:
-            print('Converting datetimes to xldates...', end=' ')
-            timedeltas = (
-                self._dataf.index - xlrd.xldate.xldate_as_datetime(4000, 0))
-            self._dataf['XLDATES'] = (
-                timedeltas.total_seconds()/(3600 * 24) + 4000)
-            print('done')
-        return self._dataf['XLDATES'].values
+        Return the index of the recession segments of this dataset, which
+        is used to calculate the master recession curve (MRC).
+
+        The index is cached until the dates of the dataset change, so that
+        the segments of the recession periods that were already used to
+        calculate the MRC do not need to be searched again.
+        """
+        from gwhat.hydrocalc.recession.recession_calc import (
+            RecessionSegmentIndex)
+        xldates = self.xldates
+        if (self._recession_segment_index is None or
+                self._recession_segment_index.t is not xldates):
+            self._recession_segment_index = RecessionSegmentIndex(xldates)
+        return self._recession_segment_index
 
     @property
     def dates(self):
@@ -342,6 +488,27 @@ class WLDatasetBase(Mapping):
     def waterlevels(self):
         return self.data['WL'].values
 
+    @property
+    def corrected_waterlevels(self):
+        """
+        Return the water levels corrected for the effects of barometric
+        pressure and Earth tides or None if they were not calculated.
+        """
+        return None
+
+    def get_waterlevels(self, corrected=False):
+        """
+        Return the water levels of the dataset or, if corrected is True,
+        the water levels corrected for the effects of barometric pressure
+        and Earth tides.
+        """
+        if not corrected:
+            return self.waterlevels
+        if self.corrected_waterlevels is None:
+            raise ValueError(
+                "The water levels of this dataset were not corrected.")
+        return self.corrected_waterlevels
+
     # ---- Versionning
     @property
     def has_uncommited_changes(self):
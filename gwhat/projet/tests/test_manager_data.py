@@ -23,6 +23,8 @@ from gwhat.projet.reader_waterlvl import WLDataset
 from gwhat.projet.reader_projet import ProjetReader
 from gwhat.projet.manager_data import (
     DataManager, QFileDialog, QMessageBox, QCheckBox)
+from gwhat.projet import dataset_importer
+from gwhat.projet.dataset_importer import DatasetImportWorker
 
 DATADIR = osp.join(osp.dirname(osp.realpath(__file__)), 'data')
 WXFILENAME = osp.join(DATADIR, 'sample_weather_datafile.csv')
@@ -320,6 +322,12 @@ def test_import_multiple_waterlevel_data(datamanager, mocker, qtbot):
     assert new_waterlvl_dialog._import_progress == 1
     assert new_waterlvl_dialog._len_filenames == 3
 
+    # Wait for the other datasets to be read in the background.
+    qtbot.waitUntil(
+        lambda: not new_waterlvl_dialog.import_thread.isRunning(),
+        timeout=15000)
+    assert new_waterlvl_dialog._pending_filenames == set()
+
     # Import the water level dataset into the project.
     with qtbot.waitSignal(new_waterlvl_dialog.sig_new_dataset_imported):
         qtbot.mouseClick(new_waterlvl_dialog.btn_ok, Qt.LeftButton)
@@ -383,6 +391,105 @@ def test_import_multiple_waterlevel_data(datamanager, mocker, qtbot):
     assert not new_waterlvl_dialog.isVisible()
 
 
+def test_import_multiple_waterlevel_data_with_error(
+        datamanager, mocker, qtbot, tmpdir):
+    """
+    Test that errors are reported as expected when importing multiple
+    water level datasets and that some of the data files are not valid.
+    """
+    datamanager.new_waterlvl_win.setModal(False)
+    new_waterlvl_dialog = datamanager.new_waterlvl_win
+
+    invalid_filename = osp.join(str(tmpdir), 'invalid_water_level.txt')
+    with open(invalid_filename, 'w') as f:
+        f.write('This is not a valid water level data file.')
+
+    mocker.patch.object(
+        QFileDialog, 'exec_', return_value=True)
+    mocker.patch.object(
+        QFileDialog, 'selectedFiles',
+        return_value=[invalid_filename, WLFILENAME])
+
+    console_msgs = []
+    new_waterlvl_dialog.ConsoleSignal.connect(console_msgs.append)
+    with qtbot.waitSignal(new_waterlvl_dialog.sig_new_dataset_loaded,
+                          timeout=15000):
+        qtbot.mouseClick(datamanager.btn_load_wl, Qt.LeftButton)
+
+    # Assert that the invalid data file is displayed as expected.
+    assert new_waterlvl_dialog.directory.text() == invalid_filename
+    assert new_waterlvl_dialog._dataset is None
+    assert not new_waterlvl_dialog.btn_ok.isEnabled()
+    assert new_waterlvl_dialog.btn_skip.isEnabled()
+    assert any('invalid_water_level.txt' in msg for msg in console_msgs)
+
+    # Skip the invalid data file.
+    with qtbot.waitSignal(new_waterlvl_dialog.sig_new_dataset_loaded,
+                          timeout=15000):
+        qtbot.mouseClick(new_waterlvl_dialog.btn_skip, Qt.LeftButton)
+
+    assert new_waterlvl_dialog.directory.text() == WLFILENAME
+    assert new_waterlvl_dialog.name == "PO01 - Calixa-Lavallée (3040002)"
+    assert new_waterlvl_dialog.btn_ok.isEnabled()
+    assert not new_waterlvl_dialog.btn_skip.isEnabled()
+
+    # Import the water level dataset into the project.
+    with qtbot.waitSignal(new_waterlvl_dialog.sig_new_dataset_imported):
+        qtbot.mouseClick(new_waterlvl_dialog.btn_ok, Qt.LeftButton)
+    assert datamanager.wldataset_count() == 1
+    assert not new_waterlvl_dialog.isVisible()
+    assert not new_waterlvl_dialog.import_thread.isRunning()
+
+
+def test_stop_importing_waterlevel_data(datamanager, mocker, qtbot):
+    """
+    Test that stopping the import of water level datasets does not block
+    the GUI and that the results of the stopped import are discarded.
+    """
+    new_waterlvl_dialog = datamanager.new_waterlvl_win
+    new_waterlvl_dialog.load_datasets([WLFILENAME, WLFILENAME2])
+    import_thread = new_waterlvl_dialog.import_thread
+    assert import_thread.isRunning()
+
+    stopped_worker = new_waterlvl_dialog.import_worker
+    new_waterlvl_dialog.close()
+    assert new_waterlvl_dialog.import_thread is not import_thread
+    assert not new_waterlvl_dialog.import_thread.isRunning()
+    assert new_waterlvl_dialog._pending_filenames == set()
+
+    # Assert that the stopped import finishes in the background and that
+    # its results are not handled by the dialog.
+    new_waterlvl_dialog._pending_filenames = {WLFILENAME}
+    stopped_worker.sig_dataset_loaded.emit(WLFILENAME, None, '')
+    assert new_waterlvl_dialog._loaded_datasets == {}
+    qtbot.waitUntil(
+        lambda: not new_waterlvl_dialog._stopped_imports, timeout=15000)
+    assert not import_thread.isRunning()
+
+
+def test_dataset_import_worker(mocker):
+    """
+    Test that the import worker reads a single file without a process pool
+    and the other files of a list of files in a pool.
+    """
+    pool_spy = mocker.spy(dataset_importer, 'create_process_pool')
+    worker = DatasetImportWorker('water level')
+    loaded = []
+    worker.sig_dataset_loaded.connect(
+        lambda filename, dataset, error: loaded.append((filename, error)))
+
+    worker.set_filenames([WLFILENAME])
+    worker.import_datasets()
+    assert pool_spy.call_count == 0
+    assert loaded == [(WLFILENAME, '')]
+
+    loaded.clear()
+    worker.set_filenames([WLFILENAME, WLFILENAME2])
+    worker.import_datasets()
+    assert pool_spy.call_count == 1
+    assert loaded == [(WLFILENAME, ''), (WLFILENAME2, '')]
+
+
 def test_delete_waterlevel_data(datamanager, mocker, qtbot):
     """
     Test deleting water level datasets from the project.
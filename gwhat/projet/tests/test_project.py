@@ -28,7 +28,8 @@ from gwhat.projet.manager_projet import (
     ProjetManager, QFileDialog, QMessageBox, CONF)
 from gwhat.projet.reader_waterlvl import WLDataset
 from gwhat.utils.math import nan_as_text_tolist
-from gwhat.meteo.weather_reader import read_weather_datafile
+from gwhat.brf_mod.kgs_brf import calc_brf, correct_waterlevels
+from gwhat.meteo.weather_reader import read_weather_datafile, WXDataFrame
 
 NAME = "test @ prô'jèt!"
 LAT = 45.40
@@ -476,6 +477,89 @@ def test_store_mrc(project, wlfilename):
     assert mrc_data['rmse'] == rmse
 
 
+def test_store_sliding_brf(project, wlfilename):
+    """
+    Test that sliding-window BRF results are saved and retrieved as
+    expected in GWHAT project files.
+    """
+    project.add_wldset('dataset_test', WLDataset(wlfilename))
+    wldset = project.get_wldset('dataset_test')
+    assert wldset.get_sliding_brf() is None
+
+    windows = np.array([[41334, 41364], [41341, 41371]], dtype=float)
+    brfs = np.random.rand(2, 5, 9)
+    wldset.save_sliding_brf(windows, brfs, lagBP=4, lagET=-1, window=30,
+                            step=7, detrending=True)
+
+    sliding_brf = wldset.get_sliding_brf()
+    assert np.array_equal(sliding_brf['windows'], windows)
+    assert np.array_equal(sliding_brf['brfs'], brfs)
+    assert sliding_brf['columns'] == [
+        'Lag', 'A', 'sdA', 'SumA', 'sdSumA', 'B', 'sdB', 'SumB', 'sdSumB']
+    assert sliding_brf['lagBP'] == 4
+    assert sliding_brf['lagET'] == -1
+    assert sliding_brf['window'] == 30
+    assert sliding_brf['step'] == 7
+    assert sliding_brf['detrending'] == 'Yes'
+
+    # Assert that the sliding-window BRF is not counted as a BRF evaluation.
+    assert wldset.brf_count() == 0
+    assert wldset.saved_brf() == []
+
+    wldset.save_brf(pd.DataFrame({'Lag': [0, 1], 'A': [0.5, 0.4]}),
+                    dtm.datetime(2013, 1, 1), dtm.datetime(2013, 2, 1))
+    assert wldset.brf_count() == 1
+    assert wldset.get_brfname_at(0) == '1'
+
+
+def test_correct_waterlevels(project):
+    """
+    Test that the water levels corrected with a BRF are saved and
+    retrieved as expected in GWHAT project files.
+    """
+    filename = osp.join(
+        __rootdir__, 'tests', 'data', 'sample_water_level_datafile.csv')
+    project.add_wldset('dataset_test', WLDataset(filename))
+    wldset = project.get_wldset('dataset_test')
+    assert wldset.corrected_waterlevels is None
+    with pytest.raises(ValueError):
+        wldset.get_waterlevels(corrected=True)
+
+    dataf = calc_brf(wldset.xldates, wldset['WL'], wldset['BP'],
+                     wldset['ET'], lagBP=3, lagET=-1)
+    wldset.save_brf(dataf, dtm.datetime(2012, 11, 30),
+                    dtm.datetime(2013, 11, 7))
+    corrected = wldset.correct_waterlevels(wldset.get_brfname_at(0))
+
+    assert np.array_equal(corrected, correct_waterlevels(
+        wldset.xldates, wldset['WL'], wldset['BP'], wldset['ET'], dataf))
+    assert np.array_equal(wldset.get_waterlevels(corrected=True), corrected)
+    assert np.array_equal(wldset.get_waterlevels(), wldset.waterlevels)
+    assert wldset.dset['WLcorrection'].chunks is not None
+    assert wldset.dset['WLcorrection'].attrs['brf'] == '1'
+
+    # Assert that the changes made to the water levels are reflected in
+    # the corrected water levels, before and after they are commited.
+    wldset.delete_waterlevels_at([10, 11])
+    assert np.isnan(wldset.corrected_waterlevels[10:12]).all()
+    assert np.array_equal(
+        wldset.corrected_waterlevels[12:], corrected[12:])
+    wldset.commit()
+    assert np.isnan(wldset.corrected_waterlevels[10:12]).all()
+    assert np.array_equal(
+        wldset.corrected_waterlevels[12:], corrected[12:])
+    wldset.save_brf(dataf, dtm.datetime(2012, 11, 30),
+                    dtm.datetime(2013, 11, 7))
+
+    # Assert that the correction is deleted with the BRF that was used to
+    # calculate it, but not with another BRF.
+    wldset.del_brf('2')
+    assert wldset.corrected_waterlevels is not None
+    wldset.del_brf('1')
+    assert wldset.corrected_waterlevels is None
+    assert 'WLcorrection' not in wldset.dset.keys()
+
+
 def test_mrc_backward_compatibility(project, wlfilename):
     """
     Test that converting mrc peak_indx data from int16 to int64 is
@@ -532,6 +616,140 @@ def test_mrc_backward_compatibility(project, wlfilename):
     assert mrc_data['recess'].tolist() == []
 
 
+def test_closest_wxdsets(project, wlfilename):
+    """
+    Test that finding the weather datasets that are closest to the water
+    level datasets of a project is working as expected.
+    """
+    wxdset = WXDataFrame(osp.join(
+        __rootdir__, 'projet', 'tests', 'data', 'sample_weather_datafile.csv'))
+    for name, lat, lon in [('far', 48.5, -68.5),
+                           ('closest', 45.7, -73.3),
+                           ('close', 45.5, -73.0)]:
+        wxdset.metadata['Latitude'] = lat
+        wxdset.metadata['Longitude'] = lon
+        project.add_wxdset(name, wxdset)
+    project.add_wldset('wldset', WLDataset(wlfilename))
+
+    names, dists = project.get_closest_wxdsets(45.74581, -73.28024, k=2)
+    assert names.tolist() == ['closest', 'close']
+    assert dists[0] < dists[1]
+
+    names, dists = project.get_wxdsets_within(45.74581, -73.28024, 100)
+    assert names.tolist() == ['closest', 'close']
+
+    assert project.pair_wldsets_with_closest_wxdset() == {
+        'wldset': 'closest'}
+
+    # Make sure the spatial index is updated when a dataset is deleted.
+    project.del_wxdset('closest')
+    assert project.pair_wldsets_with_closest_wxdset() == {
+        'wldset': 'close'}
+    assert sorted(project.get_wxdsets_lat()) == [45.5, 48.5]
+
+
+def test_missing_value_indexes_dayruns(project, projectpath):
+    """
+    Test that the missing value indexes of weather datasets are saved as
+    runs of consecutive days and that missing value indexes saved in older
+    projects as ISO date strings are converted as expected.
+    """
+    wxdset = WXDataFrame(osp.join(
+        __rootdir__, 'projet', 'tests', 'data', 'sample_weather_datafile.csv'))
+    wxdset.missing_value_indexes['Ptot'] = pd.date_range(
+        '2000-01-01', '2000-01-31').append(pd.DatetimeIndex(['2000-03-01']))
+    project.add_wxdset('wxdset', wxdset)
+
+    dataset = project.db['wxdsets/wxdset/Missing Ptot']
+    assert dataset[...].tolist() == [[10957, 10987], [11017, 11017]]
+    for var in wxdset.missing_value_indexes:
+        assert (project.get_wxdset('wxdset').missing_value_indexes[var] ==
+                wxdset.missing_value_indexes[var].sort_values()).all()
+    for var in wxdset.filled_value_indexes:
+        assert project.get_wxdset('wxdset').filled_value_indexes[var].equals(
+            wxdset.filled_value_indexes[var])
+
+    # Save the missing value indexes as ISO date strings, like it was done
+    # in older versions of GWHAT.
+    del project.db['wxdsets/wxdset/Missing Ptot']
+    project.db['wxdsets/wxdset'].create_dataset(
+        'Missing Ptot', data=np.array(
+            wxdset.missing_value_indexes['Ptot'].strftime(
+                "%Y-%m-%dT%H:%M:%S").values.tolist(),
+            dtype=h5py.string_dtype()))
+    project.close()
+
+    project = ProjetReader(projectpath)
+    assert (project.get_wxdset('wxdset').missing_value_indexes['Ptot'] ==
+            wxdset.missing_value_indexes['Ptot']).all()
+    dataset = project.db['wxdsets/wxdset/Missing Ptot']
+    assert dataset[...].tolist() == [[10957, 10987], [11017, 11017]]
+    project.close()
+
+
+def test_wxdsets_pet_method(project, projectpath):
+    """
+    Test that the potential evapotranspiration of the weather datasets of a
+    project is calculated and saved as expected with the selected method.
+    """
+    wxdset = WXDataFrame(osp.join(
+        __rootdir__, 'projet', 'tests', 'data', 'sample_weather_datafile.csv'))
+    assert wxdset.metadata['PET method'] == 'datafile'
+    for name, lat in [('north', 55.5), ('south', 45.5)]:
+        wxdset.metadata['Latitude'] = lat
+        project.add_wxdset(name, wxdset)
+
+    project.set_wxdsets_pet_method('oudin')
+    project.close()
+
+    project = ProjetReader(projectpath)
+    for name in ['north', 'south']:
+        wxdset = project.get_wxdset(name)
+        assert wxdset.metadata['PET method'] == 'oudin'
+        expected_pet = wxdset.data['PET'].values.copy()
+        wxdset.data['PET'] = 0
+        wxdset.set_pet_method('oudin')
+        assert np.allclose(wxdset.data['PET'].values, expected_pet)
+    assert not np.allclose(project.get_wxdset('north').data['PET'],
+                           project.get_wxdset('south').data['PET'])
+
+    project.set_wxdsets_pet_method('thornthwaite', names=['south'])
+    assert project.get_wxdset('north').metadata['PET method'] == 'oudin'
+    assert (project.get_wxdset('south').metadata['PET method'] ==
+            'thornthwaite')
+    project.close()
+
+
+def test_blended_wxdset(project, wlfilename):
+    """
+    Test that composing a weather dataset from the weather datasets that are
+    closest to a water level dataset is working as expected.
+    """
+    wxdset = WXDataFrame(osp.join(
+        __rootdir__, 'projet', 'tests', 'data', 'sample_weather_datafile.csv'))
+    for name, lat, lon in [('far', 48.5, -68.5),
+                           ('closest', 45.7, -73.3),
+                           ('close', 45.5, -73.0)]:
+        wxdset.metadata['Station Name'] = name
+        wxdset.metadata['Latitude'] = lat
+        wxdset.metadata['Longitude'] = lon
+        project.add_wxdset(name, wxdset)
+    project.add_wldset('wldset', WLDataset(wlfilename))
+
+    blended_wxdset = project.get_blended_wxdset('wldset', k=2)
+    assert blended_wxdset.metadata['Station Name'] == 'closest + close'
+    assert len(blended_wxdset.data) == len(wxdset.data)
+    assert not blended_wxdset.data.isnull().any().any()
+
+    # Make sure the blended dataset is cached.
+    assert project.get_blended_wxdset('wldset', k=2) is blended_wxdset
+
+    # Make sure the cache is cleared when a dataset is deleted.
+    project.del_wxdset('closest')
+    blended_wxdset = project.get_blended_wxdset('wldset', k=2)
+    assert blended_wxdset.metadata['Station Name'] == 'close + far'
+
+
 def test_project_backward_compatibility(oldprojectfile):
     """
     Test that old project files are opened as expected in newer versions
@@ -105,6 +105,34 @@ def test_read_waterlvl(ext):
     assert list(dataset['Time']) == expected_results
 
 
+def test_read_waterlvl_csv_with_invalid_values(tmp_path):
+    """
+    Test that reading a water level csv datafile containing invalid values
+    and columns that are not recognized is working as expected.
+    """
+    filename = osp.join(tmp_path, 'water_level_datafile_invalid.csv')
+    save_content_to_csv(filename, [
+        ['Well name', 'test_well'],
+        ['Latitude', 45.36],
+        [],
+        ['Date', 'Other', 'WL(mbgs)', 'BP(m)'],
+        ['2012-11-28 16:45', 'a', 3.667, 10.333],
+        ['2012-11-28 17:00', 'b', 'error', 10.331],
+        ['2012-11-28 17:15', 'c', 3.665, '']
+        ])
+    dataset = WLDataset(filename)
+
+    assert dataset['Well'] == 'test_well'
+    assert dataset['Latitude'] == 45.36
+    assert dataset.data.columns.tolist() == ['BP', 'WL', 'ET']
+    assert dataset.data['WL'].dtype == 'float64'
+    assert dataset.data['BP'].dtype == 'float64'
+    assert dataset.data['WL'].isnull().tolist() == [False, True, False]
+    assert dataset.data['BP'].isnull().tolist() == [False, False, True]
+    assert dataset['Time'] == [
+        '2012-11-28T16:45:00', '2012-11-28T17:00:00', '2012-11-28T17:15:00']
+
+
 def test_set_waterlvl_dataset():
     """
     Test that modifying water level datasets is working as expected.
@@ -126,6 +154,26 @@ def test_set_waterlvl_dataset():
         assert dataset[key] == expected_results[key]
 
 
+def test_waterlvl_dataset_xldates():
+    """
+    Test that the Excel numerical dates of water level datasets are
+    computed once and cached as expected.
+    """
+    filename = osp.join(DATADIR, 'water_level_datafile.csv')
+    dataset = WLDataset(filename)
+
+    xldates = dataset.xldates
+    assert xldates is dataset.xldates
+    assert xldates.flags.writeable is False
+    assert dataset.data.columns.tolist() == ['BP', 'WL', 'ET']
+    assert xldates[0] == 41241 + (16 * 60 + 45) / (24 * 60)
+
+    # Make sure the cached dates are updated if the index of the
+    # data is replaced.
+    dataset.data.index = dataset.data.index + pd.Timedelta(days=1)
+    assert np.allclose(dataset.xldates, xldates + 1)
+
+
 @pytest.mark.parametrize("ext", ['.csv', '.xls', '.xlsx'])
 def test_load_waterlvl_measurements(datatmpdir, ext):
     filename = osp.join(datatmpdir, "waterlvl_manual_measurements" + ext)
@@ -21,6 +21,11 @@ from qtpy.QtWidgets import QApplication, QFileDialog, QMessageBox
 from gwhat.meteo.weather_reader import WXDataFrame
 from gwhat.projet.reader_waterlvl import WLDataset
 from gwhat.HydroCalc2 import WLCalc
+from gwhat.hydrocalc.recession import recession_calc
+from gwhat.hydrocalc.recession.recession_calc import (
+    predict_recession, predict_recession_jac, find_recession_periods,
+    calculate_project_mrcs, RecessionSegmentIndex, bootstrap_mrc,
+    calculate_mrc)
 from gwhat.projet.manager_data import DataManager
 from gwhat.projet.reader_projet import ProjetReader
 
@@ -180,6 +185,231 @@ def test_calc_mrc(hydrocalc, tmp_path, qtbot, mocker):
     assert qfdialog_patcher.call_count == 1
 
 
+def test_calc_mrc_with_corrected_waterlevels(hydrocalc, qtbot, mocker):
+    """
+    Test that the MRC is not calculated with the corrected water levels
+    when they were not calculated for the dataset.
+    """
+    mrc_tool = hydrocalc.tools['mrc']
+    mrc_tool.add_mrcperiod((41384.260416666664, 41414.114583333336))
+    mrc_tool.corrected_wl_cbox.setChecked(True)
+
+    qmsgbox_patcher = mocker.patch.object(
+        QMessageBox, 'warning', return_value=QMessageBox.Ok)
+    qtbot.mouseClick(mrc_tool.btn_calc_mrc, Qt.LeftButton)
+    assert qmsgbox_patcher.call_count == 1
+    assert np.isnan(hydrocalc.wldset.get_mrc()['params']).all()
+
+
+def test_predict_recession():
+    """
+    Test that the water levels predicted with the MRC and their Jacobian
+    are calculated as expected.
+    """
+    tdeltas = np.array([0, 0.5, 1, 2, 0, 0.25, 0.5, 0])
+    h = np.array([3, 3.1, 3.2, 3.3, 2, 2.1, 2.2, 1])
+    B, A = 0.2, 0.05
+
+    # Calculate the expected values with the recursive form of the
+    # discretized MRC equation.
+    expected = np.empty(len(h))
+    for i in range(len(h)):
+        if tdeltas[i] == 0:
+            expected[i] = h[i]
+        else:
+            dt = tdeltas[i] - tdeltas[i - 1]
+            expected[i] = (
+                ((1 - A * dt / 2) * expected[i - 1] + B * dt) /
+                (1 + A * dt / 2))
+    hp = predict_recession(tdeltas, B, A, h)
+    assert np.allclose(hp, expected)
+
+    # Assert that the Jacobian matches the finite difference approximation.
+    eps = 10**-7
+    jac = predict_recession_jac(tdeltas, B, A, h)
+    assert jac.shape == (len(h), 2)
+    assert np.allclose(
+        jac[:, 0], (predict_recession(tdeltas, B + eps, A, h) - hp) / eps)
+    assert np.allclose(
+        jac[:, 1], (predict_recession(tdeltas, B, A + eps, h) - hp) / eps)
+    assert np.all(jac[tdeltas == 0] == 0)
+
+
+def test_recession_segment_index(mocker):
+    """
+    Test that the recession segments are extracted as expected and that
+    the bounds of the periods are searched only once.
+    """
+    t = np.array([0, 0.5, 1, 2, 3, 5, 6, 7, 8.5, 9])
+    segment_index = RecessionSegmentIndex(t)
+    spy = mocker.spy(np, 'searchsorted')
+
+    # Note that the second period contains a single time step and must be
+    # ignored.
+    periods = [(0.5, 3), (4, 5.5), (9, 6)]
+    index_seg, tdeltas, istart, iend = segment_index.get_segments(periods)
+    assert index_seg.tolist() == [1, 2, 3, 4, 6, 7, 8, 9]
+    assert tdeltas.tolist() == [0, 0.5, 1.5, 2.5, 0, 1, 2.5, 3]
+    assert istart.tolist() == [1, 6]
+    assert iend.tolist() == [5, 10]
+    assert spy.call_count == 6
+
+    # Assert that only the new period is searched when a period is added.
+    periods.append((-1, 0.1))
+    index_seg, tdeltas, istart, iend = segment_index.get_segments(periods)
+    assert index_seg.tolist() == [1, 2, 3, 4, 6, 7, 8, 9]
+    assert spy.call_count == 8
+
+    periods.append((4.5, 7))
+    index_seg, tdeltas, istart, iend = segment_index.get_segments(periods)
+    assert index_seg.tolist() == [1, 2, 3, 4, 6, 7, 8, 9, 5, 6, 7]
+    assert tdeltas[-3:].tolist() == [0, 1, 2]
+    assert spy.call_count == 10
+
+
+def test_wldset_recession_segment_index():
+    """
+    Test that the index of the recession segments of a water level dataset
+    is cached until the dates of the dataset change.
+    """
+    wldset = WLDataset(WLFILENAME)
+    segment_index = wldset.get_recession_segment_index()
+    assert segment_index.t is wldset.xldates
+    assert wldset.get_recession_segment_index() is segment_index
+
+    wldset._dataf = wldset._dataf.iloc[10:]
+    assert wldset.get_recession_segment_index() is not segment_index
+    assert len(wldset.get_recession_segment_index().t) == len(wldset)
+
+
+def test_find_recession_periods():
+    """
+    Test that the recession periods are detected as expected from the
+    water levels and the daily rain.
+    """
+    t = np.arange(30, dtype=float)
+    h = np.array([3, 3.1, 3.2, 3.3, 3.4, 3.5, 3.6, 3.7, 3.0, 3.1,
+                  3.2, 3.3, 3.4, 3.0, 3.1, 3.2, 3.3, np.nan, 3.4, 3.5,
+                  3.6, 3.7, 3.8, 3.9, 4.0, 4.1, 4.2, 4.2, 4.3, 4.4])
+
+    periods = find_recession_periods(t, h, min_length=4)
+    assert periods == [(0, 7), (8, 12), (18, 29)]
+
+    periods = find_recession_periods(t, h, min_length=5)
+    assert periods == [(0, 7), (18, 29)]
+
+    # Assert that the water levels following a rainy day are excluded.
+    periods = find_recession_periods(
+        t, h, min_length=4,
+        precip_time=t, precip=np.where(t == 20, 10, 0),
+        precip_threshold=1, exclusion_window=2)
+    assert periods == [(0, 7), (8, 12), (23, 29)]
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_calculate_project_mrcs(project, max_workers):
+    """
+    Test that the MRC of all the water level datasets of a project are
+    calculated and saved in the project as expected.
+    """
+    wldset = project.get_wldset(project.wldsets[0])
+    project.add_wldset('well2', wldset)
+    assert not any(project.get_wldset(name).mrc_exists() for
+                   name in project.wldsets)
+
+    coeffs = calculate_project_mrcs(
+        project, max_workers=max_workers, min_length=5)
+    assert sorted(coeffs) == sorted(project.wldsets)
+    for name in project.wldsets:
+        wldset = project.get_wldset(name)
+        assert wldset.mrc_exists()
+        mrc_data = wldset.get_mrc()
+        assert mrc_data['params'].A == coeffs[name].A > 0
+        assert mrc_data['params'].B == coeffs[name].B
+        assert len(mrc_data['peak_indx']) == len(find_recession_periods(
+            wldset.xldates, wldset.waterlevels, min_length=5,
+            precip_time=project.get_wxdset(project.wxdsets[0]).xldates,
+            precip=project.get_wxdset(project.wxdsets[0]).data['Rain']))
+        assert np.sum(~np.isnan(mrc_data['recess'])) > 0
+
+    # Assert that the datasets whose water levels were not corrected are
+    # skipped when the corrected water levels are used.
+    coeffs = calculate_project_mrcs(
+        project, max_workers=max_workers, corrected_waterlevels=True)
+    assert coeffs == {}
+
+
+def test_bootstrap_mrc():
+    """
+    Test that the confidence intervals of the MRC coefficients are
+    estimated as expected with bootstrap.
+    """
+    wldset = WLDataset(WLFILENAME)
+    t = wldset.xldates
+    h = wldset.waterlevels
+    periods = [
+        (41384.260416666664, 41414.114583333336),
+        (41310.385416666664, 41340.604166666664),
+        (41294.708333333336, 41302.916666666664),
+        (41274.5625, 41284.635416666664),
+        (41457.395833333336, 41486.875),
+        (41440.604166666664, 41447.697916666664),
+        (41543.958333333336, 41552.541666666664)]
+    coeffs = calculate_mrc(t, h, periods, mrctype=1)[0]
+
+    params_ci = bootstrap_mrc(
+        t, h, periods, mrctype=1, n_samples=30, level=0.9, max_workers=1,
+        seed=0)
+    assert params_ci.shape == (2, 2)
+    assert params_ci[0, 0] < coeffs.A < params_ci[0, 1]
+    assert params_ci[1, 0] < coeffs.B < params_ci[1, 1]
+
+    # Assert that the results are reproducible and that a wider confidence
+    # level gives wider intervals.
+    assert np.array_equal(params_ci, bootstrap_mrc(
+        t, h, periods, mrctype=1, n_samples=30, level=0.9, max_workers=1,
+        seed=0))
+    params_ci_99 = bootstrap_mrc(
+        t, h, periods, mrctype=1, n_samples=30, level=0.99, max_workers=1,
+        seed=0)
+    assert np.all(params_ci_99[:, 0] <= params_ci[:, 0])
+    assert np.all(params_ci_99[:, 1] >= params_ci[:, 1])
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_calculate_project_mrcs_bootstrap(project, max_workers, mocker):
+    """
+    Test that the confidence intervals of the MRC coefficients are saved
+    in the project as expected.
+    """
+    name = project.wldsets[0]
+    project.add_wldset('well2', project.get_wldset(name))
+    pool_spy = mocker.spy(recession_calc, 'create_process_pool')
+    calculate_project_mrcs(
+        project, max_workers=max_workers, min_length=5, n_bootstrap=20,
+        level=0.9)
+
+    # Assert that a single pool was used for all the datasets.
+    assert pool_spy.call_count == (max_workers > 1)
+    assert project.get_wldset('well2').get_mrc()['ci_level'] == 0.9
+
+    wldset = project.get_wldset(name)
+    mrc_data = wldset.get_mrc()
+    assert mrc_data['ci_level'] == 0.9
+    assert mrc_data['params_ci'].shape == (2, 2)
+    assert (mrc_data['params_ci'][0, 0] <= mrc_data['params'].A <=
+            mrc_data['params_ci'][0, 1])
+    assert (mrc_data['params_ci'][1, 0] <= mrc_data['params'].B <=
+            mrc_data['params_ci'][1, 1])
+
+    # Assert that the confidence intervals are reset when a new MRC
+    # is saved.
+    wldset.set_mrc(0.1, 0.2, [], [], [], 0, 0, 0)
+    mrc_data = wldset.get_mrc()
+    assert np.isnan(mrc_data['ci_level'])
+    assert np.isnan(mrc_data['params_ci']).all()
+
+
 def test_pan_axes(hydrocalc, tmp_path, qtbot, mocker):
     """
     Test that the tool to pan the axes with keyboard shortcuts is working
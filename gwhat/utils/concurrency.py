@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+"""
+Helpers to run the calculations of GWHAT concurrently in pools of workers.
+"""
+
+# ---- Standard library imports
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+
+def get_max_workers(max_workers=None, default_max_workers=4, n_tasks=None):
+    """
+    Return the number of workers to use to run n_tasks concurrently.
+
+    If max_workers is None, up to default_max_workers workers are used,
+    but no more than the number of CPUs. The number of workers is never
+    larger than the number of tasks and is at least 1.
+    """
+    max_workers = max_workers or min(default_max_workers, os.cpu_count() or 1)
+    if n_tasks is not None:
+        max_workers = min(max_workers, n_tasks)
+    return max(1, max_workers)
+
+
+def create_process_pool(max_workers):
+    """
+    Return a pool of max_workers processes.
+
+    The processes are started with the 'spawn' method, since forking a
+    process running a Qt event loop is not safe.
+    """
+    return ProcessPoolExecutor(
+        max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def call_safely(func, *args, **kwargs):
+    """
+    Return the result of func called with args and kwargs along with an
+    empty error message, or None and the error message if func raised
+    an exception.
+
+    This is meant to be submitted to a pool of processes, so that the error
+    is returned as a string with the results instead of an exception that
+    may not be picklable.
+    """
+    try:
+        return func(*args, **kwargs), ''
+    except Exception as e:
+        return None, str(e) or type(e).__name__
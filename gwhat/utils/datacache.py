@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+"""
+A cache of the data parsed from the water level and weather input data
+files, so that the files that did not change since the last time they were
+imported are not parsed again.
+
+The data of each file are saved in a numpy npz file, along with the path,
+size, modification time and content hash of the file, and the hash of the
+source code of the reader module that parsed the file, so that the cached
+data are discarded whenever the reader changes. The npz files are written
+and read without pickle.
+
+The size of the cache is limited, so that the least recently used npz
+files are deleted when the total size of the cache exceeds the limit.
+"""
+
+# ---- Standard library imports
+import hashlib
+import json
+from functools import lru_cache
+import os
+import os.path as osp
+from shutil import rmtree
+import sys
+import tempfile
+
+# ---- Third party imports
+import numpy as np
+import pandas as pd
+
+# ---- Local library imports
+from gwhat import __version__
+from gwhat.config.main import CONF, CONFIG_DIR
+
+# This needs to be increased when the format of the cache files change.
+CACHE_VERSION = 2
+
+
+def get_datacache_dir():
+    """Return the directory where the parsed data files are cached."""
+    return osp.join(CONFIG_DIR, 'datafile_cache')
+
+
+def is_datacache_enabled():
+    """Return whether the parsed data files are cached."""
+    return CONF.get('main', 'datafile_cache_enabled', True)
+
+
+def get_datacache_max_size():
+    """Return the maximum size of the cache in bytes."""
+    return CONF.get('main', 'datafile_cache_max_size', 256) * 2**20
+
+
+def clear_datacache():
+    """Delete all the parsed data files saved in the cache."""
+    rmtree(get_datacache_dir(), ignore_errors=True)
+
+
+def calc_file_hash(filename, chunk_size=2**20):
+    """Return the sha1 hash of the content of a file."""
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def calc_reader_hash(reader):
+    """
+    Return the sha1 hash of the source code of the module named reader
+    that is used to parse the data files.
+    """
+    return calc_file_hash(sys.modules[reader].__file__)
+
+
+def _get_cache_filename(filename, reader):
+    """
+    Return the path of the file where the data parsed from filename with
+    the specified reader are cached.
+    """
+    key = '{}|{}'.format(osp.normcase(osp.abspath(filename)), reader)
+    return osp.join(
+        get_datacache_dir(),
+        hashlib.sha1(key.encode('utf-8')).hexdigest() + '.npz')
+
+
+def load_cached_datafile(filename, reader):
+    """
+    Return the metadata and the dataframe that were parsed from filename
+    with the specified reader and saved in the cache, where reader is the
+    name of the module used to parse the file.
+
+    Return None if the cache is disabled, if the data of the file are not
+    cached, or if the file or the source code of the reader changed since
+    the data were cached. A file is considered to have changed if its size
+    changed or if its modification time and the hash of its content both
+    changed.
+    """
+    if not is_datacache_enabled():
+        return None
+    cache_filename = _get_cache_filename(filename, reader)
+    if not osp.exists(cache_filename):
+        return None
+
+    try:
+        stat = os.stat(filename)
+        with np.load(cache_filename, allow_pickle=False) as npz:
+            key = json.loads(str(npz['key']))
+            if (key['cache_version'] != CACHE_VERSION or
+                    key['gwhat_version'] != __version__ or
+                    key['reader_sha1'] != calc_reader_hash(reader) or
+                    key['size'] != stat.st_size):
+                return None
+            is_touched = key['mtime_ns'] != stat.st_mtime_ns
+            if is_touched and key['sha1'] != calc_file_hash(filename):
+                return None
+
+            metadata = json.loads(str(npz['metadata']))
+            index = pd.DatetimeIndex(
+                npz['index'].view('datetime64[ns]'), name=key['index_name'])
+            data = pd.DataFrame(
+                {column: npz['column_{}'.format(j)] for
+                 j, column in enumerate(key['columns'])},
+                index=index, columns=key['columns'])
+    except (OSError, ValueError, KeyError) as e:
+        print("WARNING: Failed to load the cached data of {} because of "
+              "the following error: {}".format(osp.basename(filename), e))
+        return None
+
+    if is_touched:
+        # The content of the file did not change, so we only need to
+        # update the modification time saved in the cache.
+        save_cached_datafile(filename, reader, metadata, data)
+    else:
+        # We update the modification time of the cache file, so that the
+        # most recently used files are the last to be evicted.
+        try:
+            os.utime(cache_filename)
+        except OSError:
+            pass
+    return metadata, data
+
+
+def save_cached_datafile(filename, reader, metadata, data):
+    """
+    Save in the cache the metadata and the dataframe that were parsed
+    from filename with the specified reader, where reader is the name of
+    the module used to parse the file.
+
+    The data are cached only if the index of the dataframe is a
+    DatetimeIndex, if all its columns are numeric and if the metadata can
+    be serialized to json.
+    """
+    if not is_datacache_enabled():
+        return
+    if not isinstance(data.index, pd.DatetimeIndex):
+        return
+    if not all(np.issubdtype(dtype, np.number) for dtype in data.dtypes):
+        return
+
+    try:
+        stat = os.stat(filename)
+        key = {'cache_version': CACHE_VERSION,
+               'gwhat_version': __version__,
+               'filename': osp.abspath(filename),
+               'reader': reader,
+               'reader_sha1': calc_reader_hash(reader),
+               'size': stat.st_size,
+               'mtime_ns': stat.st_mtime_ns,
+               'sha1': calc_file_hash(filename),
+               'index_name': data.index.name,
+               'columns': [str(column) for column in data.columns]}
+        arrays = {'key': np.array(json.dumps(key)),
+                  'metadata': np.array(json.dumps(metadata)),
+                  'index': data.index.values.view('int64')}
+        for j, column in enumerate(data.columns):
+            arrays['column_{}'.format(j)] = data[column].values
+    except (OSError, TypeError, ValueError) as e:
+        print("WARNING: Failed to cache the data of {} because of "
+              "the following error: {}".format(osp.basename(filename), e))
+        return
+
+    # We write the data to a temporary file first, so that a cache file
+    # is never read while it is being written by another process.
+    cache_filename = _get_cache_filename(filename, reader)
+    try:
+        os.makedirs(osp.dirname(cache_filename), exist_ok=True)
+        fd, tmp_filename = tempfile.mkstemp(
+            suffix='.tmp', dir=osp.dirname(cache_filename))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_filename, cache_filename)
+        except BaseException:
+            os.remove(tmp_filename)
+            raise
+    except OSError as e:
+        print("WARNING: Failed to cache the data of {} because of "
+              "the following error: {}".format(osp.basename(filename), e))
+        return
+    evict_datacache()
+
+
+def evict_datacache(max_size=None):
+    """
+    Delete the least recently used files of the cache until the total size
+    of the cache is not larger than max_size in bytes, which defaults to
+    the size set in the configuration.
+    """
+    if max_size is None:
+        max_size = get_datacache_max_size()
+    dirname = get_datacache_dir()
+    try:
+        entries = [entry for entry in os.scandir(dirname) if
+                   entry.is_file() and entry.name.endswith('.npz')]
+        stats = [(entry.path, entry.stat()) for entry in entries]
+    except OSError:
+        return
+
+    cache_size = sum(stat.st_size for path, stat in stats)
+    for path, stat in sorted(stats, key=lambda item: item[1].st_mtime_ns):
+        if cache_size <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        cache_size -= stat.st_size
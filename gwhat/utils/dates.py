@@ -12,11 +12,17 @@
 import h5py
 import numpy as np
 import pandas as pd
-import xlrd
 from xlrd import xldate_as_tuple
-from xlrd.xldate import xldate_as_datetime
 from PyQt5.QtCore import QDate, QDateTime
 
+# The epochs of the 1900-based and 1904-based Excel numerical date systems.
+# Note that the epoch of the 1900-based system is set to 1899-12-30
+# instead of 1899-12-31 to account for the fictitious 1900-02-29 day that
+# Excel considers valid. See the 'xldate_as_datetime' function of xlrd.
+XLDATE_EPOCHS = {0: np.datetime64('1899-12-30', 'ms'),
+                 1: np.datetime64('1904-01-01', 'ms')}
+MS_PER_DAY = 86400000
+
 
 def format_time_data(self, timedata):
     """
@@ -40,20 +46,73 @@ def format_time_data(self, timedata):
         try:
             # Try converting the Excel numeric dates to pandas
             # datetime objects.
-            datetimes = pd.to_datetime(datetimes.apply(
-                lambda date: xlrd.xldate.xldate_as_datetime(date, 0)))
+            datetimes = xldates_to_datetimeindex(timedata)
         except Exception:
             print('Warning: the dates are not formatted correctly.')
     return datetimes
 
 
+def xldates_to_datetime64(xldates, datemode=0):
+    """
+    Convert a list or numpy array of Excel numeric dates to a numpy array
+    of datetime64 values.
+
+    The conversion is done with array arithmetic and yields the same results
+    as the 'xldate_as_datetime' function of xlrd, including the workaround
+    for the Excel 1900 leap year bug. Nan values are converted to NaT.
+
+    A value of 0 is used for datemode if the workbook was created in
+    Windows (1900-based), while a value of 1 is used if it was created
+    on macOS (1904-based).
+    """
+    xldates = np.asarray(xldates, dtype='float64')
+    isnan = np.isnan(xldates)
+    xldates = np.where(isnan, 0, xldates)
+
+    # The integer part of the Excel date stores the number of days since
+    # the epoch and the fractional part stores the percentage of the day,
+    # which is rounded to the millisecond as done in xlrd.
+    days = np.trunc(xldates)
+    milliseconds = days * MS_PER_DAY + np.round(
+        (xldates - days) * MS_PER_DAY)
+    if datemode == 0:
+        # Dates before the fictitious 1900-02-29 day are shifted by one day.
+        milliseconds = milliseconds + MS_PER_DAY * (xldates < 60)
+
+    datetimes = (
+        XLDATE_EPOCHS[datemode] +
+        milliseconds.astype('int64').astype('timedelta64[ms]')
+        ).astype('datetime64[ns]')
+    datetimes[isnan] = np.datetime64('NaT')
+    return datetimes
+
+
+def datetime64_to_xldates(datetimes, datemode=0):
+    """
+    Convert a list or numpy array of datetime64 values to a numpy array
+    of Excel numeric dates. NaT values are converted to nan.
+
+    A value of 0 is used for datemode if the workbook was created in
+    Windows (1900-based), while a value of 1 is used if it was created
+    on macOS (1904-based).
+    """
+    datetimes = np.asarray(datetimes, dtype='datetime64[ns]')
+    isnat = np.isnat(datetimes)
+    xldates = (
+        (datetimes - XLDATE_EPOCHS[datemode]).astype('timedelta64[ns]')
+        .astype('int64') / (MS_PER_DAY * 10**6))
+    if datemode == 0:
+        # Dates before the fictitious 1900-02-29 day are shifted by one day.
+        xldates = xldates - (xldates < 61)
+    xldates[isnat] = np.nan
+    return xldates
+
+
 def datetimeindex_to_xldates(datetimeindex):
     """
     Convert a datetime index to a numpy array of Excel numerical date format.
     """
-    timedeltas = datetimeindex - xldate_as_datetime(4000, 0)
-    xldates = timedeltas.total_seconds() / (3600 * 24) + 4000
-    return xldates.values
+    return datetime64_to_xldates(datetimeindex.values)
 
 
 def xldates_to_datetimeindex(xldates):
@@ -61,8 +120,7 @@ def xldates_to_datetimeindex(xldates):
     Format a list or numpy array of Excel numeric dates into a
     pandas datetime index.
     """
-    return pd.to_datetime(
-        [xlrd.xldate.xldate_as_datetime(xldate, 0) for xldate in xldates])
+    return pd.DatetimeIndex(xldates_to_datetime64(xldates))
 
 
 def xldates_to_strftimes(xldates):
@@ -77,6 +135,37 @@ def xldates_to_strftimes(xldates):
         )
 
 
+def datetimeindex_to_dayruns(datetimeindex):
+    """
+    Contract the days of a datetime index into an array of runs of
+    consecutive days.
+
+    Return a numpy array of shape (n, 2) with the first and last day of each
+    run, expressed as integer numbers of days since 1970-01-01. The times
+    of the day are discarded and the days are sorted and unique.
+    """
+    days = np.asarray(datetimeindex, dtype='datetime64[D]')
+    days = np.unique(days[~np.isnat(days)].astype('int64'))
+    if len(days) == 0:
+        return np.empty((0, 2), dtype='int64')
+    breaks = np.flatnonzero(np.diff(days) != 1)
+    return np.column_stack((
+        days[np.r_[0, breaks + 1]], days[np.r_[breaks, len(days) - 1]]))
+
+
+def dayruns_to_datetimeindex(dayruns):
+    """
+    Expand an array of runs of consecutive days, as returned by
+    datetimeindex_to_dayruns, into a datetime index.
+    """
+    dayruns = np.reshape(np.asarray(dayruns, dtype='int64'), (-1, 2))
+    lengths = dayruns[:, 1] - dayruns[:, 0] + 1
+    offsets = (np.arange(np.sum(lengths)) -
+               np.repeat(np.cumsum(lengths) - lengths, lengths))
+    days = np.repeat(dayruns[:, 0], lengths) + offsets
+    return pd.DatetimeIndex(days.astype('datetime64[D]'))
+
+
 def qdate_from_xldate(xldate, datemode=0):
     """
     Conver an numerical Excel date to a QDate object
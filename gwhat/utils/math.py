@@ -72,6 +72,102 @@ def clip_time_series(tclip, tp, xp):
     return tp, xp
 
 
+def find_sampling_interval(t):
+    """
+    Return the dominant sampling interval of the times t in days, which is
+    the most frequent interval between two consecutive times when rounded
+    to the nearest second.
+    """
+    intervals = np.round(np.diff(np.asarray(t, dtype=float)) * 86400)
+    intervals = intervals[intervals > 0]
+    if len(intervals) == 0:
+        raise ValueError("At least two distinct times are required to "
+                         "find the sampling interval.")
+    values, counts = np.unique(intervals, return_counts=True)
+    return values[np.argmax(counts)] / 86400
+
+
+def regularize_time_series(t, x, dt=None, max_gap=None):
+    """
+    Resample by linear interpolation the channels of a time series on a
+    regular grid spanning the times of the series.
+
+    The position of the grid in the times of the series is searched only
+    once for all channels. The missing values of each channel are skipped,
+    so that each value of the grid is interpolated between the closest
+    valid values of its channel. The values of the grid that are not
+    between two valid values of their channel, or for which these two
+    values are separated by more than max_gap, are flagged as gaps and set
+    to NaN instead of being interpolated.
+
+    Parameters
+    ----------
+    t : np.ndarray
+        The sorted times of the series in days.
+    x : np.ndarray
+        An array of shape (n,) or (n, k) with the values of the k channels
+        of the series, with missing values set to NaN.
+    dt : float, optional
+        The sampling interval of the grid in days. The dominant sampling
+        interval of the series is used if None.
+    max_gap : float, optional
+        The maximum length in days of the gaps that are filled by
+        interpolation. Gaps of any length are filled if None.
+
+    Returns
+    -------
+    tc : np.ndarray
+        The times of the regular grid.
+    xc : np.ndarray
+        The values of the channels resampled on the grid, with the same
+        number of dimensions as x.
+    isgap : np.ndarray
+        A boolean array with the same shape as xc that is True for the
+        values of the grid that were flagged as gaps.
+    """
+    t = np.asarray(t, dtype=float)
+    x = np.asarray(x, dtype=float)
+    values = x.reshape(len(t), -1)
+    if dt is None:
+        dt = find_sampling_interval(t)
+    tc = t[0] + np.arange(int(round((t[-1] - t[0]) / dt)) + 1) * dt
+
+    # Find for each sample and channel the index of the closest valid
+    # value at or before the sample and at or after the sample.
+    nsamples = len(t)
+    rows = np.arange(nsamples)[:, np.newaxis]
+    isvalid = ~np.isnan(values)
+    iprev = np.maximum.accumulate(np.where(isvalid, rows, -1), axis=0)
+    inext = np.minimum.accumulate(
+        np.where(isvalid, rows, nsamples)[::-1], axis=0)[::-1]
+
+    # Find the valid values surrounding each time of the grid.
+    ileft = np.clip(np.searchsorted(t, tc, side='right') - 1, 0, None)
+    iright = np.clip(np.searchsorted(t, tc, side='left'), None, nsamples - 1)
+    i0 = iprev[ileft]
+    i1 = inext[iright]
+    isgap = (i0 < 0) | (i1 >= nsamples)
+    i0 = np.clip(i0, 0, nsamples - 1)
+    i1 = np.clip(i1, 0, nsamples - 1)
+    t0 = t[i0]
+    t1 = t[i1]
+    if max_gap is not None:
+        isgap |= (t1 - t0) > max_gap
+
+    columns = np.arange(values.shape[1])
+    x0 = values[i0, columns]
+    x1 = values[i1, columns]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.where(t1 > t0, (tc[:, np.newaxis] - t0) / (t1 - t0), 0)
+    xc = x0 + weights * (x1 - x0)
+    xc[isgap] = np.nan
+
+    if x.ndim == 1:
+        xc = xc[:, 0]
+        isgap = isgap[:, 0]
+    return tc, xc, isgap
+
+
 def convert_date_to_datetime(years, months, days):
     """
     Produce datetime series from years, months, and days series.
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+# ---- Third party imports
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS = 6373  # Earth radius in km, as used in calc_dist_from_coord.
+
+
+def latlon_to_xyz(lat, lon):
+    """
+    Convert latitude and longitude coordinates given in decimal degrees
+    to cartesian coordinates on the unit sphere.
+    """
+    lat = np.radians(np.atleast_1d(np.asarray(lat, dtype='float64')))
+    lon = np.radians(np.atleast_1d(np.asarray(lon, dtype='float64')))
+    return np.column_stack([
+        np.cos(lat) * np.cos(lon),
+        np.cos(lat) * np.sin(lon),
+        np.sin(lat)])
+
+
+def chord_to_km(chord):
+    """
+    Convert a chord length on the unit sphere to a great-circle
+    distance in km.
+    """
+    return 2 * EARTH_RADIUS * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def km_to_chord(dist):
+    """
+    Convert a great-circle distance in km to a chord length on the
+    unit sphere.
+    """
+    return 2 * np.sin(np.clip(dist / (2 * EARTH_RADIUS), 0, np.pi / 2))
+
+
+class StationSpatialIndex(object):
+    """
+    A spatial index to quickly find the stations that are closest to one or
+    more locations given in decimal degrees.
+
+    The stations are projected on the unit sphere and indexed with a KD-tree,
+    so that the euclidean (chord) distances used by the tree are monotonic
+    with the great-circle (haversine) distances returned by the queries.
+    """
+
+    def __init__(self, names, lats, lons):
+        self.names = np.array(names, dtype=object)
+        self.lats = np.asarray(lats, dtype='float64')
+        self.lons = np.asarray(lons, dtype='float64')
+        if not (len(self.names) == len(self.lats) == len(self.lons)):
+            raise ValueError(
+                "'names', 'lats' and 'lons' must have the same length.")
+        self._tree = (
+            cKDTree(latlon_to_xyz(self.lats, self.lons)) if len(self) else
+            None)
+
+    def __len__(self):
+        return len(self.names)
+
+    def query_nearest(self, lat, lon, k=1):
+        """
+        Return the names of and the distances in km to the k stations that
+        are closest to the location(s) given in decimal degrees.
+
+        If lat and lon are scalars, 1D arrays of length k are returned.
+        Otherwise, 2D arrays of shape (n, k) are returned, where n is the
+        number of locations.
+        """
+        k = min(k, len(self))
+        if k == 0:
+            return np.array([], dtype=object), np.array([])
+
+        chords, indexes = self._tree.query(latlon_to_xyz(lat, lon), k=k)
+        chords = np.reshape(chords, (-1, k))
+        indexes = np.reshape(indexes, (-1, k))
+
+        names = self.names[indexes]
+        dists = chord_to_km(chords)
+        if np.ndim(lat) == 0:
+            return names[0], dists[0]
+        return names, dists
+
+    def query_radius(self, lat, lon, radius):
+        """
+        Return the names of and the distances in km to the stations that
+        are located within the given radius in km of a location given in
+        decimal degrees, sorted from the closest to the farthest.
+        """
+        if len(self) == 0:
+            return np.array([], dtype=object), np.array([])
+
+        xyz = latlon_to_xyz(lat, lon)
+        indexes = np.array(
+            self._tree.query_ball_point(xyz[0], km_to_chord(radius)),
+            dtype=int)
+        dists = chord_to_km(
+            np.sqrt(np.sum((self._tree.data[indexes] - xyz[0])**2, axis=1)))
+        order = np.argsort(dists, kind='stable')
+        return self.names[indexes[order]], dists[order]
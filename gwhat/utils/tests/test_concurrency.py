@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+# ---- Standard imports
+import os
+
+# ---- Third party imports
+import pytest
+
+# ---- Local imports
+from gwhat.utils.concurrency import get_max_workers, call_safely
+
+
+# ---- Tests
+def test_get_max_workers(mocker):
+    """Test that the number of workers is determined as expected."""
+    mocker.patch.object(os, 'cpu_count', return_value=2)
+    assert get_max_workers(None, 4) == 2
+    assert get_max_workers(None, 1) == 1
+    assert get_max_workers(3, 4) == 3
+    assert get_max_workers(3, 4, n_tasks=2) == 2
+    assert get_max_workers(3, 4, n_tasks=0) == 1
+
+    mocker.patch.object(os, 'cpu_count', return_value=None)
+    assert get_max_workers(None, 4) == 1
+
+
+def test_call_safely():
+    """
+    Test that the errors raised by the functions called safely are returned
+    as error messages.
+    """
+    assert call_safely(divmod, 7, 2) == ((3, 1), '')
+    assert call_safely(divmod, 7, 0) == (
+        None, 'integer division or modulo by zero')
+    assert call_safely(int, 'a', base=10) == (
+        None, "invalid literal for int() with base 10: 'a'")
+
+
+if __name__ == "__main__":
+    pytest.main(['-x', __file__, '-v', '-rw'])
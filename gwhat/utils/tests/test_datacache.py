@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+# ---- Standard imports
+import os
+import os.path as osp
+from shutil import copyfile
+
+# ---- Third party imports
+import pandas as pd
+import pytest
+
+# ---- Local imports
+from gwhat import __rootdir__
+from gwhat.config.main import CONF
+from gwhat.utils import datacache
+from gwhat.meteo import weather_reader
+from gwhat.projet import reader_waterlvl
+
+WXFILENAME = osp.join(
+    __rootdir__, 'projet', 'tests', 'data', 'sample_weather_datafile.csv')
+WLFILENAME = osp.join(
+    __rootdir__, 'projet', 'tests', 'data', 'sample_water_level_datafile.csv')
+
+
+# ---- Pytest Fixtures
+@pytest.fixture
+def cache_dir(datacache_dir):
+    return datacache_dir
+
+
+@pytest.fixture
+def wxfilename(tmp_path):
+    filename = osp.join(tmp_path, 'sample_weather_datafile.csv')
+    copyfile(WXFILENAME, filename)
+    return filename
+
+
+@pytest.fixture
+def wlfilename(tmp_path):
+    filename = osp.join(tmp_path, 'sample_water_level_datafile.csv')
+    copyfile(WLFILENAME, filename)
+    return filename
+
+
+# ---- Tests
+def test_cached_weather_datafile(wxfilename, cache_dir, mocker):
+    """
+    Assert that weather data files are parsed only once when they do not
+    change.
+    """
+    spy = mocker.spy(weather_reader, 'read_weather_csv')
+
+    metadata, data = weather_reader.read_weather_datafile(wxfilename)
+    assert spy.call_count == 1
+    assert len(os.listdir(cache_dir)) == 1
+
+    metadata2, data2 = weather_reader.read_weather_datafile(wxfilename)
+    assert spy.call_count == 1
+    assert metadata2 == metadata
+    pd.testing.assert_frame_equal(data2, data)
+
+    # Assert that the file is not parsed again when only its modification
+    # time changed.
+    stat = os.stat(wxfilename)
+    os.utime(wxfilename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    metadata2, data2 = weather_reader.read_weather_datafile(wxfilename)
+    assert spy.call_count == 1
+    pd.testing.assert_frame_equal(data2, data)
+
+    # Assert that the file is parsed again when its content changed.
+    with open(wxfilename, 'a') as f:
+        f.write('2018,1,1,1.5,-1.5,0,2.5\n')
+    metadata2, data2 = weather_reader.read_weather_datafile(wxfilename)
+    assert spy.call_count == 2
+    assert len(data2) == len(data) + 1
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_cached_water_level_datafile(wlfilename, mocker):
+    """
+    Assert that water level data files are parsed only once when they do not
+    change and that the cached data are restored as expected.
+    """
+    spy = mocker.spy(reader_waterlvl, 'read_water_level_csv')
+
+    dataf = reader_waterlvl.read_water_level_datafile(wlfilename)
+    dataf2 = reader_waterlvl.read_water_level_datafile(wlfilename)
+    assert spy.call_count == 1
+
+    assert isinstance(dataf2, reader_waterlvl.WLDataFrame)
+    assert dataf2.filename == wlfilename
+    assert dataf2.attrs == dataf.attrs
+    pd.testing.assert_frame_equal(dataf2, dataf)
+
+
+def test_changed_reader_datacache(wlfilename, cache_dir, mocker):
+    """
+    Assert that the data files are parsed again when the source code of
+    their reader changed since they were cached.
+    """
+    spy = mocker.spy(reader_waterlvl, 'read_water_level_csv')
+    reader_waterlvl.read_water_level_datafile(wlfilename)
+    reader_waterlvl.read_water_level_datafile(wlfilename)
+    assert spy.call_count == 1
+
+    mocker.patch.object(
+        datacache, 'calc_reader_hash', return_value='changed reader')
+    dataf = reader_waterlvl.read_water_level_datafile(wlfilename)
+    assert spy.call_count == 2
+    assert len(os.listdir(cache_dir)) == 1
+
+    dataf2 = reader_waterlvl.read_water_level_datafile(wlfilename)
+    assert spy.call_count == 2
+    pd.testing.assert_frame_equal(dataf2, dataf)
+
+
+def test_disabled_datacache(wxfilename, cache_dir, mocker):
+    """
+    Assert that the data files are parsed every time when the cache is
+    disabled.
+    """
+    CONF.set('main', 'datafile_cache_enabled', False)
+    try:
+        spy = mocker.spy(weather_reader, 'read_weather_csv')
+        weather_reader.read_weather_datafile(wxfilename)
+        weather_reader.read_weather_datafile(wxfilename)
+        assert spy.call_count == 2
+        assert not osp.exists(cache_dir)
+    finally:
+        CONF.set('main', 'datafile_cache_enabled', True)
+
+
+def test_datacache_max_size(tmp_path, cache_dir, mocker):
+    """
+    Assert that the least recently used files are evicted from the cache
+    when the size of the cache exceeds its maximum size.
+    """
+    filenames = []
+    for i in range(3):
+        filename = osp.join(tmp_path, 'weather_datafile{}.csv'.format(i))
+        copyfile(WXFILENAME, filename)
+        filenames.append(filename)
+
+    # Cache the first two files, then use the first file, so that the
+    # second file is the least recently used one.
+    for i, filename in enumerate(filenames[:2]):
+        weather_reader.read_weather_datafile(filename)
+        cache_filename = datacache._get_cache_filename(
+            filename, weather_reader.__name__)
+        os.utime(cache_filename, ns=(i * 10**9, i * 10**9))
+    cache_size = sum(
+        osp.getsize(osp.join(cache_dir, name)) for
+        name in os.listdir(cache_dir))
+    assert len(os.listdir(cache_dir)) == 2
+    weather_reader.read_weather_datafile(filenames[0])
+
+    mocker.patch.object(
+        datacache, 'get_datacache_max_size', return_value=cache_size)
+    spy = mocker.spy(weather_reader, 'read_weather_csv')
+    weather_reader.read_weather_datafile(filenames[2])
+    assert spy.call_count == 1
+    assert len(os.listdir(cache_dir)) == 2
+
+    weather_reader.read_weather_datafile(filenames[0])
+    weather_reader.read_weather_datafile(filenames[2])
+    assert spy.call_count == 1
+    weather_reader.read_weather_datafile(filenames[1])
+    assert spy.call_count == 2
+
+
+if __name__ == "__main__":
+    pytest.main(['-x', __file__, '-v', '-rw'])
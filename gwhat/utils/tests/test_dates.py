@@ -11,10 +11,16 @@
 import os
 
 # ---- Third party imports
+import numpy as np
+import pandas as pd
 import pytest
+from xlrd.xldate import xldate_as_datetime
 
 # ---- Local imports
-from gwhat.utils.dates import qdate_from_xldate
+from gwhat.utils.dates import (
+    qdate_from_xldate, xldates_to_datetime64, datetime64_to_xldates,
+    xldates_to_datetimeindex, datetimeindex_to_xldates,
+    datetimeindex_to_dayruns, dayruns_to_datetimeindex)
 
 
 # ---- Tests
@@ -30,5 +36,86 @@ def test_qdate_from_xldate():
         assert qdate.year() == 2017
 
 
+@pytest.mark.parametrize("datemode", [0, 1])
+def test_xldates_to_datetime64(datemode):
+    """
+    Assert that the vectorized conversion of Excel numerical dates to
+    datetime64 values yields the same results as xlrd.
+    """
+    np.random.seed(1234)
+    xldates = np.hstack([
+        [1, 59, 59.75, 60, 61, 61.5, 4000, 43000.87],
+        np.random.uniform(1, 60000, 1000)])
+
+    expected = pd.DatetimeIndex(
+        [xldate_as_datetime(xldate, datemode) for xldate in xldates])
+    assert (xldates_to_datetime64(xldates, datemode) ==
+            expected.values).all()
+
+
+def test_xldates_to_datetime64_nan():
+    """
+    Assert that nan values are converted to NaT and back to nan.
+    """
+    datetimes = xldates_to_datetime64([43000, np.nan])
+    assert datetimes[0] == np.datetime64('2017-09-22')
+    assert np.isnat(datetimes[1])
+
+    xldates = datetime64_to_xldates(datetimes)
+    assert xldates[0] == 43000
+    assert np.isnan(xldates[1])
+
+
+@pytest.mark.parametrize("datemode", [0, 1])
+def test_datetime64_to_xldates(datemode):
+    """
+    Assert that converting datetime64 values to Excel numerical dates
+    and back again is working as expected.
+    """
+    datetimes = pd.date_range('1900-01-05', '2030-01-01', freq='15D').append(
+        pd.date_range('2020-01-01', periods=100, freq='15min'))
+    if datemode == 1:
+        datetimes = datetimes[datetimes > '1904-01-01']
+    xldates = datetime64_to_xldates(datetimes.values, datemode)
+    assert (xldates_to_datetime64(xldates, datemode) ==
+            datetimes.values).all()
+
+    # Assert that the workaround for the Excel 1900 leap year bug
+    # is working as expected.
+    xldates = datetimeindex_to_xldates(pd.DatetimeIndex(
+        ['1900-01-01', '1900-02-28', '1900-03-01', '2017-09-22 12:00']))
+    assert xldates.tolist() == [1, 59, 61, 43000.5]
+    assert xldates_to_datetimeindex(xldates).strftime(
+        '%Y-%m-%d %H:%M').tolist() == [
+            '1900-01-01 00:00', '1900-02-28 00:00', '1900-03-01 00:00',
+            '2017-09-22 12:00']
+
+
+def test_dayruns():
+    """
+    Assert that contracting a datetime index into runs of consecutive days
+    and expanding it back is working as expected.
+    """
+    datetimeindex = pd.DatetimeIndex(
+        ['2000-01-03', '2000-01-01', '2000-01-02', '2000-01-05',
+         '2000-01-05', pd.NaT, '1960-03-01'])
+    dayruns = datetimeindex_to_dayruns(datetimeindex)
+    assert dayruns.dtype == 'int64'
+    assert dayruns.tolist() == [[-3593, -3593], [10957, 10959], [10961, 10961]]
+    assert dayruns_to_datetimeindex(dayruns).strftime('%Y-%m-%d').tolist() == [
+        '1960-03-01', '2000-01-01', '2000-01-02', '2000-01-03', '2000-01-05']
+
+    # Assert that empty indexes are handled as expected.
+    dayruns = datetimeindex_to_dayruns(pd.DatetimeIndex([]))
+    assert dayruns.shape == (0, 2)
+    assert len(dayruns_to_datetimeindex(dayruns)) == 0
+
+    # Assert that long gaps are contracted into a single run.
+    datetimeindex = pd.date_range('1950-01-01', '2019-12-31')
+    dayruns = datetimeindex_to_dayruns(datetimeindex)
+    assert dayruns.shape == (1, 2)
+    assert (dayruns_to_datetimeindex(dayruns) == datetimeindex).all()
+
+
 if __name__ == "__main__":
     pytest.main(['-x', os.path.basename(__file__), '-v', '-rw'])
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+# ---- Standard imports
+import os
+
+# ---- Third party imports
+import numpy as np
+import pytest
+
+# ---- Local imports
+from gwhat.utils.math import find_sampling_interval, regularize_time_series
+
+
+# ---- Tests
+def test_find_sampling_interval():
+    """
+    Assert that the dominant sampling interval is found as expected
+    when the times contain irregular timestamps and gaps.
+    """
+    t = 41000 + np.arange(1000) / 96
+    t[500] += 1 / 86400 * 0.2
+    t = np.hstack((t[:100], t[100] + 1e-6, t[100:300], t[400:]))
+    assert find_sampling_interval(t) == 900 / 86400
+
+    with pytest.raises(ValueError):
+        find_sampling_interval([41000, 41000])
+
+
+def test_regularize_time_series():
+    """
+    Assert that the channels of a time series are resampled on a regular
+    grid as expected and that the long gaps are flagged.
+    """
+    t = np.array([0, 1, 2, 2.1, 3, 4, 5, 6, 7, 8, 9], dtype=float)
+    x = np.column_stack((
+        [0, 1, 2, 2.1, 3, 4, 5, 6, 7, 8, 9],
+        [0, 2, 4, 4.2, np.nan, np.nan, 10, 12, np.nan, 16, 18],
+        [np.nan, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]))
+
+    tc, xc, isgap = regularize_time_series(t, x)
+    assert np.array_equal(tc, np.arange(10))
+    assert np.allclose(xc[:, 0], np.arange(10))
+    assert np.allclose(xc[:, 1], np.arange(10) * 2)
+    assert np.isnan(xc[0, 2]) and isgap[0, 2]
+    assert np.allclose(xc[1:, 2], 1)
+    assert isgap.sum() == 1
+
+    # Gaps longer than max_gap must be flagged instead of being
+    # interpolated.
+    tc, xc, isgap = regularize_time_series(t, x, max_gap=2)
+    assert np.array_equal(np.where(isgap[:, 1])[0], [3, 4])
+    assert np.isnan(xc[3:5, 1]).all()
+    assert xc[7, 1] == 14
+
+    # Assert that the dimension of the channels is preserved and that the
+    # sampling interval of the grid can be set.
+    tc, xc, isgap = regularize_time_series(t, x[:, 0], dt=0.5)
+    assert np.array_equal(tc, np.arange(19) / 2)
+    assert xc.shape == isgap.shape == (19,)
+    assert np.allclose(xc, tc)
+
+
+if __name__ == "__main__":
+    pytest.main(['-x', os.path.basename(__file__), '-v', '-rw'])
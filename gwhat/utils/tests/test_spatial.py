@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright © GWHAT Project Contributors
+# https://github.com/jnsebgosselin/gwhat
+#
+# This file is part of GWHAT (Ground-Water Hydrograph Analysis Toolbox).
+# Licensed under the terms of the GNU General Public License.
+# -----------------------------------------------------------------------------
+
+# ---- Standard imports
+import os
+
+# ---- Third party imports
+import numpy as np
+import pytest
+
+# ---- Local imports
+from gwhat.common.utils import calc_dist_from_coord
+from gwhat.utils.spatial import StationSpatialIndex
+
+
+# ---- Pytest Fixtures
+@pytest.fixture
+def stations():
+    np.random.seed(1234)
+    names = ['station{}'.format(i) for i in range(400)]
+    lats = np.random.uniform(44, 50, 400)
+    lons = np.random.uniform(-80, -60, 400)
+    return names, lats, lons
+
+
+# ---- Tests
+def test_query_nearest(stations):
+    """
+    Assert that the k-nearest stations returned by the spatial index match
+    those found with a brute-force haversine distance calculation.
+    """
+    names, lats, lons = stations
+    spatial_index = StationSpatialIndex(names, lats, lons)
+
+    lat, lon = 45.74581, -73.28024
+    expected_dists = calc_dist_from_coord(lat, lon, lats, lons)
+    expected_order = np.argsort(expected_dists)[:5]
+
+    nearest_names, nearest_dists = spatial_index.query_nearest(lat, lon, k=5)
+    assert nearest_names.tolist() == np.array(names)[expected_order].tolist()
+    assert np.allclose(nearest_dists, expected_dists[expected_order])
+
+    # Query many locations at once.
+    nearest_names, nearest_dists = spatial_index.query_nearest(
+        [lat, 47], [lon, -70], k=3)
+    assert nearest_names.shape == (2, 3)
+    assert nearest_names[0].tolist() == (
+        np.array(names)[expected_order[:3]].tolist())
+
+
+def test_query_radius(stations):
+    """
+    Assert that the stations returned by the spatial index within a given
+    radius match those found with a brute-force haversine distance
+    calculation.
+    """
+    names, lats, lons = stations
+    spatial_index = StationSpatialIndex(names, lats, lons)
+
+    lat, lon = 45.74581, -73.28024
+    expected_dists = calc_dist_from_coord(lat, lon, lats, lons)
+    expected_order = np.argsort(expected_dists)
+    expected_order = expected_order[expected_dists[expected_order] <= 100]
+
+    radius_names, radius_dists = spatial_index.query_radius(lat, lon, 100)
+    assert len(radius_names) > 0
+    assert radius_names.tolist() == np.array(names)[expected_order].tolist()
+    assert np.allclose(radius_dists, expected_dists[expected_order])
+
+
+def test_empty_spatial_index():
+    """
+    Assert that querying an empty spatial index returns empty arrays.
+    """
+    spatial_index = StationSpatialIndex([], [], [])
+    assert len(spatial_index) == 0
+    assert spatial_index.query_nearest(45, -73)[0].tolist() == []
+    assert spatial_index.query_radius(45, -73, 100)[0].tolist() == []
+
+
+if __name__ == "__main__":
+    pytest.main(['-x', os.path.basename(__file__), '-v', '-rw'])